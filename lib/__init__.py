@@ -10,21 +10,43 @@ Modules:
 
 Note: The openrouter module is available separately in lib/openrouter/
 
+The public classes are imported lazily (PEP 562), so ``import dotbins``
+doesn't load the downloader's network and archive dependencies until one of
+them is actually used.
+
 Usage:
     from dotbins import ToolManager
-    
+
     manager = ToolManager()
     manager.sync_all()
 """
 
+import importlib
+
 __version__ = "1.0.0"
 
-from .downloader import BinaryDownloader
-from .manager import ToolManager
-from .security import SecurityScanner
+# Public name -> submodule that defines it
+_LAZY_ATTRS = {
+    'BinaryDownloader': 'downloader',
+    'ToolManager': 'manager',
+    'SecurityScanner': 'security',
+}
 
 __all__ = [
     'BinaryDownloader',
     'ToolManager',
     'SecurityScanner',
 ]
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
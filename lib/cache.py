@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Download Cache for dotbins
+
+Downloaded assets are stored by their SHA256 rather than by tool/tag name, so
+a re-tagged release or a renamed tool reuses the bytes it already has, a
+cache hit is a single stat() of ``objects/<aa>/<sha256>``, and several dotbins
+checkouts on the same host can safely share one cache directory (objects are
+immutable and only ever appear via an atomic rename). Objects are made
+read-only (0555), so a raw binary can be installed as a hardlink to its
+object without the installed copy being able to change the cached bytes.
+
+Layout:
+    ~/.cache/dotbins/
+    ├── objects/ab/ab12...ef     # Asset bytes, named by SHA256
+    ├── staging/                 # In-flight (resumable) downloads
+    ├── locks/                   # Advisory locks (see locking.py)
+    └── index.json               # Object metadata + manifest key -> object
+
+Each object's metadata records where it came from (URL, asset file name) and
+the HTTP validators (ETag / Last-Modified) for conditional revalidation.
+Files downloaded outside the object store (e.g. manifest.json) are tracked
+by path in the same index.
+
+The index also records when each object was last used, so the cache can be
+held to a byte budget by evicting least-recently-used (and optionally
+too-old) objects, never touching the ones the caller marks as protected.
+
+Several processes may use the cache at once: every index update re-reads
+index.json under ``locks/index.lock`` before applying its change, and reads
+pick up other processes' changes when the file's stat changes. Bookkeeping
+that a sync does for every tool - access times, refs and key bindings - is
+held in memory inside ``batch()`` and written in one index update at its end.
+
+Usage:
+    from cache import DownloadCache
+
+    cache = DownloadCache(Path('~/.cache/dotbins').expanduser())
+    if cache.has(sha256):
+        path = cache.object_path(sha256)
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+try:
+    from .locking import FileLock
+except ImportError:
+    from locking import FileLock
+
+
+INDEX_VERSION = 2
+
+# Permissions of stored objects: read-only, so hardlinked installs can't modify them
+OBJECT_MODE = 0o555
+
+# Default cache budget (bytes) enforced after sync_all
+DEFAULT_CACHE_BUDGET = 2 * 1024 ** 3
+
+SIZE_SUFFIXES = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def parse_size(value: str) -> int:
+    """Parse a byte count such as '524288000', '500M' or '2G'."""
+    value = value.strip().upper().rstrip('B').rstrip('I')
+    if value and value[-1] in SIZE_SUFFIXES:
+        return int(float(value[:-1]) * SIZE_SUFFIXES[value[-1]])
+    return int(value)
+
+
+def _add_ref(meta: Dict, ref: Optional[str]):
+    """Remember a 'tool@tag' reference in an object's metadata."""
+    if ref and ref not in meta.setdefault('refs', []):
+        meta['refs'].append(ref)
+
+
+class DownloadCache:
+    """Content-addressed object store with a JSON index."""
+
+    def __init__(self, cache_dir: Path):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Root of the cache directory
+        """
+        self.cache_dir = cache_dir
+        self.objects_dir = cache_dir / 'objects'
+        self.staging_dir = cache_dir / 'staging'
+        self.index_path = cache_dir / 'index.json'
+        self.locks_dir = cache_dir / 'locks'
+
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._pending: List[Callable[[Dict], None]] = []
+        self._index_stamp = self._stamp()
+        self._index = self._load()
+
+    def _stamp(self):
+        try:
+            st = self.index_path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns, st.st_ino
+
+    def _refresh(self):
+        """Re-read the index if another process rewrote it. Caller holds the lock."""
+        stamp = self._stamp()
+        if stamp != self._index_stamp:
+            self._index_stamp = stamp
+            self._index = self._load()
+            # Changes held by batch() aren't on disk yet
+            for mutate in self._pending:
+                mutate(self._index)
+
+    def _update(self, mutate: Callable[[Dict], None]):
+        """Apply a change to the latest on-disk index and write it back."""
+        with self._lock, FileLock(self.locks_dir / 'index.lock'):
+            self._refresh()
+            mutate(self._index)
+            self._save()
+
+    def _update_later(self, mutate: Callable[[Dict], None]):
+        """Apply a bookkeeping change: in memory until the end of a batch(), else right away."""
+        with self._lock:
+            if self._batch_depth:
+                self._refresh()
+                mutate(self._index)
+                self._pending.append(mutate)
+                return
+        self._update(mutate)
+
+    @contextmanager
+    def batch(self):
+        """
+        Hold touch() and bind() updates in memory, and write them in one index
+        update when the (outermost) block exits. Reads see them immediately.
+        """
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if not self._batch_depth and self._pending:
+                    pending, self._pending = self._pending, []
+
+                    def mutate(index):
+                        for change in pending:
+                            change(index)
+
+                    self._update(mutate)
+
+    def lock(self, name: str) -> FileLock:
+        """Get the cross-process lock for an object or staging name."""
+        return FileLock(self.locks_dir / f"{name}.lock")
+
+    def _load(self) -> Dict:
+        """Load the index from disk (empty if missing, corrupt or outdated)."""
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+            if index.get('version') == INDEX_VERSION:
+                return index
+        except (OSError, ValueError, AttributeError):
+            pass
+        return {'version': INDEX_VERSION, 'objects': {}, 'keys': {}, 'files': {}}
+
+    def _save(self):
+        """Atomically write the index to disk. Caller holds both locks."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+        self._index_stamp = self._stamp()
+
+    # Objects
+
+    def object_path(self, sha256: str) -> Path:
+        """Get the path an object is (or would be) stored at."""
+        return self.objects_dir / sha256[:2] / sha256
+
+    def has(self, sha256: str) -> bool:
+        """Check whether an object is present."""
+        return self.object_path(sha256).is_file()
+
+    def add(self, src_path: Path, sha256: str, metadata: Optional[Dict] = None,
+            ref: Optional[str] = None) -> Path:
+        """
+        Move a verified file into the store.
+
+        Args:
+            src_path: File whose contents hash to ``sha256``
+            sha256: Digest of the file
+            metadata: Metadata to record for the object
+            ref: Optional 'tool@tag' reference to remember for the object
+
+        Returns:
+            Path of the stored object
+        """
+        object_path = self.object_path(sha256)
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        os.chmod(src_path, OBJECT_MODE)
+        os.replace(src_path, object_path)
+        now = time.time()
+
+        def mutate(index):
+            meta = index['objects'].setdefault(sha256, {})
+            meta.update(metadata or {}, last_used=now)
+            _add_ref(meta, ref)
+
+        self._update(mutate)
+        return object_path
+
+    def touch(self, sha256: str, ref: Optional[str] = None):
+        """
+        Mark an object as used now (held by batch()).
+
+        Args:
+            sha256: Object digest
+            ref: Optional 'tool@tag' reference to remember for the object
+        """
+        now = time.time()
+
+        def mutate(index):
+            meta = index['objects'].setdefault(sha256, {})
+            meta['last_used'] = now
+            _add_ref(meta, ref)
+
+        self._update_later(mutate)
+
+    def remove(self, sha256: str):
+        """Delete an object and its metadata."""
+        self.object_path(sha256).unlink(missing_ok=True)
+
+        def mutate(index):
+            index['objects'].pop(sha256, None)
+            index['keys'] = {k: v for k, v in index['keys'].items() if v != sha256}
+
+        self._update(mutate)
+
+    def objects(self) -> Dict[str, Dict]:
+        """Get metadata for all known objects."""
+        with self._lock:
+            self._refresh()
+            return {sha: dict(meta) for sha, meta in self._index['objects'].items()}
+
+    def stored_objects(self) -> Dict[str, os.stat_result]:
+        """Stat every object actually on disk (including ones missing from the index)."""
+        stored = {}
+        if self.objects_dir.exists():
+            for object_path in self.objects_dir.glob('??/*'):
+                if object_path.is_file() and len(object_path.name) == 64:
+                    stored[object_path.name] = object_path.stat()
+        return stored
+
+    def evict(self, budget: int, protected: Iterable[str] = (),
+              max_age: Optional[float] = None) -> List[str]:
+        """
+        Evict objects until the cache fits in ``budget`` bytes.
+
+        Objects unused for longer than ``max_age`` seconds go first, then the
+        least recently used ones. Protected objects are never evicted, even if
+        that leaves the cache over budget.
+
+        Args:
+            budget: Maximum total object size in bytes
+            protected: Digests that must be kept
+            max_age: Evict objects unused for this many seconds regardless of size
+
+        Returns:
+            Digests of the evicted objects
+        """
+        protected: Set[str] = set(protected)
+        objects = self.objects()
+        stored = self.stored_objects()
+        now = time.time()
+
+        total = sum(st.st_size for st in stored.values())
+
+        def last_used(sha256: str) -> float:
+            return objects.get(sha256, {}).get('last_used', stored[sha256].st_mtime)
+
+        evicted = []
+        for sha256 in sorted(stored, key=last_used):
+            if sha256 in protected:
+                continue
+            expired = max_age is not None and now - last_used(sha256) > max_age
+            if total <= budget and not expired:
+                continue
+            self.remove(sha256)
+            total -= stored[sha256].st_size
+            evicted.append(sha256)
+
+        return evicted
+
+    # Manifest keys
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Get the object last fetched for a manifest key (e.g. 'fzf/linux/amd64')."""
+        with self._lock:
+            self._refresh()
+            return self._index['keys'].get(key)
+
+    def bind(self, key: str, sha256: str):
+        """Record that a manifest key resolved to an object (held by batch())."""
+        if self.lookup(key) == sha256:
+            return
+
+        def mutate(index):
+            index['keys'][key] = sha256
+
+        self._update_later(mutate)
+
+    # Metadata (objects by digest, anything else by path)
+
+    def _section(self, path: Path):
+        """Return (section, name) under which a path's metadata is stored."""
+        if path.parent.parent == self.objects_dir:
+            return 'objects', path.name
+        return 'files', str(path)
+
+    def metadata(self, path: Path) -> Dict:
+        """Get the metadata recorded for an object or downloaded file."""
+        section, name = self._section(path)
+        with self._lock:
+            self._refresh()
+            return dict(self._index[section].get(name, {}))
+
+    def record(self, path: Path, **fields):
+        """Merge metadata fields for an object or downloaded file."""
+        section, name = self._section(path)
+
+        def mutate(index):
+            index[section].setdefault(name, {}).update(fields)
+
+        self._update(mutate)
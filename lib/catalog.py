@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Indexed Manifest Catalog for dotbins
+
+manifest.json is a flat ``{"tool/platform/arch": entry}`` mapping. Questions
+like "which platforms does fzf support" or "which entries carry tag v1.2"
+used to mean scanning every key (once per tool, for listings). The catalog
+builds the indexes once:
+
+- tool -> [key, ...]               (manifest order)
+- key -> entry                     (i.e. (tool, platform, arch) -> entry)
+- tool -> tag -> [key, ...]
+
+and persists them, together with the parsed manifest, as a compact
+``marshal`` snapshot in the cache directory. The snapshot is used as long as
+the manifest's stat (size, mtime) is unchanged; if only the stat changed
+(e.g. a fresh git checkout), the manifest's SHA256 decides, so the JSON is
+re-parsed only when its content really changed.
+
+Usage:
+    from catalog import ManifestCatalog
+
+    catalog = ManifestCatalog.load(manifest_path, snapshot_path)
+    catalog.platforms('fzf')          # ['linux/amd64', 'macos/arm64']
+    catalog.entry('fzf', 'linux', 'amd64')
+"""
+
+import json
+import marshal
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# Bump when the snapshot layout changes
+SNAPSHOT_VERSION = 1
+
+
+class ManifestCatalog:
+    """Read-only, indexed view of a manifest."""
+
+    def __init__(self, manifest: Dict, indexes: Optional[tuple] = None, sha256: Optional[str] = None):
+        """
+        Initialize the catalog.
+
+        Args:
+            manifest: Parsed manifest.json
+            indexes: Prebuilt (by_tool, by_tag) indexes from a snapshot
+            sha256: Digest of the manifest file, if known
+        """
+        self.manifest = manifest
+        self.sha256 = sha256
+        self._by_tool, self._by_tag = indexes if indexes is not None else self._build(manifest)
+
+    @staticmethod
+    def _build(manifest: Dict) -> tuple:
+        """Build the tool and tag indexes in one pass over the manifest."""
+        by_tool: Dict[str, List[str]] = {}
+        by_tag: Dict[str, Dict[str, List[str]]] = {}
+        for key, entry in manifest.items():
+            parts = key.split('/')
+            if len(parts) != 3 or not isinstance(entry, dict):
+                continue
+            tool_name = parts[0]
+            by_tool.setdefault(tool_name, []).append(key)
+            tag = entry.get('tag')
+            if tag is not None:
+                by_tag.setdefault(tool_name, {}).setdefault(str(tag), []).append(key)
+        return by_tool, by_tag
+
+    @classmethod
+    def load(cls, manifest_path: Path, snapshot_path: Optional[Path] = None) -> 'ManifestCatalog':
+        """
+        Load the catalog for a manifest, using a snapshot when it is current.
+
+        Args:
+            manifest_path: Path of manifest.json
+            snapshot_path: Where to keep the parsed snapshot (optional)
+
+        Returns:
+            ManifestCatalog (empty if the manifest doesn't exist)
+        """
+        try:
+            st = os.stat(manifest_path)
+        except FileNotFoundError:
+            return cls({})
+        stamp = (st.st_size, st.st_mtime_ns)
+
+        snapshot = cls._read_snapshot(snapshot_path) if snapshot_path else None
+        if snapshot and snapshot['stamp'] == stamp:
+            return cls(snapshot['manifest'], (snapshot['by_tool'], snapshot['by_tag']), snapshot['sha256'])
+
+        import hashlib
+        with open(manifest_path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+
+        if snapshot and snapshot['sha256'] == digest:
+            catalog = cls(snapshot['manifest'], (snapshot['by_tool'], snapshot['by_tag']), digest)
+        else:
+            catalog = cls(json.loads(data), sha256=digest)
+
+        if snapshot_path:
+            catalog._write_snapshot(snapshot_path, stamp, digest)
+        return catalog
+
+    @staticmethod
+    def _read_snapshot(snapshot_path: Path) -> Optional[Dict]:
+        try:
+            # marshal.loads() on the whole file; marshal.load() reads a file object piecemeal
+            with open(snapshot_path, 'rb') as f:
+                snapshot = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(snapshot, dict) or snapshot.get('version') != SNAPSHOT_VERSION:
+            return None
+        return snapshot
+
+    def _write_snapshot(self, snapshot_path: Path, stamp: tuple, digest: str):
+        """Atomically write the snapshot (best effort: the cache may be read-only)."""
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'stamp': stamp,
+            'sha256': digest,
+            'manifest': self.manifest,
+            'by_tool': self._by_tool,
+            'by_tag': self._by_tag,
+        }
+        tmp_path = snapshot_path.with_name(f"{snapshot_path.name}.{os.getpid()}.tmp")
+        try:
+            snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(marshal.dumps(snapshot))
+            os.replace(tmp_path, snapshot_path)
+        except (OSError, ValueError):
+            # ValueError: manifest holds something marshal can't encode
+            tmp_path.unlink(missing_ok=True)
+
+    # Lookups
+
+    def __len__(self) -> int:
+        return sum(len(keys) for keys in self._by_tool.values())
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Get the entry for a 'tool/platform/arch' key."""
+        entry = self.manifest.get(key)
+        return entry if isinstance(entry, dict) and key.count('/') == 2 else None
+
+    def entry(self, tool_name: str, platform: str, arch: str) -> Optional[Dict]:
+        """Get the entry for a tool on a platform."""
+        return self.get(f"{tool_name}/{platform}/{arch}")
+
+    def tools(self) -> List[str]:
+        """Get all tool names (manifest order)."""
+        return list(self._by_tool)
+
+    def keys(self, platform: Optional[str] = None, arch: Optional[str] = None) -> List[str]:
+        """Get all entry keys, optionally only those for one platform/arch."""
+        keys = [key for tool_keys in self._by_tool.values() for key in tool_keys]
+        if platform is None and arch is None:
+            return keys
+        suffix = f"/{platform}/{arch}"
+        return [key for key in keys if key.endswith(suffix)]
+
+    def tool_keys(self, tool_name: str) -> List[str]:
+        """Get the entry keys of one tool."""
+        return list(self._by_tool.get(tool_name, []))
+
+    def platforms(self, tool_name: str) -> List[str]:
+        """Get the 'platform/arch' pairs a tool is available for."""
+        return [key.split('/', 1)[1] for key in self._by_tool.get(tool_name, [])]
+
+    def tags(self, tool_name: str) -> List[str]:
+        """Get the tags a tool's entries carry."""
+        return list(self._by_tag.get(tool_name, {}))
+
+    def keys_for_tag(self, tool_name: str, tag: str) -> List[str]:
+        """Get the entry keys of a tool carrying a tag ('1.2' also matches 'v1.2')."""
+        tags = self._by_tag.get(tool_name, {})
+        return list(tags.get(tag) or tags.get(f"v{tag}") or [])
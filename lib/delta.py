@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Binary Delta Updates for dotbins
+
+Upgrading a tool normally downloads the whole new asset, even though the
+previous version's asset usually sits in the content-addressed cache. A
+manifest entry can instead offer patches from earlier assets:
+
+    "bat/linux/amd64": {
+      "url": ".../bat-v0.26.0-x86_64-unknown-linux-musl.tar.gz",
+      "sha256": "<new sha256>",
+      "delta": {
+        "<old sha256>": {"url": ".../bat-0.25-0.26.delta", "sha256": "<delta sha256>"}
+      }
+    }
+
+If one of the old objects is cached, sync downloads the (much smaller) patch,
+applies it to the cached object and verifies the result against the entry's
+sha256 before it enters the cache; on any failure it falls back to the full
+download.
+
+The format is bsdiff-like, in pure Python: the new file is described as
+literal bytes plus ranges copied from the old file with an XOR correction
+(mostly zeros when only addresses or a few bytes changed), and the three
+streams are compressed with lzma (zlib if Python was built without it).
+Deltas work best on raw binaries and uncompressed archives; for .tar.gz/.zip
+assets the compressed bytes change throughout, so ``make`` warns when the
+patch isn't much smaller than the new file.
+
+Usage:
+    python3 delta.py make old.bin new.bin new.delta --url https://mirror/new.delta
+    python3 delta.py apply old.bin new.delta new.bin
+"""
+
+import hashlib
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import lzma
+    HAS_LZMA = True
+    _CODEC_ERRORS = (lzma.LZMAError, zlib.error)
+except ImportError:
+    HAS_LZMA = False
+    _CODEC_ERRORS = (zlib.error,)
+
+
+MAGIC = b'DBDELTA1'
+
+# magic, codec, old size, new size, old sha256, new sha256, stream lengths
+HEADER = struct.Struct('>8scQQ32s32sQQQ')
+
+# One control record: literal bytes, then `length` bytes from `old_offset` XOR diff
+CONTROL = struct.Struct('>QQQ')
+
+# Old-file blocks indexed for matching
+BLOCK_SIZE = 32
+
+# Stride of the scan through the new file while nothing matches. One less than
+# BLOCK_SIZE, so successive probes meet the old file's blocks at every alignment:
+# any common run of BLOCK_SIZE * (SCAN_STEP + 1) bytes is found, and extending
+# the match backward recovers its start
+SCAN_STEP = BLOCK_SIZE - 1
+
+# Step used to grow a match; a step stays in it while at least half its bytes agree
+EXTEND_STEP = 128
+
+# Shorter matches are skipped: they barely pay for their control record, and a
+# spurious one (a block repeated elsewhere in the old file) would cut off the
+# backward extension of the real match that follows
+MIN_MATCH = EXTEND_STEP
+
+# make() warns when the delta is larger than this fraction of the new file
+WORTHWHILE_RATIO = 0.8
+
+
+class DeltaError(Exception):
+    """Raised when a delta is malformed or doesn't apply to the given file."""
+
+
+def _compress(data: bytes, codec: bytes) -> bytes:
+    return lzma.compress(data, preset=9) if codec == b'x' else zlib.compress(data, 9)
+
+
+def _decompress(data: bytes, codec: bytes) -> bytes:
+    if codec == b'x':
+        if not HAS_LZMA:
+            raise DeltaError("Delta is lzma-compressed, but this Python has no lzma module")
+        return lzma.decompress(data)
+    if codec == b'z':
+        return zlib.decompress(data)
+    raise DeltaError(f"Unknown delta codec: {codec!r}")
+
+
+def _xor(a, b) -> bytes:
+    """XOR two equally long byte strings (at C speed, via big integers)."""
+    return (int.from_bytes(a, 'little') ^ int.from_bytes(b, 'little')).to_bytes(len(a), 'little')
+
+
+def _similar(a: bytes, b: bytes) -> bool:
+    """Whether two chunks agree on at least half their bytes."""
+    return a == b or _xor(a, b).count(0) * 2 >= len(a)
+
+
+def _extend_forward(old: bytes, new: bytes, i: int, j: int) -> int:
+    """Length of the approximate match starting at old[i] / new[j]."""
+    limit = min(len(old) - i, len(new) - j)
+    length = 0
+    while length < limit:
+        step = min(EXTEND_STEP, limit - length)
+        if not _similar(old[i + length:i + length + step], new[j + length:j + length + step]):
+            break
+        length += step
+    return length
+
+
+def _extend_backward(old: bytes, new: bytes, i: int, j: int, limit: int) -> int:
+    """Length of the approximate match ending just before old[i] / new[j]."""
+    length = 0
+    while length < limit:
+        step = min(EXTEND_STEP, limit - length)
+        start = length + step
+        if not _similar(old[i - start:i - length], new[j - start:j - length]):
+            break
+        length = start
+    return length
+
+
+def diff(old: bytes, new: bytes) -> Tuple[List[Tuple[int, int, int]], bytes, bytes]:
+    """
+    Compute the control records and diff/extra streams turning old into new.
+
+    Returns:
+        (controls, diff stream, extra stream)
+    """
+    index: Dict[bytes, int] = {}
+    for i in range(0, len(old) - BLOCK_SIZE + 1, BLOCK_SIZE):
+        index.setdefault(old[i:i + BLOCK_SIZE], i)
+    lookup = index.get
+
+    controls = []
+    diff_parts = []
+    extra_parts = []
+    emitted = 0  # new[:emitted] is covered by the controls so far
+    shift = 0  # old offset - new offset of the last match
+    j = 0
+    while j <= len(new) - BLOCK_SIZE:
+        block = new[j:j + BLOCK_SIZE]
+        i = lookup(block)
+        if i is None:
+            # Failing the index, try where the last match would continue (bsdiff's
+            # lastoffset): edits that keep the layout show up as near-identical blocks
+            i = j + shift
+            if not 0 <= i <= len(old) - BLOCK_SIZE or not _similar(old[i:i + BLOCK_SIZE], block):
+                j += SCAN_STEP
+                continue
+
+        limit = min(i, j - emitted)
+        back = _extend_backward(old, new, i, j, limit)
+        # Then byte by byte, for the start of a match that isn't a whole step
+        while back < limit and old[i - back - 1] == new[j - back - 1]:
+            back += 1
+        length = back + BLOCK_SIZE + _extend_forward(old, new, i + BLOCK_SIZE, j + BLOCK_SIZE)
+        if length < MIN_MATCH:
+            j += SCAN_STEP
+            continue
+        old_start, new_start = i - back, j - back
+        shift = old_start - new_start
+
+        controls.append((new_start - emitted, old_start, length))
+        extra_parts.append(new[emitted:new_start])
+        diff_parts.append(_xor(new[new_start:new_start + length], old[old_start:old_start + length]))
+        j = emitted = new_start + length
+
+    if emitted < len(new) or not controls:
+        controls.append((len(new) - emitted, 0, 0))
+        extra_parts.append(new[emitted:])
+
+    return controls, b''.join(diff_parts), b''.join(extra_parts)
+
+
+def make_delta(old_path: Path, new_path: Path, delta_path: Path) -> Dict:
+    """
+    Write a delta that turns old_path into new_path.
+
+    Returns:
+        {'old_sha256', 'new_sha256', 'sha256' (of the delta), 'size', 'new_size'}
+    """
+    old = Path(old_path).read_bytes()
+    new = Path(new_path).read_bytes()
+    codec = b'x' if HAS_LZMA else b'z'
+    old_sha256 = hashlib.sha256(old)
+    new_sha256 = hashlib.sha256(new)
+
+    controls, diff_stream, extra_stream = diff(old, new)
+    streams = [
+        _compress(b''.join(CONTROL.pack(*control) for control in controls), codec),
+        _compress(diff_stream, codec),
+        _compress(extra_stream, codec),
+    ]
+    header = HEADER.pack(
+        MAGIC, codec, len(old), len(new),
+        old_sha256.digest(), new_sha256.digest(),
+        *(len(stream) for stream in streams)
+    )
+
+    delta_path = Path(delta_path)
+    tmp_path = delta_path.with_name(f"{delta_path.name}.{os.getpid()}.tmp")
+    digest = hashlib.sha256(header)
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        for stream in streams:
+            f.write(stream)
+            digest.update(stream)
+    os.replace(tmp_path, delta_path)
+
+    return {
+        'old_sha256': old_sha256.hexdigest(),
+        'new_sha256': new_sha256.hexdigest(),
+        'sha256': digest.hexdigest(),
+        'size': HEADER.size + sum(len(stream) for stream in streams),
+        'new_size': len(new),
+    }
+
+
+def read_header(delta_path: Path) -> Dict:
+    """Read a delta's header (sizes and digests of the old and new file)."""
+    with open(delta_path, 'rb') as f:
+        raw = f.read(HEADER.size)
+    if len(raw) < HEADER.size or not raw.startswith(MAGIC):
+        raise DeltaError(f"Not a dotbins delta: {delta_path}")
+    _, codec, old_size, new_size, old_sha, new_sha, *lengths = HEADER.unpack(raw)
+    return {
+        'codec': codec,
+        'old_size': old_size,
+        'new_size': new_size,
+        'old_sha256': old_sha.hex(),
+        'new_sha256': new_sha.hex(),
+        'lengths': lengths,
+    }
+
+
+def apply_delta(old_path: Path, delta_path: Path, out_path: Path) -> str:
+    """
+    Apply a delta to old_path, writing the result to out_path.
+
+    The output is hashed while it is written and must match the digest the
+    delta was made for; on any error out_path is removed.
+
+    Returns:
+        SHA256 of the written file
+
+    Raises:
+        DeltaError: The delta is malformed, doesn't fit old_path, or the
+                    result doesn't verify
+    """
+    header = read_header(delta_path)
+    old = Path(old_path).read_bytes()
+    if len(old) != header['old_size']:
+        raise DeltaError(f"Delta expects a {header['old_size']}-byte base, got {len(old)} bytes")
+
+    with open(delta_path, 'rb') as f:
+        f.seek(HEADER.size)
+        try:
+            control, diff_stream, extra_stream = (
+                _decompress(f.read(length), header['codec']) for length in header['lengths']
+            )
+        except _CODEC_ERRORS as e:
+            raise DeltaError(f"Corrupt delta: {e}")
+    if len(control) % CONTROL.size:
+        raise DeltaError("Corrupt delta: truncated control stream")
+
+    diff_view = memoryview(diff_stream)
+    extra_view = memoryview(extra_stream)
+    sha256 = hashlib.sha256()
+    written = diff_pos = extra_pos = 0
+    try:
+        with open(out_path, 'wb') as out:
+            for extra_len, old_offset, length in CONTROL.iter_unpack(control):
+                if (extra_pos + extra_len > len(extra_view) or diff_pos + length > len(diff_view)
+                        or old_offset + length > len(old)):
+                    raise DeltaError("Corrupt delta: control record out of range")
+                for piece in (
+                    extra_view[extra_pos:extra_pos + extra_len],
+                    _xor(diff_view[diff_pos:diff_pos + length], old[old_offset:old_offset + length]),
+                ):
+                    out.write(piece)
+                    sha256.update(piece)
+                extra_pos += extra_len
+                diff_pos += length
+                written += extra_len + length
+
+        if written != header['new_size'] or sha256.hexdigest() != header['new_sha256']:
+            raise DeltaError("Patched file doesn't match the delta's target SHA256")
+    except BaseException:
+        Path(out_path).unlink(missing_ok=True)
+        raise
+
+    return sha256.hexdigest()
+
+
+def format_report(info: Dict, url: str) -> str:
+    """Describe a freshly made delta, with the manifest snippet to publish it."""
+    import json
+
+    ratio = info['size'] / info['new_size'] if info['new_size'] else 1.0
+    lines = [f"Delta: {info['size']} bytes ({ratio:.1%} of {info['new_size']})"]
+    if ratio > WORTHWHILE_RATIO:
+        lines.append("WARNING: Delta is barely smaller than the new file "
+                     "(compressed archives rarely diff well)")
+    snippet = {info['old_sha256']: {'url': url, 'sha256': info['sha256']}}
+    lines.append("Add to the new entry's \"delta\" map in manifest.json:")
+    lines.append(json.dumps(snippet, indent=2))
+    return '\n'.join(lines)
+
+
+def main():
+    """Command-line interface for generating and applying deltas."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate and apply dotbins binary deltas')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    make_parser = subparsers.add_parser('make', help='Create a delta from OLD to NEW')
+    make_parser.add_argument('old', help='Previous asset')
+    make_parser.add_argument('new', help='New asset')
+    make_parser.add_argument('delta', help='Delta file to write')
+    make_parser.add_argument('--url', help='URL the delta will be published at (for the manifest snippet)')
+
+    apply_parser = subparsers.add_parser('apply', help='Apply a delta to OLD, writing OUT')
+    apply_parser.add_argument('old', help='Previous asset')
+    apply_parser.add_argument('delta', help='Delta file')
+    apply_parser.add_argument('out', help='Output file')
+
+    args = parser.parse_args()
+
+    if args.command == 'make':
+        info = make_delta(Path(args.old), Path(args.new), Path(args.delta))
+        print(format_report(info, args.url or Path(args.delta).name))
+    else:
+        try:
+            sha256 = apply_delta(Path(args.old), Path(args.delta), Path(args.out))
+        except (OSError, DeltaError) as e:
+            print(f"ERROR: {e}")
+            return 1
+        print(f"✓ {args.out} ({sha256})")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -11,6 +11,24 @@ Key Features:
 - SHA256 verification for security
 - Platform-specific filtering
 - Incremental updates (only changed binaries)
+- Concurrent, pipelined syncing (download and extraction overlap)
+- Keep-alive connection pooling with redirect caching
+- Resumable downloads (HTTP Range + partial-file journal)
+- Conditional revalidation (ETag / Last-Modified) of cached files
+- Single-pass SHA256 computed while streaming
+- Content-addressed cache (objects keyed by SHA256, deduplicated)
+- Size-bounded LRU eviction of cached objects
+- Stat-fingerprint memo to skip re-hashing unchanged cached files
+- Integrity index of installed binaries (hash + stat fingerprint)
+- Streaming extraction straight to the destination (atomic rename)
+- Multi-binary tools (binary_name lists) extracted in a single pass
+- Atomic installs into versioned generations with instant rollback
+- Pluggable state store (JSON or SQLite/WAL) with install history
+- Cross-process locks: concurrent syncs share downloads and never tear state
+- Indexed manifest catalog with a cached parsed snapshot
+- Binary delta updates patched onto the cached previous version
+- LAN mirror mode (`serve`); mirrors, bundles and upstream ranked by measured
+  latency/throughput, with mid-download failover
 
 Usage:
     from downloader import BinaryDownloader
@@ -19,32 +37,103 @@ Usage:
     downloader.sync_tool('fzf', platform='linux', arch='amd64')
 """
 
-import hashlib
+import errno
 import json
 import os
 import shutil
 import sys
-import tarfile
-import tempfile
-import urllib.request
-import urllib.error
-import zipfile
+import threading
+import time
+import zlib
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-import platform as platform_module
+from typing import Dict, List, Optional, Set, Tuple
+
+# Network, archive and hashing modules (http.client, ssl, tarfile, zipfile,
+# hashlib, concurrent.futures, ...) are imported where they are used, so
+# read-only commands like `dotbins-manager status` don't pay for them.
+
+try:
+    from .catalog import ManifestCatalog
+    from .cache import DEFAULT_CACHE_BUDGET, OBJECT_MODE, DownloadCache, parse_size
+    from .integrity import IntegrityIndex
+    from .locking import FileLock
+    from .progress import Reporter, make_reporter
+    from .releases import ReleaseIndex, tag_variants
+    from .sources import MIN_THROUGHPUT_SAMPLE, Source, SourceStats
+    from .state import open_state_store
+except ImportError:
+    from catalog import ManifestCatalog
+    from cache import DEFAULT_CACHE_BUDGET, OBJECT_MODE, DownloadCache, parse_size
+    from integrity import IntegrityIndex
+    from locking import FileLock
+    from progress import Reporter, make_reporter
+    from releases import ReleaseIndex, tag_variants
+    from sources import MIN_THROUGHPUT_SAMPLE, Source, SourceStats
+    from state import open_state_store
+
+
+# Default number of concurrent downloads for sync_all
+DEFAULT_JOBS = 4
+
+# Attempts per download; each retry resumes from the partial file
+DOWNLOAD_ATTEMPTS = 3
+
+# Why a download failed (the 'failed' field of a _download result): the source
+# doesn't have the file (HTTP 404/410), or the source or what it sent is broken
+FAILED_MISSING = 'missing'
+FAILED_ERROR = 'error'
+
+# How often (in bytes) the partial-download journal is checkpointed
+JOURNAL_INTERVAL = 1024 * 1024
+
+# Download reads fill a reused buffer; the read size adapts between these
+# bounds so that one read takes about READ_TARGET_SECONDS
+MIN_READ_SIZE = 64 * 1024
+MAX_READ_SIZE = 4 * 1024 * 1024
+READ_TARGET_SECONDS = 0.05
+
+# Buffer size used when streaming binaries out of archives
+EXTRACT_CHUNK_SIZE = 1024 * 1024
+
+# ioctl that makes a file share another file's extents copy-on-write (Linux <linux/fs.h>)
+FICLONE = 0x40049409
+
+# Installed generations kept per tool for rollback
+DEFAULT_KEEP_GENERATIONS = 3
 
 
 class BinaryDownloader:
     """Download and manage CLI tool binaries from URLs."""
     
-    def __init__(self, dotbins_dir: Optional[str] = None, cache_dir: Optional[str] = None):
+    def __init__(self, dotbins_dir: Optional[str] = None, cache_dir: Optional[str] = None,
+                 cache_budget: Optional[int] = None, cache_max_age: Optional[float] = None,
+                 paranoid: bool = False, keep_generations: int = DEFAULT_KEEP_GENERATIONS,
+                 state_backend: Optional[str] = None, mirrors: Optional[List[str]] = None,
+                 bundles: Optional[List[str]] = None, progress=None):
         """
         Initialize the downloader.
         
         Args:
             dotbins_dir: Path to .dotbins directory (default: ~/.dotbins)
             cache_dir: Path to cache directory (default: ~/.cache/dotbins)
+            cache_budget: Cache size limit in bytes, enforced after sync_all
+                          (default: $DOTBINS_CACHE_BUDGET or 2 GiB)
+            cache_max_age: Evict cached objects unused for this many days
+                           (default: $DOTBINS_CACHE_MAX_AGE, unset = no limit)
+            paranoid: Always re-hash cached files instead of trusting an
+                      unchanged stat fingerprint
+            keep_generations: Installed generations retained per tool for rollback
+            state_backend: 'json' or 'sqlite' (default: $DOTBINS_STATE_BACKEND,
+                           or 'sqlite' if the cache already has a state.db)
+            mirrors: Base URLs of dotbins mirrors (``downloader.py serve``)
+                     (default: $DOTBINS_MIRRORS, or mirrors.json in the dotbins
+                     directory)
+            bundles: Local directories holding assets, laid out like the cache
+                     (``objects/ab/<sha256>``) or flat by SHA256 or asset name
+                     (default: $DOTBINS_BUNDLES, or mirrors.json)
+            progress: Reporter, or a progress mode ('auto', 'tty', 'plain',
+                      'jsonl', 'quiet'; default: $DOTBINS_PROGRESS or 'auto')
         """
         self.dotbins_dir = Path(dotbins_dir or os.path.expanduser('~/.dotbins'))
         self.cache_dir = Path(cache_dir or os.path.expanduser('~/.cache/dotbins'))
@@ -52,97 +141,826 @@ class BinaryDownloader:
         
         self.manifest_path = self.dotbins_dir / 'manifest.json'
         self.state_path = self.cache_dir / 'state.json'
+        self.cache = DownloadCache(self.cache_dir)
+        self.pins_path = self.dotbins_dir / '.pins.json'
+        self.state_store = open_state_store(self.cache_dir, self.dotbins_dir, state_backend)
+        self.integrity = IntegrityIndex(self.dotbins_dir)
+        self.releases = ReleaseIndex(self.cache_dir / 'releases', self.cache.locks_dir)
+        self._config = None
         
+        if cache_budget is None:
+            env_budget = os.environ.get('DOTBINS_CACHE_BUDGET')
+            cache_budget = parse_size(env_budget) if env_budget else DEFAULT_CACHE_BUDGET
+        if cache_max_age is None and os.environ.get('DOTBINS_CACHE_MAX_AGE'):
+            cache_max_age = float(os.environ['DOTBINS_CACHE_MAX_AGE'])
+        self.cache_budget = cache_budget
+        self.cache_max_age = cache_max_age
+        self.paranoid = paranoid
+        self.keep_generations = max(1, keep_generations)
+        self._state_lock = threading.RLock()
+        self._catalog: Optional[ManifestCatalog] = None
+        self._catalog_stamp = None
+        self._transport = None
+        self._transport_lock = threading.Lock()
+        self.mirrors = self.load_mirrors() if mirrors is None else [m.rstrip('/') for m in mirrors]
+        self.bundles = self.load_bundles() if bundles is None else list(bundles)
+        self.sources = SourceStats(self.cache_dir)
+        self.progress = progress if isinstance(progress, Reporter) else make_reporter(progress)
+    
+    @property
+    def transport(self):
+        """Shared keep-alive connection pool (reused across tools and threads), created on first use."""
+        if self._transport is None:
+            with self._transport_lock:
+                if self._transport is None:
+                    try:
+                        from .transport import HTTPTransport
+                    except ImportError:
+                        from transport import HTTPTransport
+                    self._transport = HTTPTransport()
+        return self._transport
+    
     def load_manifest(self) -> Dict:
-        """Load the manifest.json file."""
-        if not self.manifest_path.exists():
+        """Load the manifest.json file (shared with the catalog; don't modify it)."""
+        return self.catalog().manifest
+    
+    def catalog(self) -> ManifestCatalog:
+        """
+        Get the indexed manifest catalog.
+        
+        The catalog is kept for as long as manifest.json is unchanged, and is
+        loaded from a parsed snapshot in the cache directory when possible.
+        A changed manifest's releases are merged into the release index.
+        """
+        try:
+            st = self.manifest_path.stat()
+            stamp = (st.st_size, st.st_mtime_ns, st.st_ino)
+        except FileNotFoundError:
+            stamp = None
+        
+        if self._catalog is None or stamp != self._catalog_stamp:
+            path_id = f"{zlib.crc32(str(self.manifest_path.resolve()).encode()):08x}"
+            snapshot_path = self.cache_dir / f"manifest-{path_id}.catalog"
+            self._catalog = ManifestCatalog.load(self.manifest_path, snapshot_path)
+            self._catalog_stamp = stamp
+            self.releases.ingest(self._catalog)
+        return self._catalog
+    
+    def resolve_entry(self, tool_name: str, platform: str, arch: str,
+                      version: Optional[str] = None, pins: Optional[Dict[str, str]] = None) -> Optional[Dict]:
+        """
+        Get the entry to install for a tool: the requested version, else the
+        tool's pin, else the manifest's release.
+        
+        Versions other than the manifest's come from the release index
+        (releases.py), so this works offline for any release seen before.
+        
+        Args:
+            version: Release tag ('0.54.0' and 'v0.54.0' both match)
+            pins: Version pins to honour (default: loaded from the state store)
+            
+        Returns:
+            Entry (with its 'tag'), or None if the release isn't known
+        """
+        entry = self.catalog().entry(tool_name, platform, arch)
+        if version is None:
+            version = (pins if pins is not None else self.load_pins()).get(tool_name)
+        if version is None or (entry is not None and str(entry.get('tag')) in tag_variants(version)):
+            return entry
+        return self.releases.get(tool_name, str(version), platform, arch)
+    
+    def _unresolved_reason(self, tool_name: str, platform: str, arch: str,
+                           version: Optional[str]) -> str:
+        """Explain why resolve_entry found nothing."""
+        if version is None:
+            return "No manifest entry"
+        known = [tag for tag in self.releases.tags(tool_name)
+                 if self.releases.get(tool_name, tag, platform, arch)]
+        return (f"Version {version} not in the release index"
+                + (f" (known: {', '.join(known)})" if known else ''))
+    
+    def update_manifest(self, url: str) -> bool:
+        """
+        Refresh manifest.json from a URL.
+        
+        Uses a conditional request, so an unchanged manifest costs a 304.
+        
+        Args:
+            url: URL of the published manifest.json
+            
+        Returns:
+            True if the local manifest is current
+        """
+        return self.download_file(url, self.manifest_path, revalidate=True)
+    
+    def _source_config(self) -> Dict:
+        """Load mirrors.json from the dotbins directory (a list means just mirrors)."""
+        try:
+            with open(self.dotbins_dir / 'mirrors.json', 'r') as f:
+                config = json.load(f)
+        except (OSError, ValueError):
             return {}
-        with open(self.manifest_path, 'r') as f:
-            return json.load(f)
+        return config if isinstance(config, dict) else {'mirrors': config}
+    
+    def load_mirrors(self) -> List[str]:
+        """
+        Load the configured mirror base URLs.
+        
+        ``DOTBINS_MIRRORS`` (comma or space separated) takes precedence over
+        ``mirrors.json`` in the dotbins directory, which holds either a list
+        or ``{"mirrors": [...], "bundles": [...]}``.
+        """
+        env_mirrors = os.environ.get('DOTBINS_MIRRORS')
+        if env_mirrors is not None:
+            mirrors = env_mirrors.replace(',', ' ').split()
+        else:
+            mirrors = self._source_config().get('mirrors') or []
+        return [str(mirror).rstrip('/') for mirror in mirrors if mirror]
+    
+    def load_bundles(self) -> List[str]:
+        """
+        Load the configured local bundle directories.
+        
+        ``DOTBINS_BUNDLES`` (separated by os.pathsep) takes precedence over the
+        ``bundles`` list in mirrors.json.
+        """
+        env_bundles = os.environ.get('DOTBINS_BUNDLES')
+        if env_bundles is not None:
+            bundles = env_bundles.split(os.pathsep)
+        else:
+            bundles = self._source_config().get('bundles') or []
+        return [os.path.expanduser(str(bundle)) for bundle in bundles if bundle]
     
     def load_state(self) -> Dict:
         """Load the local state (what's installed)."""
-        if not self.state_path.exists():
-            return {}
-        with open(self.state_path, 'r') as f:
-            return json.load(f)
+        return self.state_store.all()
     
     def save_state(self, state: Dict):
         """Save the local state."""
-        with open(self.state_path, 'w') as f:
-            json.dump(state, f, indent=2)
+        self.state_store.replace(state)
+    
+    def load_pins(self) -> Dict:
+        """Load version pins (tool -> version)."""
+        return self.state_store.pins()
     
-    def download_file(self, url: str, dest_path: Path, expected_sha256: Optional[str] = None) -> bool:
+    def download_file(self, url: str, dest_path: Path, expected_sha256: Optional[str] = None,
+                      revalidate: bool = False) -> bool:
         """
         Download a file from URL with optional SHA256 verification.
         
+        The body is written to ``<dest>.part`` beside the destination, together
+        with a ``<dest>.part.json`` journal (URL, expected SHA256, bytes received
+        and the server's validator). If the transfer dies, the next attempt -
+        or the next sync - resumes with a Range request instead of starting over.
+        
         Args:
             url: URL to download from
             dest_path: Where to save the file
             expected_sha256: Expected SHA256 hash (optional)
+            revalidate: If dest_path already exists, send a conditional request
+                        using the recorded ETag/Last-Modified; a 304 keeps the
+                        existing file
             
         Returns:
             True if download successful and verified
         """
-        print(f"Downloading: {url}")
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        part_path = dest_path.with_name(dest_path.name + '.part')
+        
+        conditional = {}
+        if revalidate and dest_path.exists():
+            conditional = self._conditional_headers(url, self.cache.metadata(dest_path))
+        
+        validators = self._download(url, part_path, expected_sha256, conditional)
+        if validators.get('failed'):
+            return False
+        
+        if validators.get('not_modified'):
+            if expected_sha256 and self.cached_sha256(dest_path) != expected_sha256:
+                self.progress.warning("Cached file SHA256 mismatch, re-downloading...")
+                return self.download_file(url, dest_path, expected_sha256)
+            self.progress.success("Not modified, using cached file")
+            self.cache.record(dest_path, checked_at=self._current_timestamp())
+            return True
+        
+        # Move to destination (a rename keeps the fingerprint of the hashed file)
+        os.replace(part_path, dest_path)
+        self.cache.record(dest_path, fingerprint=self._fingerprint(dest_path),
+                          **self._download_metadata(url, validators))
+        return True
+    
+    def fetch_object(self, url: str, expected_sha256: Optional[str] = None,
+                     key: Optional[str] = None, revalidate: bool = False,
+                     deltas: Optional[Dict] = None, size: Optional[int] = None,
+                     ref: Optional[str] = None) -> Optional[str]:
+        """
+        Make sure the asset at ``url`` is in the content-addressed cache.
         
+        With an expected SHA256 an existing object is a cache hit without any
+        network access, and a missing one may come from any source - mirrors,
+        local bundles or ``url`` - tried fastest first (see sources.py). A
+        source failing mid-transfer hands over to the next, which resumes the
+        partial file. Without a SHA256, only ``url`` is used, and the object
+        last fetched for ``key`` is revalidated with a conditional request
+        when ``revalidate`` is set.
+        
+        Args:
+            url: URL to download from
+            expected_sha256: Expected SHA256 hash (optional)
+            key: Manifest key to bind the object to (e.g. 'fzf/linux/amd64')
+            revalidate: Re-check an existing object with the server
+            deltas: The manifest entry's ``delta`` map ({old sha256: delta
+                    URL or {'url', 'sha256'}}); on a cache miss, a delta from
+                    a cached older object is tried before the full download
+            size: Expected asset size in bytes, used to rank sources
+            ref: 'tool@tag' reference to record for the object (pins protect
+                 referenced objects from eviction)
+            
+        Returns:
+            SHA256 of the cached object, or None on failure
+        """
+        import hashlib
+        
+        # Stable staging name so an interrupted download is resumed next time
+        staging_name = expected_sha256 or hashlib.sha256(url.encode()).hexdigest()
+        
+        # One download per object across processes: a second sync waits for
+        # the first and then finds the object in the cache
+        lock = self.cache.lock(staging_name)
+        if not lock.acquire(blocking=False):
+            self.progress.info(f"Waiting for another dotbins process to download {url.rsplit('/', 1)[-1]}...")
+            lock.acquire()
         try:
-            # Download to temporary file first
-            with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-                tmp_path = Path(tmp_file.name)
-                
-                # Download with progress indication
-                with urllib.request.urlopen(url, timeout=30) as response:
-                    total_size = int(response.headers.get('content-length', 0))
-                    downloaded = 0
-                    chunk_size = 8192
+            return self._fetch_object_locked(url, staging_name, expected_sha256, key, revalidate,
+                                             deltas, size, ref)
+        finally:
+            lock.release()
+    
+    def _fetch_object_locked(self, url: str, staging_name: str, expected_sha256: Optional[str],
+                             key: Optional[str], revalidate: bool,
+                             deltas: Optional[Dict] = None, size: Optional[int] = None,
+                             ref: Optional[str] = None) -> Optional[str]:
+        """fetch_object() body, run while holding the object's download lock."""
+        known_sha256 = expected_sha256 or (key and self.cache.lookup(key))
+        
+        if known_sha256 and self.cache.has(known_sha256):
+            object_path = self.cache.object_path(known_sha256)
+            if not revalidate:
+                if self.cached_sha256(object_path) == known_sha256:
+                    self.progress.success(f"Using cached object: {known_sha256[:12]}")
+                    if key:
+                        self.cache.bind(key, known_sha256)
+                    self.cache.touch(known_sha256, ref=ref)
+                    return known_sha256
+                self.progress.warning("Cached file SHA256 mismatch, re-downloading...")
+                self.cache.remove(known_sha256)
+                conditional = {}
+            else:
+                conditional = self._conditional_headers(url, self.cache.metadata(object_path))
+        else:
+            conditional = {}
+        
+        part_path = self.cache.staging_dir / f"{staging_name}.part"
+        part_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        if expected_sha256 and not conditional:
+            sources = self._candidate_sources(url, expected_sha256, size)
+            
+            # A delta saves bandwidth unless a mirror or bundle makes the full asset cheap
+            if deltas and (not sources or sources[0].kind == 'upstream'):
+                sha256 = self._fetch_delta(url, expected_sha256, deltas, key, ref)
+                if sha256:
+                    return sha256
+            
+            result = self._download_from_sources(sources, part_path, expected_sha256)
+            if result is None:
+                return None
+            source, validators = result
+            return self._store_object(url, part_path, validators, key, ref,
+                                      source_url=source.location)
+        
+        validators = self._download(url, part_path, expected_sha256, conditional)
+        if validators.get('failed'):
+            return None
+        
+        if validators.get('not_modified'):
+            object_path = self.cache.object_path(known_sha256)
+            if self.cached_sha256(object_path) != known_sha256:
+                self.progress.warning("Cached file SHA256 mismatch, re-downloading...")
+                self.cache.remove(known_sha256)
+                return self._fetch_object_locked(url, staging_name, expected_sha256, key, False,
+                                                 ref=ref)
+            self.progress.success("Not modified, using cached object")
+            self.cache.record(object_path, checked_at=self._current_timestamp())
+            if key:
+                self.cache.bind(key, known_sha256)
+            self.cache.touch(known_sha256, ref=ref)
+            return known_sha256
+        
+        return self._store_object(url, part_path, validators, key, ref)
+    
+    def _store_object(self, url: str, part_path: Path, validators: Dict, key: Optional[str],
+                      ref: Optional[str] = None, source_url: Optional[str] = None) -> str:
+        """Move a verified download into the cache and bind it to its key."""
+        sha256 = validators['sha256']
+        # Validators belong to the URL they came from, so a mirror's ETag is
+        # never sent to upstream on revalidation
+        metadata = self._download_metadata(source_url or url, validators)
+        metadata['asset'] = url.rsplit('/', 1)[-1]
+        metadata['fingerprint'] = self._fingerprint(part_path)
+        self.cache.add(part_path, sha256, metadata, ref=ref)
+        if key:
+            self.cache.bind(key, sha256)
+        return sha256
+    
+    def _fetch_delta(self, url: str, expected_sha256: str, deltas: Dict,
+                     key: Optional[str], ref: Optional[str] = None) -> Optional[str]:
+        """
+        Build an object by patching a cached older object (see delta.py).
+        
+        Returns:
+            SHA256 of the new object, or None if no delta applies or patching
+            failed (the caller then downloads the full asset)
+        """
+        try:
+            from .delta import DeltaError, apply_delta, read_header
+        except ImportError:
+            from delta import DeltaError, apply_delta, read_header
+        
+        for base_sha256, source in deltas.items():
+            if isinstance(source, str):
+                source = {'url': source}
+            if not source.get('url') or not self.cache.has(base_sha256):
+                continue
+            base_path = self.cache.object_path(base_sha256)
+            if self.cached_sha256(base_path) != base_sha256:
+                continue
+            
+            self.progress.info(f"Patching cached object {base_sha256[:12]} with a delta")
+            delta_part = self.cache.staging_dir / f"{expected_sha256}.delta.part"
+            patched_path = self.cache.staging_dir / f"{expected_sha256}.patched"
+            delta_part.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                result = self._download_from_sources(
+                    self._candidate_sources(source['url'], source.get('sha256')),
+                    delta_part, source.get('sha256')
+                )
+                if result is None:
+                    continue
+                validators = result[1]
+                header = read_header(delta_part)
+                if header['old_sha256'] != base_sha256 or header['new_sha256'] != expected_sha256:
+                    raise DeltaError("Delta was made for different files")
+                sha256 = apply_delta(base_path, delta_part, patched_path)
+            except (OSError, DeltaError) as e:
+                self.progress.warning(f"Delta failed ({e}), downloading the full asset")
+                continue
+            finally:
+                self._discard_partial(delta_part)
+            
+            self.progress.success(f"Patched with {validators['size']} bytes, SHA256 verified")
+            now = self._current_timestamp()
+            self.cache.add(patched_path, sha256, {
+                'url': url,
+                'asset': url.rsplit('/', 1)[-1],
+                'sha256': sha256,
+                'size': patched_path.stat().st_size,
+                'fingerprint': self._fingerprint(patched_path),
+                'checked_at': now,
+                'verified_at': now,
+                'delta_from': base_sha256,
+                'delta_size': validators['size']
+            }, ref=ref)
+            if key:
+                self.cache.bind(key, sha256)
+            return sha256
+        
+        return None
+    
+    def _candidate_sources(self, url: str, sha256: Optional[str],
+                           size: Optional[int] = None) -> List[Source]:
+        """
+        List the sources an asset can be fetched from, fastest first.
+        
+        Mirrors and bundles are content-addressed, so they are only candidates
+        when the SHA256 is known.
+        """
+        sources = []
+        if sha256:
+            asset_name = url.rsplit('/', 1)[-1] if url else None
+            for mirror in self.mirrors:
+                sources.append(Source('mirror', mirror, f"{mirror}/objects/{sha256}"))
+            for bundle in self.bundles:
+                bundle_path = self._bundle_object(Path(bundle), sha256, asset_name)
+                if bundle_path:
+                    sources.append(Source('bundle', bundle, str(bundle_path)))
+        if url:
+            from urllib.parse import urlsplit
+            sources.append(Source('upstream', f"upstream:{urlsplit(url).netloc}", url))
+        return self.sources.rank(sources, size)
+    
+    def _bundle_object(self, bundle: Path, sha256: str, asset_name: Optional[str]) -> Optional[Path]:
+        """Find an asset in a bundle directory (cache layout, by SHA256 or by asset name)."""
+        candidates = [bundle / 'objects' / sha256[:2] / sha256, bundle / sha256]
+        if asset_name:
+            candidates.append(bundle / asset_name)
+        for candidate in candidates:
+            if candidate.is_file():
+                return candidate
+        return None
+    
+    def _download_from_sources(self, sources: List[Source], part_path: Path,
+                               expected_sha256: Optional[str]) -> Optional[Tuple[Source, Dict]]:
+        """
+        Fetch into ``part_path`` from the first source that delivers a verified file.
+        
+        Every attempt updates the source's statistics, so the ranking adapts
+        within a run as well as across runs. A source that doesn't have the
+        object (a mirror's 404) only records a miss; errors bench the source.
+        A network source that dies keeps its partial file, and the next source
+        resumes it (the SHA256, not the URL, identifies the bytes).
+        
+        Returns:
+            (source used, validators), or None if every source failed
+        """
+        for position, source in enumerate(sources):
+            if source.kind == 'bundle':
+                validators = self._copy_from_bundle(Path(source.location), part_path, expected_sha256)
+            else:
+                validators = self._download(source.location, part_path, expected_sha256, {})
+            
+            if not validators.get('failed'):
+                self.sources.record_success(source, validators.get('latency'),
+                                            validators.get('throughput'))
+                return source, validators
+            
+            if validators['failed'] == FAILED_MISSING:
+                # A content-addressed source without the object is healthy, just incomplete
+                self.sources.record_miss(source)
+                problem = "doesn't have it"
+            else:
+                self.sources.record_failure(source)
+                problem = "failed"
+            if position + 1 < len(sources):
+                self.progress.warning(f"Source {source.name} {problem}, trying {sources[position + 1].name}")
+        return None
+    
+    def _copy_from_bundle(self, bundle_path: Path, part_path: Path,
+                          expected_sha256: Optional[str]) -> Dict:
+        """Copy an asset out of a local bundle, hashing it on the way (see _download for the result)."""
+        import hashlib
+        
+        self.progress.info(f"Copying from bundle: {bundle_path}")
+        self._discard_partial(part_path)
+        sha256 = hashlib.sha256()
+        started = time.monotonic()
+        size = 0
+        try:
+            with open(bundle_path, 'rb') as src, open(part_path, 'wb') as dst:
+                while chunk := src.read(EXTRACT_CHUNK_SIZE):
+                    dst.write(chunk)
+                    sha256.update(chunk)
+                    size += len(chunk)
+        except OSError as e:
+            self.progress.error(f"Failed to copy from bundle: {e}")
+            self._discard_partial(part_path)
+            return {'failed': FAILED_ERROR}
+        elapsed = time.monotonic() - started
+        
+        if expected_sha256 and sha256.hexdigest() != expected_sha256:
+            self.progress.error(f"SHA256 mismatch in bundle file {bundle_path}")
+            self._discard_partial(part_path)
+            return {'failed': FAILED_ERROR}
+        
+        return {
+            'etag': None,
+            'last_modified': None,
+            'sha256': sha256.hexdigest(),
+            'size': size,
+            'latency': 0.0,
+            'throughput': size / elapsed if elapsed > 0 else None
+        }
+    
+    def _download(self, url: str, part_path: Path, expected_sha256: Optional[str],
+                  conditional: Dict[str, str]) -> Dict:
+        """
+        Download ``url`` into ``part_path`` with retries and verify it.
+        
+        Returns:
+            Validators and digest of the verified partial file (or
+            {'not_modified': True}); on failure {'failed': FAILED_MISSING} or
+            {'failed': FAILED_ERROR}
+        """
+        import http.client
+        try:
+            from .transport import TransportError
+        except ImportError:
+            from transport import TransportError
+        
+        self.progress.info(f"Downloading: {url}")
+        self.progress.phase('download')
+        
+        for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+            received_before = part_path.stat().st_size if part_path.exists() else 0
+            try:
+                validators = self._transfer(url, part_path, expected_sha256, conditional)
+                if validators.get('failed'):
+                    return validators
+                break
+            except (OSError, http.client.HTTPException, TransportError) as e:
+                self.progress.error(f"Failed to download: {e}")
+                # Only retry when the attempt made progress; the partial file is kept
+                received = part_path.stat().st_size if part_path.exists() else 0
+                if attempt == DOWNLOAD_ATTEMPTS or received <= received_before:
+                    return {'failed': FAILED_ERROR}
+                self.progress.info(f"Retrying from {received} bytes ({attempt}/{DOWNLOAD_ATTEMPTS - 1})...")
+            except Exception as e:
+                self.progress.error(str(e))
+                return {'failed': FAILED_ERROR}
+        
+        if validators.get('not_modified'):
+            return validators
+        
+        # Verify SHA256 if provided (hashed while streaming, no re-read)
+        if expected_sha256:
+            actual_sha256 = validators['sha256']
+            if actual_sha256 != expected_sha256:
+                self.progress.error(f"SHA256 mismatch!\n  Expected: {expected_sha256}\n"
+                                    f"  Got:      {actual_sha256}")
+                self._discard_partial(part_path)
+                self.transport.forget_redirect(url)
+                return {'failed': FAILED_ERROR}
+            self.progress.success("SHA256 verified")
+        
+        self._journal_path(part_path).unlink(missing_ok=True)
+        return validators
+    
+    def _download_metadata(self, url: str, validators: Dict) -> Dict:
+        """Build the cache metadata recorded for a completed download."""
+        now = self._current_timestamp()
+        return {
+            'url': url,
+            'etag': validators.get('etag'),
+            'last_modified': validators.get('last_modified'),
+            'sha256': validators['sha256'],
+            'size': validators['size'],
+            'checked_at': now,
+            'verified_at': now
+        }
+    
+    def _conditional_headers(self, url: str, meta: Dict) -> Dict[str, str]:
+        """Build If-None-Match/If-Modified-Since headers from cache metadata."""
+        if meta.get('url') != url:
+            return {}
+        
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+    
+    def _transfer(self, url: str, part_path: Path, expected_sha256: Optional[str],
+                  conditional: Optional[Dict[str, str]] = None) -> Dict:
+        """
+        Fetch the body of ``url`` into ``part_path``, resuming if possible.
+        
+        Args:
+            conditional: Validator headers to send when not resuming
+        
+        Returns:
+            The response validators plus the streamed digest ({'etag',
+            'last_modified', 'sha256', 'size'}, or {'not_modified': True} on a
+            304) once the full body was received, {'failed': kind} on an HTTP
+            error. Network errors are raised with the partial file left in place.
+        """
+        journal_path = self._journal_path(part_path)
+        journal = self._read_journal(journal_path)
+        
+        # A partial file is resumed from any source when the SHA256 pins the
+        # content (it is verified at the end); otherwise only from its own URL
+        same_url = journal.get('url') == url
+        offset = 0
+        if part_path.exists():
+            if journal.get('sha256') == expected_sha256 and (expected_sha256 or same_url):
+                offset = part_path.stat().st_size
+                # A killed download may leave preallocated space past its last checkpoint
+                received = journal.get('received')
+                if isinstance(received, int) and 0 <= received < offset:
+                    os.truncate(part_path, received)
+                    offset = received
+            else:
+                self._discard_partial(part_path)
+        
+        headers = {}
+        if offset:
+            headers['Range'] = f"bytes={offset}-"
+            if journal.get('validator') and same_url:
+                headers['If-Range'] = journal['validator']
+        elif conditional:
+            headers.update(conditional)
+        
+        request_started = time.monotonic()
+        with self.transport.request(url, headers) as response:
+            headers_at = time.monotonic()
+            if response.status == 304 and not offset and conditional:
+                response.drain()
+                return {'not_modified': True}
+            elif response.status == 206 and offset:
+                content_range = response.headers.get('Content-Range', '')
+                if not content_range.startswith(f"bytes {offset}-"):
+                    self.progress.error(f"Unexpected Content-Range: {content_range}")
+                    self._discard_partial(part_path)
+                    return {'failed': FAILED_ERROR}
+                self.progress.info(f"Resuming download at {offset} bytes")
+                # Positioned writes, not append: preallocation moves the end of file
+                mode = 'r+b'
+            elif response.status == 200:
+                offset = 0
+                mode = 'wb'
+            elif response.status == 416 and offset:
+                # Partial file doesn't fit the remote file any more; start over
+                response.drain()
+                self._discard_partial(part_path)
+                return self._transfer(url, part_path, expected_sha256)
+            else:
+                self.progress.error(f"Failed to download: HTTP {response.status} {response.reason}")
+                return {'failed': FAILED_MISSING if response.status in (404, 410) else FAILED_ERROR}
+            
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            
+            # Weak ETags can't be used with If-Range
+            validator = etag if etag and not etag.startswith('W/') else last_modified
+            
+            content_length = int(response.headers.get('content-length', 0))
+            total_size = offset + content_length if content_length else 0
+            downloaded = offset
+            
+            def checkpoint():
+                self._write_journal(journal_path, {
+                    'url': url,
+                    'sha256': expected_sha256,
+                    'received': downloaded,
+                    'total': total_size,
+                    'validator': validator,
+                    'updated_at': self._current_timestamp()
+                })
+            
+            # Hash as we go; a resumed download only re-reads the existing prefix
+            import hashlib
+            sha256 = hashlib.sha256()
+            if offset:
+                self._hash_file(part_path, sha256)
+            
+            checkpoint()
+            with open(part_path, mode) as f:
+                f.seek(offset)
+                preallocated = self._preallocate(f, offset, content_length)
+                try:
+                    # Read straight into one reused buffer: no bytes object per chunk
+                    buffer = bytearray(MAX_READ_SIZE)
+                    view = memoryview(buffer)
+                    read_size = MIN_READ_SIZE
+                    next_checkpoint = downloaded + JOURNAL_INTERVAL
                     
                     while True:
-                        chunk = response.read(chunk_size)
-                        if not chunk:
+                        read_started = time.monotonic()
+                        n = response.readinto(view[:read_size])
+                        if not n:
                             break
-                        tmp_file.write(chunk)
-                        downloaded += len(chunk)
+                        read_time = time.monotonic() - read_started
+                        f.write(view[:n])
+                        sha256.update(view[:n])
+                        downloaded += n
                         
-                        if total_size > 0:
-                            percent = (downloaded / total_size) * 100
-                            print(f"\rProgress: {percent:.1f}%", end='', flush=True)
-                    
-                    if total_size > 0:
-                        print()  # New line after progress
-            
-            # Verify SHA256 if provided
-            if expected_sha256:
-                actual_sha256 = self.calculate_sha256(tmp_path)
-                if actual_sha256 != expected_sha256:
-                    print(f"ERROR: SHA256 mismatch!")
-                    print(f"  Expected: {expected_sha256}")
-                    print(f"  Got:      {actual_sha256}")
-                    tmp_path.unlink()
-                    return False
-                print("✓ SHA256 verified")
-            
-            # Move to destination
-            dest_path.parent.mkdir(parents=True, exist_ok=True)
-            shutil.move(str(tmp_path), str(dest_path))
-            return True
+                        # Grow reads on a fast link, shrink them again when a read stalls
+                        if n == read_size and read_time < READ_TARGET_SECONDS / 2:
+                            read_size = min(read_size * 2, MAX_READ_SIZE)
+                        elif read_time > READ_TARGET_SECONDS * 2:
+                            read_size = max(read_size // 2, MIN_READ_SIZE)
+                        
+                        if downloaded >= next_checkpoint:
+                            checkpoint()
+                            next_checkpoint = downloaded + JOURNAL_INTERVAL
+                        
+                        self.progress.advance(downloaded, total_size)
+                finally:
+                    if preallocated and downloaded < total_size:
+                        # Keep the file size equal to the bytes received, so a resume starts there
+                        f.truncate(downloaded)
+                    f.flush()
+                    checkpoint()
             
-        except urllib.error.URLError as e:
-            print(f"ERROR: Failed to download: {e}")
+            if total_size and downloaded < total_size:
+                import http.client
+                raise http.client.IncompleteRead(b'', total_size - downloaded)
+        
+        elapsed = time.monotonic() - headers_at
+        received = downloaded - offset
+        
+        # A resumed body is validated by If-Range, so the journal's validator still applies
+        if offset and same_url and not etag and not last_modified:
+            etag = journal.get('validator')
+        
+        return {
+            'etag': etag,
+            'last_modified': last_modified,
+            'sha256': sha256.hexdigest(),
+            'size': downloaded,
+            'latency': headers_at - request_started,
+            'throughput': received / elapsed if received >= MIN_THROUGHPUT_SAMPLE and elapsed > 0 else None
+        }
+    
+    def _preallocate(self, f, offset: int, length: int) -> bool:
+        """
+        Reserve disk space for the rest of a download whose length is known.
+        
+        Allocating up front keeps the file in few extents and turns a full
+        disk into an error before the transfer rather than halfway through it.
+        
+        Returns:
+            True if the space was allocated (the file now extends past offset)
+        """
+        if not length or not hasattr(os, 'posix_fallocate'):
             return False
-        except Exception as e:
-            print(f"ERROR: {e}")
+        try:
+            os.posix_fallocate(f.fileno(), offset, length)
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                raise
+            # Not supported by this filesystem; the writes allocate as they go
             return False
+        return True
+    
+    def _journal_path(self, part_path: Path) -> Path:
+        """Get the journal sidecar for a partial download."""
+        return part_path.with_name(part_path.name + '.json')
+    
+    def _read_journal(self, journal_path: Path) -> Dict:
+        """Load a partial-download journal (empty if missing or corrupt)."""
+        try:
+            with open(journal_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _write_journal(self, journal_path: Path, journal: Dict):
+        """Atomically write a partial-download journal."""
+        tmp_path = journal_path.with_name(journal_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(journal, f)
+        os.replace(tmp_path, journal_path)
+    
+    def _discard_partial(self, part_path: Path):
+        """Remove a partial download and its journal."""
+        part_path.unlink(missing_ok=True)
+        self._journal_path(part_path).unlink(missing_ok=True)
     
     def calculate_sha256(self, file_path: Path) -> str:
         """Calculate SHA256 hash of a file."""
-        sha256 = hashlib.sha256()
+        import hashlib
+        return self._hash_file(file_path, hashlib.sha256()).hexdigest()
+    
+    def _hash_file(self, file_path: Path, hasher):
+        """Feed a file's contents into a hash object."""
         with open(file_path, 'rb') as f:
-            while chunk := f.read(8192):
-                sha256.update(chunk)
-        return sha256.hexdigest()
+            while chunk := f.read(65536):
+                hasher.update(chunk)
+        return hasher
     
-    def extract_binary(self, archive_path: Path, binary_path: str, dest_path: Path) -> bool:
+    def cached_sha256(self, file_path: Path) -> str:
+        """
+        Get the SHA256 of a cached file, preferring the verified digest in the
+        cache index over re-reading the file.
+        
+        The recorded digest is trusted only while the file's stat fingerprint
+        (size, mtime_ns, inode) is unchanged since it was verified; otherwise -
+        or always, in paranoid mode - the file is re-hashed and the new
+        fingerprint recorded.
+        """
+        meta = self.cache.metadata(file_path)
+        fingerprint = self._fingerprint(file_path)
+        if not self.paranoid and meta.get('sha256') and meta.get('fingerprint') == fingerprint:
+            return meta['sha256']
+        
+        actual = self.calculate_sha256(file_path)
+        self.cache.record(
+            file_path,
+            sha256=actual,
+            size=fingerprint[0],
+            fingerprint=fingerprint,
+            verified_at=self._current_timestamp()
+        )
+        return actual
+    
+    def _fingerprint(self, file_path: Path) -> List[int]:
+        """Get the (size, mtime_ns, inode) stat fingerprint of a file."""
+        st = file_path.stat()
+        return [st.st_size, st.st_mtime_ns, st.st_ino]
+    
+    def extract_binary(self, archive_path: Path, binary_path: str, dest_path: Path,
+                       archive_name: Optional[str] = None) -> bool:
         """
         Extract a binary from an archive.
         
@@ -150,74 +968,226 @@ class BinaryDownloader:
             archive_path: Path to the archive file
             binary_path: Path within archive (supports wildcards with *)
             dest_path: Where to save the extracted binary
+            archive_name: File name used to detect the archive type (default:
+                          archive_path's name; cache objects are named by hash)
             
         Returns:
             True if extraction successful
         """
-        print(f"Extracting binary...")
+        return self.extract_binaries(archive_path, [(binary_path, dest_path)], archive_name)
+    
+    def extract_binaries(self, archive_path: Path, targets: List[Tuple[str, Path]],
+                         archive_name: Optional[str] = None) -> bool:
+        """
+        Extract several binaries from an archive in a single pass.
+        
+        Args:
+            archive_path: Path to the archive file
+            targets: (path within archive, destination) pairs; paths support
+                     wildcards with *
+            archive_name: File name used to detect the archive type (default:
+                          archive_path's name; cache objects are named by hash)
+            
+        Returns:
+            True if every target was extracted
+        """
+        self.progress.phase('extract')
+        self.progress.info("Extracting binary...")
+        
+        name = Path(archive_name or archive_path.name)
         
         try:
             # Handle tar.gz, tar.bz2, tar.xz
-            if archive_path.suffix in ['.gz', '.bz2', '.xz'] or '.tar' in archive_path.name:
-                return self._extract_from_tar(archive_path, binary_path, dest_path)
+            if name.suffix in ['.gz', '.bz2', '.xz'] or '.tar' in name.name:
+                return self._extract_from_tar(archive_path, targets)
             
             # Handle zip
-            elif archive_path.suffix == '.zip':
-                return self._extract_from_zip(archive_path, binary_path, dest_path)
+            elif name.suffix == '.zip':
+                return self._extract_from_zip(archive_path, targets)
             
             # Handle raw binary (no archive)
             else:
-                shutil.copy(archive_path, dest_path)
-                dest_path.chmod(0o755)
+                if len(targets) != 1:
+                    self.progress.error(f"Raw binary asset can't provide {len(targets)} binaries")
+                    return False
+                method = self._install_file(archive_path, targets[0][1])
+                self.progress.info(f"  Installed by {method}")
                 return True
                 
         except Exception as e:
-            print(f"ERROR: Failed to extract: {e}")
+            self.progress.error(f"Failed to extract: {e}")
             return False
     
-    def _extract_from_tar(self, archive_path: Path, binary_path: str, dest_path: Path) -> bool:
-        """Extract from tar archive."""
+    def _match_target(self, member_name: str, pending: Dict[str, Path]) -> Optional[str]:
+        """Return the first pending pattern a member satisfies."""
+        for pattern in pending:
+            if self._path_matches(member_name, pattern):
+                return pattern
+        return None
+    
+    def _report_missing(self, pending: Dict[str, Path]) -> bool:
+        """Report targets that weren't found; True if there are none."""
+        for pattern in pending:
+            self.progress.error(f"Binary not found in archive: {pattern}")
+        return not pending
+    
+    def _extract_from_tar(self, archive_path: Path, targets: List[Tuple[str, Path]]) -> bool:
+        """
+        Extract from tar archive.
+        
+        Members are read lazily and the scan stops as soon as every target
+        has been found, so the archive is decompressed at most once and only
+        up to the last binary we want.
+        """
+        import tarfile
+        
+        pending = dict(targets)
         with tarfile.open(archive_path, 'r:*') as tar:
-            # Find matching file
-            for member in tar.getmembers():
-                if self._path_matches(member.name, binary_path):
-                    print(f"  Found: {member.name}")
-                    
-                    # Extract to temporary location
-                    with tempfile.TemporaryDirectory() as tmpdir:
-                        tar.extract(member, tmpdir)
-                        extracted = Path(tmpdir) / member.name
-                        
-                        # Move to destination
-                        dest_path.parent.mkdir(parents=True, exist_ok=True)
-                        shutil.copy(extracted, dest_path)
-                        dest_path.chmod(0o755)
-                        return True
+            # Find matching files
+            for member in tar:
+                if not (member.isreg() or member.issym() or member.islnk()):
+                    continue
+                pattern = self._match_target(member.name, pending)
+                if pattern is None:
+                    continue
+                
+                self.progress.info(f"  Found: {member.name}")
+                with tar.extractfile(member) as src:
+                    self._install_stream(src, pending.pop(pattern))
+                if not pending:
+                    break
             
-            print(f"ERROR: Binary not found in archive: {binary_path}")
-            return False
+            return self._report_missing(pending)
     
-    def _extract_from_zip(self, archive_path: Path, binary_path: str, dest_path: Path) -> bool:
+    def _extract_from_zip(self, archive_path: Path, targets: List[Tuple[str, Path]]) -> bool:
         """Extract from zip archive."""
+        import zipfile
+        
+        pending = dict(targets)
         with zipfile.ZipFile(archive_path, 'r') as zf:
-            # Find matching file
-            for member in zf.namelist():
-                if self._path_matches(member, binary_path):
-                    print(f"  Found: {member}")
-                    
-                    # Extract to temporary location
-                    with tempfile.TemporaryDirectory() as tmpdir:
-                        zf.extract(member, tmpdir)
-                        extracted = Path(tmpdir) / member
-                        
-                        # Move to destination
-                        dest_path.parent.mkdir(parents=True, exist_ok=True)
-                        shutil.copy(extracted, dest_path)
-                        dest_path.chmod(0o755)
-                        return True
+            # Find matching files
+            for member in zf.infolist():
+                if member.is_dir():
+                    continue
+                pattern = self._match_target(member.filename, pending)
+                if pattern is None:
+                    continue
+                
+                self.progress.info(f"  Found: {member.filename}")
+                with zf.open(member) as src:
+                    self._install_stream(src, pending.pop(pattern))
+                if not pending:
+                    break
             
-            print(f"ERROR: Binary not found in archive: {binary_path}")
+            return self._report_missing(pending)
+    
+    def _install_stream(self, src, dest_path: Path):
+        """
+        Stream a binary into place.
+        
+        The bytes go to a temporary file beside the destination, which is
+        then renamed over it, so nobody ever sees a half-written binary.
+        """
+        import tempfile
+        
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=dest_path.parent, prefix=f".{dest_path.name}.")
+        try:
+            with os.fdopen(fd, 'wb') as dst:
+                shutil.copyfileobj(src, dst, EXTRACT_CHUNK_SIZE)
+            os.chmod(tmp_name, 0o755)
+            os.replace(tmp_name, dest_path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+    
+    def _install_file(self, src_path: Path, dest_path: Path) -> str:
+        """
+        Install a raw-binary asset without storing or writing its bytes twice
+        where the filesystem allows it.
+        
+        Tries, in order: a reflink (FICLONE on btrfs/xfs: the copy shares the
+        object's extents copy-on-write), a hardlink (only to a read-only file
+        such as a cache object, so the installed binary can't alter it), an
+        in-kernel copy_file_range(), and a streamed copy. As in
+        _install_stream, the result is renamed into place.
+        
+        Returns:
+            Method used: 'reflink', 'hardlink', 'copy_file_range' or 'copy'
+        """
+        if src_path.parent.parent == self.cache.objects_dir:
+            # Objects stored before they were made read-only on add
+            os.chmod(src_path, OBJECT_MODE)
+        
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = dest_path.with_name(f".{dest_path.name}.{os.getpid()}.{threading.get_ident()}")
+        tmp_path.unlink(missing_ok=True)
+        
+        try:
+            with open(src_path, 'rb') as src:
+                if self._reflink(src, tmp_path):
+                    method = 'reflink'
+                elif not os.fstat(src.fileno()).st_mode & 0o222 and self._hardlink(src_path, tmp_path):
+                    # Shares the object's inode and its read-only mode; no chmod
+                    os.replace(tmp_path, dest_path)
+                    return 'hardlink'
+                else:
+                    with open(tmp_path, 'wb') as dst:
+                        if self._copy_file_range(src, dst):
+                            method = 'copy_file_range'
+                        else:
+                            src.seek(0)
+                            shutil.copyfileobj(src, dst, EXTRACT_CHUNK_SIZE)
+                            method = 'copy'
+            os.chmod(tmp_path, 0o755)
+            os.replace(tmp_path, dest_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return method
+    
+    def _reflink(self, src, dest_path: Path) -> bool:
+        """Create dest_path as a copy-on-write clone of the open file src."""
+        if not sys.platform.startswith('linux'):
+            return False
+        import fcntl
+        
+        try:
+            with open(dest_path, 'xb') as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return True
+        except OSError:
+            # EOPNOTSUPP/EINVAL: no reflinks here; EXDEV: another filesystem
+            dest_path.unlink(missing_ok=True)
+            return False
+    
+    def _hardlink(self, src_path: Path, dest_path: Path) -> bool:
+        """Hardlink dest_path to src_path if both are on the same filesystem."""
+        try:
+            os.link(src_path, dest_path)
+            return True
+        except OSError:
+            # EXDEV (another device), EMLINK, or a filesystem without hardlinks
+            return False
+    
+    def _copy_file_range(self, src, dst) -> bool:
+        """Copy the open file src into dst in the kernel; False if unsupported."""
+        if not hasattr(os, 'copy_file_range'):
+            return False
+        remaining = os.fstat(src.fileno()).st_size
+        copied = 0
+        try:
+            while remaining > 0:
+                n = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                if n == 0:
+                    break
+                copied += n
+                remaining -= n
+        except OSError:
+            if copied:
+                raise
             return False
+        return True
     
     def _path_matches(self, path: str, pattern: str) -> bool:
         """Check if path matches pattern (supports * wildcard)."""
@@ -232,7 +1202,8 @@ class BinaryDownloader:
         # For more complex patterns, just check if pattern parts are in path
         return all(part in path for part in parts if part)
     
-    def sync_tool(self, tool_name: str, platform: str, arch: str, force: bool = False) -> bool:
+    def sync_tool(self, tool_name: str, platform: str, arch: str, force: bool = False,
+                  version: Optional[str] = None) -> bool:
         """
         Sync a single tool for a specific platform.
         
@@ -241,120 +1212,451 @@ class BinaryDownloader:
             platform: Operating system (e.g., 'linux', 'macos')
             arch: Architecture (e.g., 'amd64', 'arm64')
             force: Force re-download even if up-to-date
+            version: Release to install (default: the tool's pin, else the
+                     manifest's release; see resolve_entry)
             
         Returns:
             True if sync successful
         """
-        print(f"\n=== Syncing {tool_name} ({platform}/{arch}) ===")
-        
-        # Load manifest
-        manifest = self.load_manifest()
         key = f"{tool_name}/{platform}/{arch}"
+        progress = self.progress
+        progress.start(key, f"Syncing {tool_name} ({platform}/{arch})")
         
-        if key not in manifest:
-            print(f"ERROR: No manifest entry for {key}")
-            return False
+        try:
+            with progress.working_on(key), self.cache.batch():
+                if version is None:
+                    version = self.state_store.pin(tool_name)
+                entry = self.resolve_entry(tool_name, platform, arch, version, pins={})
+                
+                if entry is None:
+                    progress.finish(key, False, self._unresolved_reason(tool_name, platform, arch, version))
+                    return False
+                if version is not None:
+                    progress.info(f"Version {entry.get('tag')} requested")
+                
+                if not entry.get('url'):
+                    progress.finish(key, False, "No URL in manifest")
+                    return False
+                
+                # Check if already up-to-date
+                if not force and self._is_up_to_date(entry, self.state_store.get(key)):
+                    progress.finish(key, True, "Already up-to-date")
+                    return True
+                
+                cache_file = self._fetch_stage(key, entry, force)
+                ok = cache_file is not None and self._install_stage(key, entry, cache_file)
+        except BaseException:
+            progress.finish(key, False)
+            raise
+        
+        progress.finish(key, ok)
+        return ok
+    
+    def _is_up_to_date(self, entry: Dict, info: Optional[Dict]) -> bool:
+        """Check whether a key's installed state already matches its manifest entry."""
+        return info is not None and info.get('sha256') == entry.get('sha256')
+    
+    def _fetch_stage(self, key: str, entry: Dict, force: bool = False) -> Optional[Path]:
+        """
+        Download and verify the archive for a manifest entry.
         
-        entry = manifest[key]
-        url = entry.get('url')
-        sha256 = entry.get('sha256')
-        binary_name = entry.get('binary_name', tool_name)
-        path_in_archive = entry.get('path_in_archive', binary_name)
+        On force, a cached object is revalidated with a conditional request so
+        an unchanged asset only costs a round-trip.
         
-        if not url:
-            print(f"ERROR: No URL in manifest for {key}")
+        Returns:
+            Path to the verified cache object, or None on failure
+        """
+        # Remember which tool version the object belongs to, so pins protect it
+        ref = f"{key.split('/')[0]}@{entry.get('tag', 'latest')}"
+        sha256 = self.fetch_object(entry.get('url'), entry.get('sha256'), key=key, revalidate=force,
+                                   deltas=entry.get('delta'), size=entry.get('size'), ref=ref)
+        if sha256 is None:
+            return None
+        return self.cache.object_path(sha256)
+    
+    def _install_stage(self, key: str, entry: Dict, cache_file: Path) -> bool:
+        """
+        Extract a verified archive into a new store generation, then flip the
+        bin links to it and record state.
+        
+        Binaries are unpacked under ``.store/<platform>/<arch>/<tool>/<generation>/``
+        and ``bin/<binary>`` becomes a symlink swapped in with an atomic
+        rename, so a running shell never sees a half-installed tool and the
+        previous generations stay around for an instant rollback.
+        
+        Returns:
+            True if installation successful
+        """
+        tool_name, platform, arch = key.split('/')
+        asset_name = entry['url'].rsplit('/', 1)[-1]
+        
+        targets = self._binary_targets(tool_name, entry)
+        if targets is None:
             return False
         
-        # Check if already up-to-date
-        state = self.load_state()
-        if not force and key in state:
-            if state[key].get('sha256') == sha256:
-                print("✓ Already up-to-date")
-                return True
+        tag = str(entry.get('tag', 'latest')).replace('/', '_')
+        generation = f"{tag}-{cache_file.name[:12]}"
+        gen_dir = self._store_dir(key) / generation
         
-        # Determine cache file name
-        cache_filename = f"{tool_name}-{entry.get('tag', 'latest')}-{platform}-{arch}"
-        if url.endswith('.tar.gz'):
-            cache_filename += '.tar.gz'
-        elif url.endswith('.tar.bz2'):
-            cache_filename += '.tar.bz2'
-        elif url.endswith('.tar.xz'):
-            cache_filename += '.tar.xz'
-        elif url.endswith('.zip'):
-            cache_filename += '.zip'
-        
-        cache_file = self.cache_dir / cache_filename
-        
-        # Download if not cached or force
-        if force or not cache_file.exists():
-            if not self.download_file(url, cache_file, sha256):
+        # Another dotbins process may be installing the same tool
+        with self.install_lock(key):
+            # Unpack into a private directory, then move it into place in one rename
+            staging = gen_dir.with_name(f".{generation}.{os.getpid()}.{threading.get_ident()}")
+            staged = [(pattern, staging / binary_name) for binary_name, pattern in targets]
+            if not self.extract_binaries(cache_file, staged, archive_name=asset_name):
+                shutil.rmtree(staging, ignore_errors=True)
                 return False
+            self._commit_generation(staging, gen_dir)
+            
+            binaries = [binary_name for binary_name, _ in targets]
+            # An upgrade may drop or rename binaries: unlink what only the old generation had
+            previous = (self.state_store.get(key) or {}).get('binaries')
+            self._activate(key, gen_dir, binaries, previous=previous)
+            
+            # Update state
+            self._record_install(key, {
+                'sha256': entry.get('sha256'),
+                'object': cache_file.name,
+                'url': entry.get('url'),
+                'tag': entry.get('tag'),
+                'binaries': binaries,
+                'generation': generation,
+                'installed_at': self._current_timestamp()
+            }, tag=entry.get('tag'))
+        
+        return True
+    
+    def install_lock(self, key: str) -> FileLock:
+        """
+        Cross-process lock held while a tool's generations or state entry change.
+        
+        Lock order: the install lock first, then ``_state_lock`` (taken inside
+        for the state write itself), never the other way around.
+        """
+        return FileLock(self.cache.locks_dir / f"install-{key.replace('/', '-')}.lock")
+    
+    def _store_dir(self, key: str) -> Path:
+        """Directory holding the installed generations of a tool."""
+        tool_name, platform, arch = key.split('/')
+        return self.dotbins_dir / '.store' / platform / arch / tool_name
+    
+    def _commit_generation(self, staging: Path, gen_dir: Path):
+        """Atomically move a freshly unpacked generation into place."""
+        if gen_dir.exists():
+            # Reinstall of the same generation: swap the old one out first
+            old = gen_dir.with_name(f".{gen_dir.name}.old.{os.getpid()}.{threading.get_ident()}")
+            os.rename(gen_dir, old)
+            os.rename(staging, gen_dir)
+            shutil.rmtree(old, ignore_errors=True)
         else:
-            print(f"✓ Using cached file: {cache_file.name}")
-            # Verify cached file
-            if sha256:
-                actual = self.calculate_sha256(cache_file)
-                if actual != sha256:
-                    print("WARNING: Cached file SHA256 mismatch, re-downloading...")
-                    if not self.download_file(url, cache_file, sha256):
-                        return False
-        
-        # Extract to binary location
+            os.rename(staging, gen_dir)
+    
+    def _activate(self, key: str, gen_dir: Path, binaries: List[str], previous: Optional[List[str]] = None):
+        """Point bin/<binary> at a generation and record the binaries' integrity."""
+        _, platform, arch = key.split('/')
         bin_dir = self.dotbins_dir / platform / arch / 'bin'
         bin_dir.mkdir(parents=True, exist_ok=True)
-        bin_path = bin_dir / binary_name
         
-        if not self.extract_binary(cache_file, path_in_archive, bin_path):
-            return False
+        for binary_name in binaries:
+            bin_path = bin_dir / binary_name
+            self._link_binary(gen_dir / binary_name, bin_path)
+            self.integrity.record(bin_path, key=key)
+            self.progress.success(f"Installed to: {bin_path}")
         
-        print(f"✓ Installed to: {bin_path}")
+        # Drop links for binaries the activated generation doesn't provide
+        for binary_name in set(previous or []) - set(binaries):
+            bin_path = bin_dir / binary_name
+            if bin_path.is_symlink():
+                bin_path.unlink()
+                self.integrity.forget(bin_path)
+    
+    def _link_binary(self, target: Path, bin_path: Path):
+        """
+        Atomically point bin_path at target.
         
-        # Update state
-        state[key] = {
-            'sha256': sha256,
-            'url': url,
-            'installed_at': self._current_timestamp()
-        }
-        self.save_state(state)
+        Uses a relative symlink swapped in with os.replace; where symlinks
+        aren't available, falls back to a hardlink and then to a copy.
+        """
+        tmp_path = bin_path.with_name(f".{bin_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.unlink(missing_ok=True)
+        try:
+            os.symlink(os.path.relpath(target, bin_path.parent), tmp_path)
+        except (OSError, NotImplementedError):
+            try:
+                os.link(target, tmp_path)
+            except OSError:
+                shutil.copy2(target, tmp_path)
+        os.replace(tmp_path, bin_path)
+    
+    def _record_install(self, key: str, info: Dict, tag: Optional[str] = None):
+        """Record an installed generation in state and prune old generations."""
+        with self._state_lock:
+            previous = self.state_store.get(key) or {}
+            
+            generation = {
+                'id': info['generation'],
+                'tag': tag,
+                'sha256': info.get('sha256'),
+                'object': info.get('object'),
+                'url': info.get('url'),
+                'binaries': info['binaries'],
+                'installed_at': info['installed_at']
+            }
+            generations = [generation] + [g for g in previous.get('generations', [])
+                                          if g['id'] != generation['id']]
+            kept, dropped = generations[:self.keep_generations], generations[self.keep_generations:]
+            
+            self.state_store.put(key, dict(info, generations=kept))
+            self.state_store.record_event(key, 'install', tag=tag, generation=generation['id'],
+                                          sha256=info.get('sha256'))
+        
+        for old in dropped:
+            shutil.rmtree(self._store_dir(key) / old['id'], ignore_errors=True)
+    
+    def activate_generation(self, key: str, generation_id: Optional[str] = None) -> bool:
+        """
+        Switch an installed tool to another retained generation (no network).
+        
+        Args:
+            key: Manifest key (e.g. 'fzf/linux/amd64')
+            generation_id: Generation to activate (default: the one installed
+                           before the current generation)
+            
+        Returns:
+            True if the generation was activated
+        """
+        with self.install_lock(key):
+            # Writers of this key's state hold its install lock, so the read stays current
+            info = self.state_store.get(key)
+            if not info or not info.get('generations'):
+                self.progress.error(f"No installed generations for {key}")
+                return False
+            
+            generations = info['generations']
+            ids = [g['id'] for g in generations]
+            if generation_id is None:
+                current = ids.index(info['generation']) if info.get('generation') in ids else 0
+                if current + 1 >= len(ids):
+                    self.progress.error(f"No previous generation of {key} to roll back to")
+                    return False
+                generation_id = ids[current + 1]
+            
+            if generation_id not in ids:
+                self.progress.error(f"Unknown generation for {key}: {generation_id}")
+                return False
+            
+            target = generations[ids.index(generation_id)]
+            gen_dir = self._store_dir(key) / generation_id
+            if not gen_dir.is_dir():
+                self.progress.error(f"Generation directory missing: {gen_dir}")
+                return False
+            
+            self._activate(key, gen_dir, target['binaries'], previous=info.get('binaries'))
+            
+            info.update({
+                'sha256': target.get('sha256'),
+                'object': target.get('object'),
+                'url': target.get('url'),
+                'tag': target.get('tag'),
+                'binaries': target['binaries'],
+                'generation': generation_id,
+                'installed_at': self._current_timestamp()
+            })
+            with self._state_lock:
+                self.state_store.put(key, info)
+                self.state_store.record_event(key, 'activate', tag=target.get('tag'),
+                                              generation=generation_id, sha256=target.get('sha256'))
         
+        self.progress.success(f"{key} now at generation {generation_id}")
         return True
     
-    def sync_all(self, current_platform_only: bool = False, force: bool = False) -> Dict[str, bool]:
+    def remove_generations(self, key: str):
+        """Delete every stored generation of a tool."""
+        shutil.rmtree(self._store_dir(key), ignore_errors=True)
+    
+    def _binary_targets(self, tool_name: str, entry: Dict) -> Optional[List[Tuple[str, str]]]:
+        """
+        Resolve the binaries a manifest entry provides.
+        
+        ``binary_name`` and ``path_in_archive`` come from the manifest entry,
+        falling back to the tool's dotbins.yaml config, and may each be a
+        single string or a list (e.g. uv ships both ``uv`` and ``uvx``).
+        
+        Returns:
+            List of (binary name, path in archive) pairs, or None if the
+            lists don't line up
+        """
+        spec = self.load_config().get(tool_name)
+        spec = spec if isinstance(spec, dict) else {}
+        
+        binary_names = entry.get('binary_name', spec.get('binary_name', tool_name))
+        paths = entry.get('path_in_archive', spec.get('path_in_archive', binary_names))
+        
+        if isinstance(binary_names, str):
+            binary_names = [binary_names]
+        if isinstance(paths, str):
+            paths = [paths]
+        
+        if len(binary_names) != len(paths):
+            self.progress.error(f"{tool_name}: binary_name and path_in_archive lengths differ")
+            return None
+        
+        return list(zip(binary_names, paths))
+    
+    def load_config(self) -> Dict:
+        """
+        Load the tool definitions from dotbins.yaml (requires PyYAML).
+        
+        Returns:
+            Dictionary mapping tool names to their config (empty if the
+            config or PyYAML is unavailable)
+        """
+        if self._config is None:
+            self._config = {}
+            config_path = self.dotbins_dir / 'dotbins.yaml'
+            try:
+                import yaml
+                with open(config_path, 'r') as f:
+                    self._config = (yaml.safe_load(f) or {}).get('tools') or {}
+            except (ImportError, OSError, ValueError, AttributeError):
+                pass
+        return self._config
+    
+    def _schedule(self, keys: List[str], manifest: Dict) -> List[str]:
+        """
+        Order manifest keys for syncing.
+        
+        Current-platform entries go first so the local machine becomes usable
+        as early as possible, then the largest assets are started first so that
+        long downloads don't end up as stragglers at the tail of the run.
+        """
+        current = '/'.join(self.detect_platform())
+        
+        objects = self.cache.objects()
+        
+        def asset_size(key: str) -> int:
+            size = manifest[key].get('size')
+            if size:
+                return int(size)
+            sha256 = manifest[key].get('sha256') or self.cache.lookup(key)
+            return objects.get(sha256, {}).get('size', 0)
+        
+        return sorted(keys, key=lambda k: (k.split('/', 1)[1] != current, -asset_size(k), k))
+    
+    def sync_all(self, current_platform_only: bool = False, force: bool = False,
+                 jobs: int = DEFAULT_JOBS) -> Dict[str, bool]:
         """
         Sync all tools from manifest.
         
+        Downloads run on a pool of ``jobs`` workers. As soon as an archive has
+        been downloaded and verified it is handed to a smaller install pool, so
+        extraction of one tool overlaps with the downloads of the others.
+        State updates for the whole run are written as one batch.
+        
         Args:
             current_platform_only: Only sync for current platform
             force: Force re-download all
+            jobs: Number of concurrent downloads (1 = sequential)
             
         Returns:
             Dictionary mapping tool keys to success status
         """
-        manifest = self.load_manifest()
-        results = {}
+        catalog = self.catalog()
+        manifest = catalog.manifest
         
-        # Detect current platform if needed
+        # Only the current platform's entries if requested
         if current_platform_only:
-            platform, arch = self.detect_platform()
-            print(f"Syncing for current platform: {platform}/{arch}")
+            curr_platform, curr_arch = self.detect_platform()
+            self.progress.info(f"Syncing for current platform: {curr_platform}/{curr_arch}")
+            keys = catalog.keys(curr_platform, curr_arch)
+        else:
+            keys = catalog.keys()
         
-        for key in manifest:
-            parts = key.split('/')
-            if len(parts) != 3:
-                continue
-            
-            tool_name, platform, arch = parts
+        keys = self._schedule(keys, manifest)
+        
+        with self.state_store.batch():
+            results = self._sync_keys(keys, force, jobs)
+        
+        self.enforce_cache_budget()
+        return results
+    
+    def _sync_keys(self, keys: List[str], force: bool, jobs: int) -> Dict[str, bool]:
+        """
+        Fetch and install manifest keys (in order, at their pinned versions) on the fetch/install pools.
+        
+        Cache bookkeeping (access times, refs, key bindings) is batched into
+        one index write for the whole run.
+        """
+        if jobs <= 1:
+            with self.cache.batch():
+                return {key: self.sync_tool(*key.split('/'), force) for key in keys}
+        
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        
+        results = {}
+        state = self.load_state()
+        pins = self.load_pins()
+        progress = self.progress
+        entries = {}
+        pending = []
+        for key in keys:
+            tool_name, platform, arch = key.split('/')
+            entry = entries[key] = self.resolve_entry(tool_name, platform, arch, pins=pins)
+            if entry is None:
+                progress.finish(key, False, self._unresolved_reason(tool_name, platform, arch,
+                                                                    pins.get(tool_name)))
+                results[key] = False
+            elif not entry.get('url'):
+                progress.finish(key, False, "No URL in manifest")
+                results[key] = False
+            elif not force and self._is_up_to_date(entry, state.get(key)):
+                progress.finish(key, True, "Already up-to-date")
+                results[key] = True
+            else:
+                # Untitled: concurrent output is attributed line by line instead
+                progress.start(key)
+                pending.append(key)
+        
+        with self.cache.batch(), \
+                ThreadPoolExecutor(max_workers=jobs, thread_name_prefix='dotbins-fetch') as fetch_pool, \
+                ThreadPoolExecutor(max_workers=max(1, jobs // 2), thread_name_prefix='dotbins-install') as install_pool:
+            fetches = {
+                fetch_pool.submit(self._run_stage, self._fetch_stage, key, entries[key], force): key
+                for key in pending
+            }
+            installs = {}
             
-            # Skip if not current platform
-            if current_platform_only:
-                curr_platform, curr_arch = self.detect_platform()
-                if platform != curr_platform or arch != curr_arch:
+            for future in as_completed(fetches):
+                key = fetches[future]
+                try:
+                    cache_file = future.result()
+                except Exception as e:
+                    progress.finish(key, False, str(e))
+                    results[key] = False
                     continue
+                
+                if cache_file is None:
+                    progress.finish(key, False)
+                    results[key] = False
+                else:
+                    installs[key] = install_pool.submit(self._run_stage, self._install_stage,
+                                                        key, entries[key], cache_file)
             
-            success = self.sync_tool(tool_name, platform, arch, force)
-            results[key] = success
+            for key, future in installs.items():
+                try:
+                    results[key] = future.result()
+                    progress.finish(key, results[key])
+                except Exception as e:
+                    progress.finish(key, False, str(e))
+                    results[key] = False
         
-        return results
+        progress.close()
+        return {key: results[key] for key in keys}
+    
+    def _run_stage(self, stage, key: str, *args):
+        """Run a pipeline stage on a pool thread, attributing its output to the key's task."""
+        with self.progress.working_on(key):
+            return stage(key, *args)
     
     def detect_platform(self) -> Tuple[str, str]:
         """
@@ -363,6 +1665,8 @@ class BinaryDownloader:
         Returns:
             Tuple of (platform, architecture) e.g., ('linux', 'amd64')
         """
+        import platform as platform_module
+        
         os_name = platform_module.system().lower()
         if os_name == 'darwin':
             os_name = 'macos'
@@ -381,26 +1685,78 @@ class BinaryDownloader:
         """Get current timestamp in ISO format."""
         return datetime.utcnow().isoformat() + 'Z'
     
-    def clean_cache(self, keep_current: bool = True):
+    def protected_objects(self) -> Set[str]:
+        """
+        Get the cached objects that must never be evicted: those referenced by
+        the current state and those belonging to pinned tool versions.
+        """
+        state = self.load_state()
+        protected = {entry.get('object') or entry.get('sha256') for entry in state.values()}
+        
+        pins = self.load_pins()
+        if pins:
+            pinned_refs = {f"{tool}@{tag}" for tool, version in pins.items() for tag in tag_variants(version)}
+            for sha256, meta in self.cache.objects().items():
+                if pinned_refs.intersection(meta.get('refs', [])):
+                    protected.add(sha256)
+        
+        protected.discard(None)
+        return protected
+    
+    def enforce_cache_budget(self, budget: Optional[int] = None) -> List[str]:
+        """
+        Evict least-recently-used cache objects until the cache fits the budget.
+        
+        Objects referenced by the installed state or by pins are always kept.
+        
+        Args:
+            budget: Size limit in bytes (default: the configured cache budget)
+            
+        Returns:
+            Digests of the evicted objects
+        """
+        budget = self.cache_budget if budget is None else budget
+        max_age = self.cache_max_age * 86400 if self.cache_max_age is not None else None
+        objects = self.cache.objects()
+        
+        evicted = self.cache.evict(budget, self.protected_objects(), max_age)
+        for sha256 in evicted:
+            self.progress.info(f"Evicted: {objects.get(sha256, {}).get('asset', sha256)} ({sha256[:12]})")
+        return evicted
+    
+    def clean_cache(self, keep_current: bool = True, budget: Optional[int] = None):
         """
         Clean up cached downloads.
         
         Args:
-            keep_current: Keep files for currently installed versions
+            keep_current: Keep objects referenced by the current state or pins
+            budget: Only evict (least recently used first) down to this many
+                    bytes instead of removing every unreferenced object
         """
         if not self.cache_dir.exists():
             return
         
-        state = self.load_state()
-        current_urls = {entry.get('url') for entry in state.values()}
+        if budget is not None and keep_current:
+            self.enforce_cache_budget(budget)
+        else:
+            current = self.protected_objects() if keep_current else set()
+            
+            for sha256, meta in self.cache.objects().items():
+                if sha256 not in current:
+                    self.progress.info(f"Removing: {meta.get('asset', sha256)} ({sha256[:12]})")
+                    self.cache.remove(sha256)
+        
+        # Partial downloads are only kept around to be resumed
+        if not keep_current and self.cache.staging_dir.exists():
+            for partial in self.cache.staging_dir.iterdir():
+                self.progress.info(f"Removing: {partial.name}")
+                partial.unlink()
         
+        # Archives from the old name-based cache layout are no longer used
         for cache_file in self.cache_dir.iterdir():
-            if cache_file.is_file() and cache_file.suffix in ['.gz', '.bz2', '.xz', '.zip']:
-                # Check if this is for a current installation
-                # This is simplified - in practice, would need better tracking
-                if not keep_current or not any(url and cache_file.name in url for url in current_urls):
-                    print(f"Removing: {cache_file.name}")
-                    cache_file.unlink()
+            if cache_file.is_file() and cache_file.name.endswith(('.gz', '.bz2', '.xz', '.zip', '.part', '.part.json')):
+                self.progress.info(f"Removing: {cache_file.name}")
+                cache_file.unlink()
 
 
 def main():
@@ -410,36 +1766,61 @@ def main():
     parser = argparse.ArgumentParser(
         description='Download and manage dotbins binaries from URLs'
     )
-    parser.add_argument('command', choices=['sync', 'clean', 'status'],
+    parser.add_argument('command', choices=['sync', 'clean', 'status', 'history', 'serve', 'sources'],
                         help='Command to execute')
     parser.add_argument('tool', nargs='?', help='Specific tool to sync')
     parser.add_argument('--current', action='store_true',
                         help='Only sync current platform')
     parser.add_argument('--force', action='store_true',
                         help='Force re-download')
+    parser.add_argument('--jobs', '-j', type=int, default=DEFAULT_JOBS,
+                        help=f'Number of concurrent downloads (default: {DEFAULT_JOBS})')
+    parser.add_argument('--manifest-url',
+                        help='Refresh manifest.json from this URL before syncing')
+    parser.add_argument('--paranoid', action='store_true',
+                        help='Re-hash cached files instead of trusting their stat fingerprint')
+    parser.add_argument('--cache-budget', type=parse_size,
+                        help='Cache size limit, e.g. 500M or 2G (default: 2G)')
+    parser.add_argument('--state-backend', choices=['json', 'sqlite'],
+                        help='Where to keep installation state (default: json, or an existing state.db)')
+    parser.add_argument('--host', default='0.0.0.0',
+                        help='serve: address to listen on (default: 0.0.0.0)')
+    parser.add_argument('--port', type=int,
+                        help='serve: port to listen on (default: 8765)')
+    parser.add_argument('--no-upstream', action='store_true',
+                        help='serve: only serve cached objects, never fetch on a miss')
+    parser.add_argument('--progress', choices=['auto', 'tty', 'plain', 'jsonl', 'quiet'],
+                        help='How to report progress (default: $DOTBINS_PROGRESS or auto)')
     
     args = parser.parse_args()
     
-    downloader = BinaryDownloader()
+    # A mirror always fetches from upstream itself, so it can't loop back to itself
+    downloader = BinaryDownloader(cache_budget=args.cache_budget, paranoid=args.paranoid,
+                                  state_backend=args.state_backend,
+                                  mirrors=[] if args.command == 'serve' else None,
+                                  progress=args.progress)
     
     if args.command == 'sync':
+        if args.manifest_url and not downloader.update_manifest(args.manifest_url):
+            sys.exit(1)
+        
         if args.tool:
             platform, arch = downloader.detect_platform()
             success = downloader.sync_tool(args.tool, platform, arch, args.force)
             sys.exit(0 if success else 1)
         else:
-            results = downloader.sync_all(args.current, args.force)
+            results = downloader.sync_all(args.current, args.force, jobs=args.jobs)
             failures = [k for k, v in results.items() if not v]
             if failures:
-                print(f"\nFailed: {', '.join(failures)}")
+                downloader.progress.error(f"\nFailed: {', '.join(failures)}")
                 sys.exit(1)
             else:
-                print("\n✓ All tools synced successfully")
+                downloader.progress.success("\nAll tools synced successfully")
                 sys.exit(0)
     
     elif args.command == 'clean':
-        downloader.clean_cache()
-        print("✓ Cache cleaned")
+        downloader.clean_cache(budget=args.cache_budget)
+        downloader.progress.success("Cache cleaned")
     
     elif args.command == 'status':
         state = downloader.load_state()
@@ -449,6 +1830,37 @@ def main():
             print(f"Installed tools: {len(state)}")
             for key, info in state.items():
                 print(f"  {key} - installed {info.get('installed_at', 'unknown')}")
+    
+    elif args.command == 'serve':
+        try:
+            from .mirror import DEFAULT_PORT, MirrorServer
+        except ImportError:
+            from mirror import DEFAULT_PORT, MirrorServer
+        
+        port = DEFAULT_PORT if args.port is None else args.port
+        server = MirrorServer(downloader, args.host, port, upstream=not args.no_upstream)
+        print(f"Serving {downloader.cache_dir} and {downloader.manifest_path} on {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    
+    elif args.command == 'sources':
+        stats = downloader.sources.all()
+        if not stats:
+            print("No download sources measured yet")
+        for name, info in sorted(stats.items()):
+            latency = f"{info['latency'] * 1000:.0f} ms" if 'latency' in info else '-'
+            throughput = f"{info['throughput'] / 1024 ** 2:.1f} MB/s" if 'throughput' in info else '-'
+            print(f"  {name:<40} latency {latency:>8}  throughput {throughput:>12}"
+                  f"  ok {info.get('successes', 0)}  failing {info.get('failures', 0)}")
+    
+    elif args.command == 'history':
+        for event in downloader.state_store.history(args.tool, limit=50):
+            print(f"  {event['at']}  {event['action']:<9} {event['tool']}/{event['platform']}/{event['arch']}"
+                  f" {event.get('tag') or ''} {event.get('generation') or ''}")
 
 
 if __name__ == '__main__':
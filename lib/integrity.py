@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Installed-Binary Integrity Index for dotbins
+
+state.json only knows which archive a tool was installed from, so checking
+whether ``~/.dotbins/<os>/<arch>/bin/<tool>`` was modified or truncated used to
+mean re-extracting the archive. Instead, sync records each installed binary's
+own hashes plus a stat fingerprint in ``~/.dotbins/.integrity.json``.
+
+Checks are tiered:
+- stat: compare (size, mtime_ns, inode) with the recorded fingerprint - no reads
+- full: re-hash the file (blake2b by default, which is faster than sha256)
+
+Usage:
+    from integrity import IntegrityIndex
+
+    index = IntegrityIndex(Path('~/.dotbins').expanduser())
+    index.record(bin_path, key='fzf/linux/amd64')
+    status, message = index.check(bin_path, full=True)
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+try:
+    from .locking import FileLock
+except ImportError:
+    from locking import FileLock
+
+
+# Check results
+OK = 'ok'
+MODIFIED = 'modified'
+MISSING = 'missing'
+UNTRACKED = 'untracked'
+
+HASH_ALGORITHMS = ('sha256', 'blake2b')
+
+
+def hash_file(file_path: Path, algorithms=HASH_ALGORITHMS) -> Dict[str, str]:
+    """Hash a file with several algorithms in a single read."""
+    import hashlib
+    hashers = {name: hashlib.new(name) for name in algorithms}
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(65536):
+            for hasher in hashers.values():
+                hasher.update(chunk)
+    return {name: hasher.hexdigest() for name, hasher in hashers.items()}
+
+
+class IntegrityIndex:
+    """Hashes and stat fingerprints of installed binaries."""
+
+    def __init__(self, dotbins_dir: Path):
+        """
+        Initialize the integrity index.
+
+        Args:
+            dotbins_dir: Path to .dotbins directory (index lives in .integrity.json,
+                         updates are serialized across processes by .integrity.json.lock)
+        """
+        self.dotbins_dir = Path(dotbins_dir)
+        self.index_path = self.dotbins_dir / '.integrity.json'
+        self.lock_path = self.dotbins_dir / '.integrity.json.lock'
+        self._lock = threading.RLock()
+        self._entries: Optional[Dict[str, Dict]] = None
+        self._stamp = None
+
+    def _load(self) -> Dict[str, Dict]:
+        """Load the index, re-reading it if another process rewrote it. Caller holds the lock."""
+        try:
+            st = self.index_path.stat()
+            stamp = (st.st_size, st.st_mtime_ns, st.st_ino)
+        except FileNotFoundError:
+            stamp = None
+        if self._entries is None or stamp != self._stamp:
+            try:
+                with open(self.index_path, 'r') as f:
+                    self._entries = json.load(f).get('binaries', {})
+            except (OSError, ValueError, AttributeError):
+                self._entries = {}
+            self._stamp = stamp
+        return self._entries
+
+    def _update(self, mutate: Callable[[Dict[str, Dict]], bool]):
+        """Apply a change to the latest on-disk index; write it back if ``mutate`` returns True."""
+        with self._lock, FileLock(self.lock_path):
+            if mutate(self._load()):
+                self._save()
+
+    def _save(self):
+        """Atomically write the index. Caller holds both locks."""
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': 1, 'binaries': self._entries}, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+        st = self.index_path.stat()
+        self._stamp = (st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def _name(self, binary_path: Path) -> str:
+        """Index key for a binary: its path relative to the dotbins directory."""
+        try:
+            return Path(os.path.abspath(binary_path)).relative_to(os.path.abspath(self.dotbins_dir)).as_posix()
+        except ValueError:
+            return os.path.abspath(binary_path)
+
+    @staticmethod
+    def _fingerprint(st: os.stat_result) -> list:
+        return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+    def record(self, binary_path: Path, key: Optional[str] = None) -> Dict:
+        """
+        Hash an installed binary and record it.
+
+        Args:
+            binary_path: Installed binary
+            key: Manifest key it was installed for (e.g. 'fzf/linux/amd64')
+
+        Returns:
+            The recorded entry
+        """
+        entry = hash_file(binary_path)
+        entry.update({
+            'fingerprint': self._fingerprint(binary_path.stat()),
+            'key': key,
+            'recorded_at': datetime.utcnow().isoformat() + 'Z'
+        })
+        name = self._name(binary_path)
+
+        def mutate(entries):
+            entries[name] = entry
+            return True
+
+        self._update(mutate)
+        return entry
+
+    def forget(self, binary_path: Path):
+        """Drop a binary from the index (e.g. after uninstall)."""
+        name = self._name(binary_path)
+        self._update(lambda entries: entries.pop(name, None) is not None)
+
+    def get(self, binary_path: Path) -> Optional[Dict]:
+        """Get the recorded entry for a binary."""
+        with self._lock:
+            entry = self._load().get(self._name(binary_path))
+            return dict(entry) if entry else None
+
+    def check(self, binary_path: Path, full: bool = False,
+              algorithm: str = 'blake2b') -> Tuple[str, str]:
+        """
+        Check an installed binary against the index.
+
+        Without ``full`` an unchanged stat fingerprint is accepted as-is. A
+        changed fingerprint (or ``full``) triggers a re-hash; if the content
+        still matches, the new fingerprint is recorded.
+
+        Args:
+            binary_path: Installed binary
+            full: Always re-hash the file
+            algorithm: Hash to compare on a re-hash ('blake2b' or 'sha256')
+
+        Returns:
+            Tuple of (status, message); status is one of OK, MODIFIED,
+            MISSING or UNTRACKED
+        """
+        entry = self.get(binary_path)
+        if entry is None:
+            return UNTRACKED, "Not in integrity index"
+
+        try:
+            st = binary_path.stat()
+        except FileNotFoundError:
+            return MISSING, "Binary not found"
+
+        fingerprint = self._fingerprint(st)
+        if not full and fingerprint == entry.get('fingerprint'):
+            return OK, "Unchanged since install (stat)"
+
+        if st.st_size != entry['fingerprint'][0]:
+            return MODIFIED, f"Size changed: {entry['fingerprint'][0]} -> {st.st_size} bytes"
+
+        actual = hash_file(binary_path, (algorithm,))[algorithm]
+        if actual != entry[algorithm]:
+            return MODIFIED, f"{algorithm} mismatch: expected {entry[algorithm]}, got {actual}"
+
+        if fingerprint != entry.get('fingerprint'):
+            name = self._name(binary_path)
+
+            def mutate(entries):
+                if name not in entries:
+                    return False
+                entries[name]['fingerprint'] = fingerprint
+                return True
+
+            self._update(mutate)
+        return OK, f"Unchanged since install ({algorithm})"
+
+    def check_all(self, full: bool = False, algorithm: str = 'blake2b') -> Dict[str, Tuple[str, str]]:
+        """
+        Check every recorded binary.
+
+        Returns:
+            Dictionary mapping binary paths (relative to dotbins_dir) to
+            (status, message)
+        """
+        with self._lock:
+            names = list(self._load())
+        return {name: self.check(self.dotbins_dir / name, full, algorithm) for name in names}
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Advisory File Locks for dotbins
+
+Two ``dotbins-manager sync`` runs (or a cron job overlapping a manual sync)
+share the cache directory, its index and the installation state. Every
+read-modify-write of those files, and every download of a cache object,
+happens under an advisory ``flock``. In ``~/.cache/dotbins/locks/``:
+
+- ``index.lock`` (cache index), ``state.lock`` (state.json, and creation of
+  the SQLite state), ``sources.lock`` (sources.json), ``probes.lock``
+  (probes.json), ``github-releases.lock`` (github-releases.json) and
+  ``releases.lock`` (the release index): held only while the file is
+  re-read, merged and rewritten
+- ``<sha256>.lock``: held for the whole download of one object (named after
+  the SHA256 of its URL when the object's hash isn't known in advance), so a
+  second process waits for the first and then finds the finished object in
+  the cache
+- ``install-<tool>-<platform>-<arch>.lock``: held while a tool's generation
+  is unpacked and linked, or while it is rolled back
+
+And beside the files they guard, in the dotbins directory:
+
+- ``.pins.json.lock`` and ``.integrity.json.lock``: held while .pins.json or
+  .integrity.json is re-read, merged and rewritten
+
+flock locks belong to the open file description, so they also exclude other
+threads of the same process. Lock files are never deleted (deleting a lock
+file someone is waiting on would let two holders in). On platforms without
+fcntl the locks are no-ops.
+
+Usage:
+    from locking import FileLock
+
+    with FileLock(cache_dir / 'locks' / 'state.lock'):
+        ...
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+
+class LockTimeout(Exception):
+    """Raised when a lock could not be acquired in time."""
+
+
+class FileLock:
+    """Exclusive advisory lock on a file (created if missing)."""
+
+    def __init__(self, path: Path, timeout: Optional[float] = None):
+        """
+        Initialize the lock.
+
+        Args:
+            path: Lock file
+            timeout: Seconds to wait before raising LockTimeout (default: forever)
+        """
+        self.path = Path(path)
+        self.timeout = timeout
+        self._fd: Optional[int] = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        Acquire the lock.
+
+        Args:
+            blocking: Wait for the lock (up to the timeout) instead of failing
+
+        Returns:
+            True if the lock is held, False if non-blocking and busy
+        """
+        if self._fd is not None:
+            raise RuntimeError(f"Lock already held: {self.path}")
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if not HAS_FCNTL:
+            self._fd = fd
+            return True
+
+        try:
+            if blocking and self.timeout is None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                deadline = time.monotonic() + (self.timeout or 0)
+                delay = 0.01
+                while True:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if not blocking:
+                            os.close(fd)
+                            return False
+                        if time.monotonic() >= deadline:
+                            raise LockTimeout(f"Timed out waiting for lock: {self.path}")
+                        time.sleep(delay)
+                        delay = min(delay * 2, 0.5)
+        except BaseException:
+            os.close(fd)
+            raise
+
+        self._fd = fd
+        return True
+
+    def release(self):
+        """Release the lock."""
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+        if HAS_FCNTL:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def __enter__(self) -> 'FileLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
@@ -19,7 +19,6 @@ Usage:
 
 import json
 import os
-import subprocess
 import sys
 from datetime import datetime
 from pathlib import Path
@@ -27,51 +26,84 @@ from typing import Dict, List, Optional, Tuple
 
 try:
     from .downloader import BinaryDownloader
+    from .integrity import MODIFIED, MISSING
+    from .releases import tag_variants
 except ImportError:
     from downloader import BinaryDownloader
+    from integrity import MODIFIED, MISSING
+    from releases import tag_variants
 
 
 class ToolManager:
     """High-level tool management for dotbins."""
     
-    def __init__(self, dotbins_dir: Optional[str] = None):
+    def __init__(self, dotbins_dir: Optional[str] = None, state_backend: Optional[str] = None,
+                 progress=None):
         """
         Initialize the tool manager.
         
         Args:
             dotbins_dir: Path to .dotbins directory (default: ~/.dotbins)
+            state_backend: 'json' or 'sqlite' state store (see state.py)
+            progress: Progress mode or Reporter for downloads (see progress.py)
         """
         self.dotbins_dir = Path(dotbins_dir or os.path.expanduser('~/.dotbins'))
-        self.downloader = BinaryDownloader(dotbins_dir=str(self.dotbins_dir))
+        self.downloader = BinaryDownloader(dotbins_dir=str(self.dotbins_dir), state_backend=state_backend,
+                                           progress=progress)
+        self.integrity = self.downloader.integrity
+        self.state_store = self.downloader.state_store
         
         self.config_path = self.dotbins_dir / 'dotbins.yaml'
         self.manifest_path = self.dotbins_dir / 'manifest.json'
         self.pins_path = self.dotbins_dir / '.pins.json'
         
+        # GitHub API requests sent by the last check_updates()
+        self.update_requests = 0
+        
     def list_installed(self) -> List[Dict]:
         """
         List all installed tools.
         
         Returns:
-            List of tool information dictionaries
+            List of tool information dictionaries; 'version' is the version
+            the binary reported to its last verify probe (if it is unchanged
+            since), otherwise the installed release 'tag'
         """
+        try:
+            from .probes import Prober
+        except ImportError:
+            from probes import Prober
+        
         state = self.downloader.load_state()
-        manifest = self.downloader.load_manifest()
+        catalog = self.downloader.catalog()
+        pins = self._load_pins()
+        current = self.downloader.detect_platform()
+        prober = Prober(self.downloader.cache_dir)
         
         tools = []
         for key, info in state.items():
             parts = key.split('/')
             if len(parts) == 3:
                 tool_name, platform, arch = parts
-                manifest_info = manifest.get(key, {})
+                manifest_info = catalog.get(key) or {}
+                tag = info.get('tag') or manifest_info.get('tag', 'unknown')
+                
+                # The version the binary itself reported, if verify has probed it unchanged
+                observed = None
+                if (platform, arch) == current:
+                    binary_name = info.get('binaries', [tool_name])[0]
+                    probe = prober.cached(self.dotbins_dir / platform / arch / 'bin' / binary_name)
+                    observed = probe.get('version') if probe and probe['ok'] else None
                 
                 tools.append({
                     'name': tool_name,
                     'platform': platform,
                     'arch': arch,
-                    'version': manifest_info.get('tag', 'unknown'),
+                    'version': observed or tag,
+                    'tag': tag,
+                    'observed_version': observed,
                     'installed_at': info.get('installed_at', 'unknown'),
-                    'pinned': self.is_pinned(tool_name)
+                    'pinned': tool_name in pins
                 })
         
         return tools
@@ -83,43 +115,19 @@ class ToolManager:
         Returns:
             List of available tool information
         """
-        manifest = self.downloader.load_manifest()
-        state = self.downloader.load_state()
+        catalog = self.downloader.catalog()
         
-        tools = []
-        seen = set()
+        # Tools installed on any platform
+        installed = {key.split('/', 1)[0] for key in self.downloader.load_state()}
         
-        for key in manifest:
-            parts = key.split('/')
-            if len(parts) == 3:
-                tool_name, platform, arch = parts
-                
-                # Group by tool name
-                if tool_name not in seen:
-                    seen.add(tool_name)
-                    
-                    # Check if installed on any platform
-                    installed = any(k.startswith(f"{tool_name}/") for k in state)
-                    
-                    tools.append({
-                        'name': tool_name,
-                        'installed': installed,
-                        'platforms': self._get_tool_platforms(tool_name, manifest)
-                    })
-        
-        return tools
-    
-    def _get_tool_platforms(self, tool_name: str, manifest: Dict) -> List[str]:
-        """Get list of platforms for a tool."""
-        platforms = []
-        for key in manifest:
-            if key.startswith(f"{tool_name}/"):
-                parts = key.split('/')
-                if len(parts) == 3:
-                    platform_arch = f"{parts[1]}/{parts[2]}"
-                    if platform_arch not in platforms:
-                        platforms.append(platform_arch)
-        return platforms
+        return [
+            {
+                'name': tool_name,
+                'installed': tool_name in installed,
+                'platforms': catalog.platforms(tool_name)
+            }
+            for tool_name in catalog.tools()
+        ]
     
     def install_tool(self, tool_name: str, version: Optional[str] = None, 
                      platform: Optional[str] = None, arch: Optional[str] = None,
@@ -129,7 +137,8 @@ class ToolManager:
         
         Args:
             tool_name: Name of the tool
-            version: Specific version to install (optional, uses latest)
+            version: Specific version to install (optional; default: the
+                     pinned version, else the manifest's)
             platform: Target platform (optional, uses current)
             arch: Target architecture (optional, uses current)
             force: Force reinstall
@@ -141,13 +150,8 @@ class ToolManager:
         if not platform or not arch:
             platform, arch = self.downloader.detect_platform()
         
-        # Check if version pinning requested
-        if version:
-            print(f"Version pinning not yet implemented for {version}")
-            print("Using latest available version")
-        
-        # Sync the tool
-        return self.downloader.sync_tool(tool_name, platform, arch, force)
+        # Sync the tool (an older version resolves through the release index)
+        return self.downloader.sync_tool(tool_name, platform, arch, force, version=version)
     
     def uninstall_tool(self, tool_name: str, platform: Optional[str] = None, 
                        arch: Optional[str] = None) -> bool:
@@ -165,21 +169,64 @@ class ToolManager:
         if not platform or not arch:
             platform, arch = self.downloader.detect_platform()
         
-        # Remove binary
-        bin_path = self.dotbins_dir / platform / arch / 'bin' / tool_name
-        if bin_path.exists():
-            bin_path.unlink()
-            print(f"✓ Removed {bin_path}")
-        
-        # Update state
-        state = self.downloader.load_state()
         key = f"{tool_name}/{platform}/{arch}"
-        if key in state:
-            del state[key]
-            self.downloader.save_state(state)
+        with self.downloader.install_lock(key):
+            info = self.state_store.get(key) or {}
+            
+            # Remove binaries (a tool may provide several, e.g. uv and uvx)
+            for binary_name in info.get('binaries', [tool_name]):
+                bin_path = self.dotbins_dir / platform / arch / 'bin' / binary_name
+                if bin_path.exists():
+                    bin_path.unlink()
+                    self.downloader.progress.success(f"Removed {bin_path}")
+                self.integrity.forget(bin_path)
+            
+            # Update state
+            if self.state_store.delete(key):
+                self.state_store.record_event(key, 'uninstall', generation=info.get('generation'))
+            self.downloader.remove_generations(key)
         
         return True
     
+    def rollback(self, tool_name: str, generation: Optional[str] = None,
+                 platform: Optional[str] = None, arch: Optional[str] = None) -> bool:
+        """
+        Roll a tool back to a previously installed generation.
+        
+        Generations are kept on disk, so this is a link swap: no download
+        and no extraction.
+        
+        Args:
+            tool_name: Name of the tool
+            generation: Generation to switch to (default: the previous one)
+            platform: Target platform (optional, uses current)
+            arch: Target architecture (optional, uses current)
+            
+        Returns:
+            True if successful
+        """
+        if not platform or not arch:
+            platform, arch = self.downloader.detect_platform()
+        
+        return self.downloader.activate_generation(f"{tool_name}/{platform}/{arch}", generation)
+    
+    def list_generations(self, tool_name: str, platform: Optional[str] = None,
+                         arch: Optional[str] = None) -> List[Dict]:
+        """
+        List the retained generations of a tool, newest first.
+        
+        Returns:
+            List of generation dictionaries ('current' marks the active one)
+        """
+        if not platform or not arch:
+            platform, arch = self.downloader.detect_platform()
+        
+        info = self.state_store.get(f"{tool_name}/{platform}/{arch}") or {}
+        return [
+            dict(generation, current=generation['id'] == info.get('generation'))
+            for generation in info.get('generations', [])
+        ]
+    
     def pin_version(self, tool_name: str, version: str):
         """
         Pin a tool to a specific version.
@@ -188,10 +235,14 @@ class ToolManager:
             tool_name: Name of the tool
             version: Version to pin
         """
-        pins = self._load_pins()
-        pins[tool_name] = version
-        self._save_pins(pins)
-        print(f"✓ Pinned {tool_name} to version {version}")
+        progress = self.downloader.progress
+        self.state_store.set_pin(tool_name, version)
+        progress.success(f"Pinned {tool_name} to version {version}")
+        
+        platform, arch = self.downloader.detect_platform()
+        if self.downloader.resolve_entry(tool_name, platform, arch, version) is None:
+            progress.warning(f"{version} is not in the release index for {platform}/{arch}; "
+                             f"sync will fail for {tool_name} until a manifest lists it")
     
     def unpin_version(self, tool_name: str):
         """
@@ -200,113 +251,248 @@ class ToolManager:
         Args:
             tool_name: Name of the tool
         """
-        pins = self._load_pins()
-        if tool_name in pins:
-            del pins[tool_name]
-            self._save_pins(pins)
-            print(f"✓ Unpinned {tool_name}")
+        if self.state_store.remove_pin(tool_name):
+            self.downloader.progress.success(f"Unpinned {tool_name}")
         else:
-            print(f"Tool {tool_name} is not pinned")
+            self.downloader.progress.info(f"Tool {tool_name} is not pinned")
+    
+    def list_versions(self, tool_name: str) -> List[Dict]:
+        """
+        List the known releases of a tool (from the release index).
+        
+        Returns:
+            List of {'tag', 'platforms', 'latest', 'pinned'} dictionaries
+        """
+        catalog = self.downloader.catalog()
+        releases = self.downloader.releases
+        latest = {str(catalog.get(key).get('tag')) for key in catalog.tool_keys(tool_name)}
+        pinned = self.get_pinned_version(tool_name)
+        return [
+            {
+                'tag': tag,
+                'platforms': sorted(releases.releases(tool_name)[tag]),
+                'latest': tag in latest,
+                'pinned': pinned is not None and tag in tag_variants(pinned)
+            }
+            for tag in releases.tags(tool_name)
+        ]
     
     def is_pinned(self, tool_name: str) -> bool:
         """Check if a tool version is pinned."""
-        pins = self._load_pins()
-        return tool_name in pins
+        return self.state_store.pin(tool_name) is not None
     
     def get_pinned_version(self, tool_name: str) -> Optional[str]:
         """Get the pinned version for a tool."""
-        pins = self._load_pins()
-        return pins.get(tool_name)
+        return self.state_store.pin(tool_name)
     
     def _load_pins(self) -> Dict:
         """Load version pins."""
-        if not self.pins_path.exists():
-            return {}
-        with open(self.pins_path, 'r') as f:
-            return json.load(f)
+        return self.state_store.pins()
     
     def _save_pins(self, pins: Dict):
         """Save version pins."""
-        with open(self.pins_path, 'w') as f:
-            json.dump(pins, f, indent=2)
+        self.state_store.replace_pins(pins)
     
-    def verify_installation(self, tool_name: Optional[str] = None) -> Dict[str, bool]:
+    def install_history(self, tool_name: Optional[str] = None, limit: Optional[int] = 50) -> List[Dict]:
+        """
+        Get install/activate/uninstall events, newest first.
+        
+        Args:
+            tool_name: Only events for this tool (optional)
+            limit: Maximum number of events
+        """
+        return self.state_store.history(tool_name, limit)
+    
+    def export_state(self, state_file: str, pins_file: Optional[str] = None):
+        """Write state (and pins) out in the state.json / .pins.json format."""
+        self.state_store.export_json(Path(state_file), Path(pins_file) if pins_file else None)
+        self.downloader.progress.success(f"State exported to {state_file}")
+    
+    def import_state(self, state_file: str, pins_file: Optional[str] = None):
+        """Replace state (and pins) with the contents of JSON files."""
+        self.state_store.import_json(Path(state_file), Path(pins_file) if pins_file else None)
+        self.downloader.progress.success(f"State imported from {state_file}")
+    
+    def verify_installation(self, tool_name: Optional[str] = None, full: bool = False,
+                            refresh: bool = False, jobs: Optional[int] = None) -> Dict[str, bool]:
         """
         Verify that installed tools are working.
         
+        Each tool's result is reported as a finished task of the downloader's
+        progress reporter (a ``finish`` event with ``--progress jsonl``).
+        
+        Each binary is first checked against the integrity index recorded at
+        install time (stat fingerprint, or a full re-hash with ``full``), then
+        run with its probe command (``--version``, or ``probe`` in
+        dotbins.yaml). Probes run concurrently, and results are cached per
+        binary fingerprint, so unchanged binaries aren't run again (see
+        probes.py).
+        
         Args:
             tool_name: Specific tool to verify (optional, verifies all)
+            full: Re-hash every binary instead of trusting unchanged stat data
+            refresh: Run every probe, even for unchanged binaries
+            jobs: Concurrent probes (default: probes.DEFAULT_JOBS)
             
         Returns:
             Dictionary mapping tool names to verification status
         """
+        try:
+            from .probes import DEFAULT_JOBS, Prober, probe_args
+        except ImportError:
+            from probes import DEFAULT_JOBS, Prober, probe_args
+        
         platform, arch = self.downloader.detect_platform()
         bin_dir = self.dotbins_dir / platform / arch / 'bin'
         
         if not bin_dir.exists():
-            print(f"ERROR: Binary directory does not exist: {bin_dir}")
+            self.downloader.progress.error(f"Binary directory does not exist: {bin_dir}")
             return {}
         
         results = {}
+        messages = {}
         
         # Get tools to verify
         if tool_name:
             tools_to_verify = [tool_name]
         else:
-            tools_to_verify = [f.name for f in bin_dir.iterdir() if f.is_file()]
+            tools_to_verify = sorted(f.name for f in bin_dir.iterdir() if f.is_file())
+        
+        config = self.downloader.load_config()
+        owners = self._binary_owners(platform, arch)
+        to_probe = []
         
         for tool in tools_to_verify:
             bin_path = bin_dir / tool
             
             if not bin_path.exists():
-                print(f"✗ {tool}: Not found")
-                results[tool] = False
+                results[tool], messages[tool] = False, "Not found"
                 continue
             
             # Check if executable
             if not os.access(bin_path, os.X_OK):
-                print(f"✗ {tool}: Not executable")
-                results[tool] = False
+                results[tool], messages[tool] = False, "Not executable"
                 continue
             
-            # Try to run with --version
-            try:
-                result = subprocess.run(
-                    [str(bin_path), '--version'],
-                    capture_output=True,
-                    timeout=5
-                )
-                if result.returncode == 0:
-                    print(f"✓ {tool}: Working")
-                    results[tool] = True
-                else:
-                    print(f"✗ {tool}: Failed (exit code {result.returncode})")
-                    results[tool] = False
-            except subprocess.TimeoutExpired:
-                print(f"✗ {tool}: Timeout")
-                results[tool] = False
-            except Exception as e:
-                print(f"✗ {tool}: Error - {e}")
-                results[tool] = False
+            # Check it is the binary that was installed
+            status, message = self.integrity.check(bin_path, full=full)
+            if status in (MODIFIED, MISSING):
+                results[tool], messages[tool] = False, message
+                continue
+            
+            # Probe with the owning tool's command (uvx is probed like uv)
+            args = probe_args(config.get(owners.get(tool, tool)))
+            if args is None:
+                results[tool], messages[tool] = True, "Present (probe disabled)"
+                continue
+            to_probe.append((tool, bin_path, args))
+        
+        prober = Prober(self.downloader.cache_dir, jobs=jobs or DEFAULT_JOBS)
+        for tool, probe in prober.probe_all(to_probe, refresh=refresh).items():
+            results[tool] = probe['ok']
+            version = f" ({probe['version']})" if probe['ok'] and probe.get('version') else ''
+            messages[tool] = f"{probe['message']}{version}"
+        
+        for tool in tools_to_verify:
+            self.downloader.progress.finish(tool, results[tool], messages[tool])
         
         return results
     
-    def check_updates(self) -> List[Dict]:
+    def _binary_owners(self, platform: str, arch: str) -> Dict[str, str]:
+        """Map the binaries installed for a platform to the tools providing them."""
+        owners = {}
+        for key, info in self.downloader.load_state().items():
+            parts = key.split('/')
+            if len(parts) == 3 and parts[1:] == [platform, arch]:
+                for binary_name in info.get('binaries', [parts[0]]):
+                    owners[binary_name] = parts[0]
+        return owners
+    
+    def check_integrity(self, full: bool = False) -> Dict[str, Tuple[str, str]]:
         """
-        Check which tools have updates available.
+        Check all installed binaries against the integrity index.
         
-        Note: This currently requires the dotbins Python tool to be installed
-        and will be enhanced in the future to check GitHub releases directly.
+        Args:
+            full: Re-hash every binary instead of trusting unchanged stat data
+            
+        Returns:
+            Dictionary mapping binary paths to (status, message)
+        """
+        return self.integrity.check_all(full=full)
+    
+    def check_updates(self, refresh: bool = False, jobs: Optional[int] = None) -> List[Dict]:
+        """
+        Check the GitHub repos in dotbins.yaml for releases newer than the
+        manifest's tags.
+        
+        Lookups run concurrently and are cached with their ETags, so a
+        repeated check costs few (or no) rate-limited API requests; see
+        updates.py.
+        
+        Args:
+            refresh: Revalidate every repo, even ones checked recently
+            jobs: Concurrent lookups (default: updates.DEFAULT_JOBS)
         
         Returns:
-            List of tools with updates available
+            One dictionary per configured tool: 'tool', 'repo', 'current'
+            (manifest tag), 'latest', 'pinned', 'source', 'error' and
+            'status' - 'update', 'pinned' (an update held back by a pin),
+            'current' or 'unknown'
         """
-        print("Checking for updates...")
-        print("Note: Full update checking requires dotbins tool integration")
+        try:
+            from .updates import DEFAULT_JOBS, UpdateChecker
+        except ImportError:
+            from updates import DEFAULT_JOBS, UpdateChecker
+        
+        repos = {}
+        for tool_name, tool_config in self.downloader.load_config().items():
+            repo = tool_config.get('repo') if isinstance(tool_config, dict) else tool_config
+            if isinstance(repo, str) and repo.count('/') == 1:
+                repos[tool_name] = repo
+        if not repos:
+            return []
+        
+        checker = UpdateChecker(self.downloader.cache_dir, self.downloader.transport,
+                                jobs=jobs or DEFAULT_JOBS)
+        latest = checker.latest_releases(sorted(set(repos.values())), refresh=refresh)
+        self.update_requests = checker.requests
+        
+        catalog = self.downloader.catalog()
+        platform, arch = self.downloader.detect_platform()
+        pins = self._load_pins()
         
-        # For now, just report current versions
-        installed = self.list_installed()
-        return []
+        results = []
+        for tool_name, repo in repos.items():
+            answer = latest.get(repo, {})
+            entry = catalog.entry(tool_name, platform, arch)
+            if entry is None:
+                # Not built for this platform: compare with any of the tool's entries
+                keys = catalog.tool_keys(tool_name)
+                entry = catalog.get(keys[0]) if keys else None
+            current = str(entry['tag']) if entry and entry.get('tag') is not None else None
+            tag = answer.get('tag')
+            pinned = pins.get(tool_name)
+            
+            if not tag:
+                status = 'unknown'
+            elif current is not None and tag in tag_variants(current):
+                status = 'current'
+            elif pinned is not None:
+                status = 'current' if tag in tag_variants(pinned) else 'pinned'
+            else:
+                status = 'update'
+            
+            results.append({
+                'tool': tool_name,
+                'repo': repo,
+                'current': current,
+                'latest': tag,
+                'pinned': pinned,
+                'status': status,
+                'source': answer.get('source'),
+                'error': answer.get('error'),
+            })
+        return results
     
     def validate_config(self) -> Tuple[bool, List[str]]:
         """
@@ -328,7 +514,7 @@ class ToolManager:
                 with open(self.config_path, 'r') as f:
                     config = yaml.safe_load(f)
             except ImportError:
-                print("Note: Install PyYAML for better config validation")
+                self.downloader.progress.info("Note: Install PyYAML for better config validation")
                 # Basic validation without YAML parser
                 with open(self.config_path, 'r') as f:
                     content = f.read()
@@ -382,7 +568,7 @@ class ToolManager:
             'tools': [
                 {
                     'name': tool['name'],
-                    'version': tool['version'],
+                    'version': tool['tag'],
                     'pinned': tool['pinned']
                 }
                 for tool in installed
@@ -393,9 +579,8 @@ class ToolManager:
         with open(output_file, 'w') as f:
             json.dump(profile, f, indent=2)
         
-        print(f"✓ Exported profile to {output_file}")
-        print(f"  Platform: {platform}/{arch}")
-        print(f"  Tools: {len(profile['tools'])}")
+        self.downloader.progress.success(f"Exported profile to {output_file} "
+                                         f"({len(profile['tools'])} tools, {platform}/{arch})")
     
     def import_profile(self, input_file: str, force: bool = False):
         """
@@ -408,21 +593,20 @@ class ToolManager:
         with open(input_file, 'r') as f:
             profile = json.load(f)
         
-        print(f"Importing profile from {input_file}")
-        print(f"  Platform: {profile.get('platform')}/{profile.get('arch')}")
-        print(f"  Exported: {profile.get('exported_at')}")
-        print(f"  Tools: {len(profile.get('tools', []))}")
+        progress = self.downloader.progress
+        progress.info(f"Importing profile from {input_file} ({len(profile.get('tools', []))} tools, "
+                      f"{profile.get('platform')}/{profile.get('arch')}, exported {profile.get('exported_at')})")
         
         # Get current platform
         platform, arch = self.downloader.detect_platform()
         
         # Warn if platforms don't match
         if profile.get('platform') != platform or profile.get('arch') != arch:
-            print(f"\nWARNING: Profile is for {profile.get('platform')}/{profile.get('arch')}")
-            print(f"         Current system is {platform}/{arch}")
+            progress.warning(f"Profile is for {profile.get('platform')}/{profile.get('arch')}, "
+                             f"current system is {platform}/{arch}")
             response = input("Continue anyway? (y/N): ")
             if response.lower() != 'y':
-                print("Import cancelled")
+                progress.info("Import cancelled")
                 return
         
         # Install tools
@@ -431,13 +615,13 @@ class ToolManager:
             version = tool.get('version')
             pinned = tool.get('pinned', False)
             
-            print(f"\nInstalling {tool_name}...")
+            progress.info(f"\nInstalling {tool_name}...")
             success = self.install_tool(tool_name, version, force=force)
             
             if success and pinned and version:
                 self.pin_version(tool_name, version)
         
-        print("\n✓ Profile import complete")
+        progress.success("\nProfile import complete")
     
     def create_backup(self) -> str:
         """
@@ -458,7 +642,7 @@ class ToolManager:
         with open(backup_file, 'w') as f:
             json.dump(backup_data, f, indent=2)
         
-        print(f"✓ Backup created: {backup_file}")
+        self.downloader.progress.success(f"Backup created: {backup_file}")
         return str(backup_file)
     
     def restore_backup(self, backup_file: str):
@@ -471,21 +655,21 @@ class ToolManager:
         with open(backup_file, 'r') as f:
             backup_data = json.load(f)
         
-        print(f"Restoring from backup: {backup_file}")
-        print(f"  Backup date: {backup_data.get('timestamp')}")
+        progress = self.downloader.progress
+        progress.info(f"Restoring from backup: {backup_file} ({backup_data.get('timestamp')})")
         
         # Restore state
         if 'state' in backup_data:
             self.downloader.save_state(backup_data['state'])
-            print("✓ Restored installation state")
+            progress.success("Restored installation state")
         
         # Restore pins
         if 'pins' in backup_data:
             self._save_pins(backup_data['pins'])
-            print("✓ Restored version pins")
+            progress.success("Restored version pins")
         
-        print("\n✓ Backup restored")
-        print("Note: Binaries are not restored, run sync to download them")
+        progress.success("\nBackup restored")
+        progress.info("Note: Binaries are not restored, run sync to download them")
 
 
 def main():
@@ -518,9 +702,21 @@ def main():
     unpin_parser = subparsers.add_parser('unpin', help='Unpin tool version')
     unpin_parser.add_argument('tool', help='Tool name')
     
+    # Rollback
+    rollback_parser = subparsers.add_parser('rollback', help='Roll back to a previous generation')
+    rollback_parser.add_argument('tool', help='Tool name')
+    rollback_parser.add_argument('--to', dest='generation', help='Generation to activate')
+    
+    history_parser = subparsers.add_parser('history', help='Show install history')
+    history_parser.add_argument('tool', nargs='?', help='Specific tool')
+    
     # Verify
     verify_parser = subparsers.add_parser('verify', help='Verify installation')
     verify_parser.add_argument('tool', nargs='?', help='Specific tool to verify')
+    verify_parser.add_argument('--full', action='store_true',
+                               help='Re-hash binaries instead of trusting unchanged stat data')
+    verify_parser.add_argument('--refresh', action='store_true',
+                               help='Run every binary, even ones probed unchanged before')
     
     # Config
     subparsers.add_parser('validate', help='Validate configuration')
@@ -538,6 +734,12 @@ def main():
     restore_parser = subparsers.add_parser('restore', help='Restore backup')
     restore_parser.add_argument('file', help='Backup file')
     
+    # State store
+    state_parser = subparsers.add_parser('state', help='Export/import state as JSON')
+    state_parser.add_argument('action', choices=['export', 'import'])
+    state_parser.add_argument('file', help='state.json file')
+    state_parser.add_argument('--pins', help='.pins.json file')
+    
     args = parser.parse_args()
     
     if not args.command:
@@ -578,11 +780,20 @@ def main():
     elif args.command == 'unpin':
         manager.unpin_version(args.tool)
     
+    elif args.command == 'rollback':
+        success = manager.rollback(args.tool, args.generation)
+        sys.exit(0 if success else 1)
+    
+    elif args.command == 'history':
+        for event in manager.install_history(args.tool):
+            print(f"  {event['at']}  {event['action']:<9} {event['tool']}/{event['platform']}/{event['arch']}"
+                  f" {event.get('tag') or ''}")
+    
     elif args.command == 'verify':
-        results = manager.verify_installation(args.tool)
+        results = manager.verify_installation(args.tool, full=args.full, refresh=args.refresh)
         failures = [k for k, v in results.items() if not v]
         if failures:
-            print(f"\nFailed tools: {', '.join(failures)}")
+            manager.downloader.progress.error(f"\nFailed tools: {', '.join(failures)}")
             sys.exit(1)
     
     elif args.command == 'validate':
@@ -606,6 +817,12 @@ def main():
     
     elif args.command == 'restore':
         manager.restore_backup(args.file)
+    
+    elif args.command == 'state':
+        if args.action == 'export':
+            manager.export_state(args.file, args.pins)
+        else:
+            manager.import_state(args.file, args.pins)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+LAN Cache/Mirror Server for dotbins
+
+One host pulls release assets from the internet; every other host on the
+network syncs from it at LAN speed. ``downloader.py serve`` exposes the local
+content-addressed cache and manifest over HTTP:
+
+    GET /manifest.json          The mirror's manifest.json
+    GET /objects/<sha256>       A cached object (fetched upstream on a miss)
+
+Both support HEAD, conditional requests (ETag / If-None-Match) and single
+byte ranges (Range / If-Range), so clients can resume interrupted transfers
+exactly as they do against GitHub. Bodies are sent with sendfile().
+
+On a miss the server looks the SHA256 up in its manifest (asset and delta
+digests) and downloads it through the normal verified, single-flight
+fetch_object() path before serving it. Objects are addressed by content, so
+a client verifies every byte against its own manifest anyway.
+
+Served objects count as used for the cache's LRU eviction; the mirror collects
+them in memory and records their access times in one index write at most
+once a minute (and when it shuts down), so requests don't queue on the
+cache index lock. Access log lines go through the downloader's progress
+reporter (``--progress quiet`` silences them).
+
+Clients list mirrors in ``~/.dotbins/mirrors.json`` (``{"mirrors":
+["http://mirror.lan:8765"]}``) or ``DOTBINS_MIRRORS``; ``sync_tool`` ranks them
+with the upstream URL and any local bundles by measured speed (sources.py).
+
+Usage:
+    python3 downloader.py serve --port 8765
+    DOTBINS_MIRRORS=http://mirror.lan:8765 dotbins-manager sync
+"""
+
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+
+DEFAULT_PORT = 8765
+
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+# Seconds between the index writes that record which objects were served
+TOUCH_INTERVAL = 60.0
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised for a Range header that doesn't overlap the file."""
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range ``Range: bytes=...`` header.
+
+    Returns:
+        (start, end) inclusive, or None to send the whole file (no header, or
+        a form we don't serve as a range, such as multiple ranges)
+
+    Raises:
+        RangeNotSatisfiable: The range lies outside the file
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[len('bytes='):].strip().partition('-')
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        elif last:
+            # Suffix range: the final N bytes
+            start, end = max(0, size - int(last)), size - 1
+        else:
+            return None
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+class MirrorRequestHandler(BaseHTTPRequestHandler):
+    """Serve the manifest and cache objects of a MirrorServer."""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'dotbins-mirror/1.0'
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def _serve(self, send_body: bool):
+        path = self.path.split('?', 1)[0]
+        mirror = self.server
+
+        if path == '/manifest.json':
+            file_path = mirror.downloader.manifest_path
+            content_type = 'application/json'
+            etag = None  # derived from the stat below
+        elif path.startswith('/objects/') and SHA256_RE.match(path[len('/objects/'):]):
+            sha256 = path[len('/objects/'):]
+            file_path = mirror.object_path(sha256)
+            content_type = 'application/octet-stream'
+            etag = f'"{sha256}"'
+        else:
+            file_path = None
+
+        try:
+            f = open(file_path, 'rb') if file_path else None
+        except OSError:
+            f = None
+        if f is None:
+            self._send_empty(404)
+            return
+
+        with f:
+            st = os.fstat(f.fileno())
+            size = st.st_size
+            if etag is None:
+                etag = f'"{size:x}-{st.st_mtime_ns:x}"'
+            last_modified = self.date_time_string(int(st.st_mtime))
+
+            if etag in (self.headers.get('If-None-Match') or ''):
+                self._send_empty(304, {'ETag': etag})
+                return
+
+            if_range = self.headers.get('If-Range')
+            try:
+                byte_range = None
+                if not if_range or if_range in (etag, last_modified):
+                    byte_range = parse_range(self.headers.get('Range'), size)
+            except RangeNotSatisfiable:
+                self._send_empty(416, {'Content-Range': f"bytes */{size}"})
+                return
+
+            start, end = byte_range or (0, size - 1)
+            length = end - start + 1 if size else 0
+
+            self.send_response(206 if byte_range else 200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(length))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+            if byte_range:
+                self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+            self.end_headers()
+
+            if send_body and length:
+                self.wfile.flush()
+                self.connection.sendfile(f, start, length)
+
+    def _send_empty(self, status: int, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        self.server.downloader.progress.info(f"{self.address_string()} {format % args}")
+
+    def log_error(self, format, *args):
+        self.server.downloader.progress.warning(f"{self.address_string()} {format % args}")
+
+
+class MirrorServer(ThreadingHTTPServer):
+    """HTTP server exposing a BinaryDownloader's cache and manifest."""
+
+    daemon_threads = True
+
+    def __init__(self, downloader, host: str = '0.0.0.0', port: int = DEFAULT_PORT,
+                 upstream: bool = True):
+        """
+        Initialize the server (it starts listening immediately).
+
+        Args:
+            downloader: BinaryDownloader whose cache and manifest are served
+            host: Address to bind
+            port: Port to bind (0 picks a free one)
+            upstream: Fetch objects missing from the cache from their
+                      manifest URL; otherwise a miss is a 404
+        """
+        super().__init__((host, port), MirrorRequestHandler)
+        self.downloader = downloader
+        self.upstream = upstream
+        self._sources: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._sources_catalog = None
+        self._sources_lock = threading.Lock()
+        self._used: Set[str] = set()
+        self._used_lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+    @property
+    def url(self) -> str:
+        """Base URL clients should use (as reachable on this host)."""
+        host, port = self.server_address[:2]
+        return f"http://{'127.0.0.1' if host == '0.0.0.0' else host}:{port}"
+
+    def object_path(self, sha256: str) -> Optional[Path]:
+        """Get the path of a cached object, fetching it upstream on a miss."""
+        cache = self.downloader.cache
+        if not cache.has(sha256):
+            source = self._upstream_source(sha256) if self.upstream else None
+            if source is None:
+                return None
+            url, key = source
+            if self.downloader.fetch_object(url, sha256, key=key) is None:
+                return None
+        self._mark_used(sha256)
+        return cache.object_path(sha256)
+
+    def _mark_used(self, sha256: str):
+        """Remember that an object was served, flushing at most once per TOUCH_INTERVAL."""
+        with self._used_lock:
+            self._used.add(sha256)
+            if time.monotonic() - self._flushed_at < TOUCH_INTERVAL:
+                return
+        self.flush_used()
+
+    def flush_used(self):
+        """Record the objects served since the last flush as used, in one index write."""
+        with self._used_lock:
+            used, self._used = self._used, set()
+            self._flushed_at = time.monotonic()
+        if used:
+            cache = self.downloader.cache
+            with cache.batch():
+                for sha256 in used:
+                    cache.touch(sha256)
+
+    def server_close(self):
+        self.flush_used()
+        super().server_close()
+
+    def _upstream_source(self, sha256: str) -> Optional[Tuple[str, Optional[str]]]:
+        """Find the (upstream URL, manifest key) of a digest the manifest knows about."""
+        catalog = self.downloader.catalog()
+        with self._sources_lock:
+            if self._sources_catalog is not catalog:
+                sources = {}
+                for key in catalog.keys():
+                    entry = catalog.get(key)
+                    if entry.get('sha256') and entry.get('url'):
+                        sources.setdefault(entry['sha256'], (entry['url'], key))
+                    for delta in (entry.get('delta') or {}).values():
+                        if isinstance(delta, dict) and delta.get('sha256') and delta.get('url'):
+                            sources.setdefault(delta['sha256'], (delta['url'], None))
+                self._sources, self._sources_catalog = sources, catalog
+            return self._sources.get(sha256)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Cached Version Probes for dotbins
+
+``verify`` runs every installed binary (``fzf --version``) to check it
+works. Running them one at a time means one slow tool stalls the whole
+report, and unchanged binaries get executed again on every check. Probes
+therefore:
+
+- run on a bounded thread pool (each probe is a subprocess, so threads are
+  enough), each with its own timeout
+- use per-tool commands: ``--version`` by default, or the ``probe`` arguments
+  of the tool in dotbins.yaml (``probe: version --client``, or ``probe: false``
+  for tools that can't be run unattended)
+- are cached in ``~/.cache/dotbins/probes.json``, keyed on the binary's
+  (size, mtime_ns, inode) and the probe arguments; an unchanged binary isn't
+  executed again. Timeouts and launch errors aren't cached, since they may be
+  transient.
+
+Each result records the version string the binary reported, which
+``list_installed`` shows instead of the manifest tag.
+
+Usage:
+    from probes import Prober
+
+    prober = Prober(cache_dir)
+    results = prober.probe_all([('fzf', bin_dir / 'fzf', ['--version'])])
+    results['fzf']['version']    # '0.66.1'
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .locking import FileLock
+except ImportError:
+    from locking import FileLock
+
+
+DEFAULT_ARGS = ['--version']
+
+# Seconds a single probe may run
+PROBE_TIMEOUT = 5.0
+
+# Concurrent probes (they mostly wait on subprocesses, not the CPU)
+DEFAULT_JOBS = 8
+
+# Characters of probe output kept in the cache
+OUTPUT_LIMIT = 200
+
+CACHE_VERSION = 1
+
+VERSION_RE = re.compile(r'(?<![\d.])v?(\d+(?:\.\d+)+(?:[-+][0-9A-Za-z.]+)?)')
+
+# Failing that, a bare number ending the first line ('zz 3')
+SHORT_VERSION_RE = re.compile(r'\s(?:v|version )?(\d+)\s*$')
+
+
+def probe_args(tool_config) -> Optional[List[str]]:
+    """
+    Get the probe arguments of a tool from its dotbins.yaml config.
+
+    Returns:
+        Arguments to run the binary with, or None if it mustn't be run
+    """
+    probe = tool_config.get('probe') if isinstance(tool_config, dict) else None
+    if probe is None or probe is True:
+        return list(DEFAULT_ARGS)
+    if probe is False:
+        return None
+    if isinstance(probe, str):
+        import shlex
+        return shlex.split(probe)
+    return [str(arg) for arg in probe]
+
+
+def parse_version(output: str) -> Optional[str]:
+    """Pick the version number out of ``--version`` output ('ripgrep 14.1.0' -> '14.1.0')."""
+    lines = output.splitlines()
+    for line in lines:
+        match = VERSION_RE.search(line)
+        if match:
+            return match.group(1)
+    match = SHORT_VERSION_RE.search(lines[0]) if lines else None
+    return match.group(1) if match else None
+
+
+def _fingerprint(st: os.stat_result) -> list:
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+class Prober:
+    """Runs version probes of installed binaries concurrently, with a result cache."""
+
+    def __init__(self, cache_dir: Path, jobs: int = DEFAULT_JOBS, timeout: float = PROBE_TIMEOUT):
+        """
+        Initialize the prober.
+
+        Args:
+            cache_dir: Cache directory holding probes.json
+            jobs: Concurrent probes
+            timeout: Seconds each probe may run
+        """
+        self.cache_path = cache_dir / 'probes.json'
+        self.lock_path = cache_dir / 'locks' / 'probes.lock'
+        self.jobs = max(1, jobs)
+        self.timeout = timeout
+        self.executed = 0  # Binaries actually run by the last probe_all()
+        self._cache: Optional[Dict[str, Dict]] = None
+        self._count_lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.cache_path, 'r') as f:
+                cache = json.load(f)
+            if isinstance(cache, dict) and cache.get('version') == CACHE_VERSION:
+                return cache.get('binaries', {})
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def _save(self, results: Dict[str, Dict]):
+        """Merge fresh results into the on-disk cache."""
+        with FileLock(self.lock_path):
+            binaries = self._load()
+            binaries.update(results)
+            tmp_path = self.cache_path.with_name(f"{self.cache_path.name}.{os.getpid()}.tmp")
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump({'version': CACHE_VERSION, 'binaries': binaries}, f, indent=2, sort_keys=True)
+                os.replace(tmp_path, self.cache_path)
+            except OSError:
+                tmp_path.unlink(missing_ok=True)
+        self._cache = binaries
+
+    def cached(self, binary_path: Path, args: Optional[List[str]] = None) -> Optional[Dict]:
+        """
+        Get the cached probe result of a binary, if it is still unchanged.
+
+        Args:
+            binary_path: Installed binary
+            args: Probe arguments the result must be for (default: any)
+
+        Returns:
+            Result dictionary (see probe_all), or None
+        """
+        if self._cache is None:
+            self._cache = self._load()
+        entry = self._cache.get(os.path.abspath(binary_path))
+        if entry is None or (args is not None and entry.get('args') != args):
+            return None
+        try:
+            fingerprint = _fingerprint(binary_path.stat())
+        except OSError:
+            return None
+        if entry.get('fingerprint') != fingerprint:
+            return None
+        return dict(entry, source='cache')
+
+    def probe_all(self, binaries: List[Tuple[str, Path, List[str]]],
+                  refresh: bool = False) -> Dict[str, Dict]:
+        """
+        Probe binaries concurrently.
+
+        Args:
+            binaries: (name, binary path, probe arguments) to run
+            refresh: Run every binary, even ones with a valid cached result
+
+        Returns:
+            name -> {'ok', 'message', 'version', 'output', 'returncode',
+            'checked_at', 'source'}; source is 'cache' or 'run'
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.executed = 0
+
+        def probe(item):
+            name, binary_path, args = item
+            result = None if refresh else self.cached(binary_path, args)
+            return name, binary_path, result or self._run(binary_path, args)
+
+        with ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix='dotbins-probe') as pool:
+            probed = list(pool.map(probe, binaries))
+
+        fresh = {
+            os.path.abspath(binary_path): {k: v for k, v in result.items() if k != 'source'}
+            for _, binary_path, result in probed
+            if result['source'] == 'run' and result.get('fingerprint')
+        }
+        if fresh:
+            self._save(fresh)
+        return {name: result for name, _, result in probed}
+
+    def _run(self, binary_path: Path, args: List[str]) -> Dict:
+        """Run one probe; the result carries a fingerprint only if it may be cached."""
+        import subprocess
+
+        with self._count_lock:
+            self.executed += 1
+        result = {'args': args, 'checked_at': time.time(), 'source': 'run',
+                  'version': None, 'output': None, 'returncode': None}
+        try:
+            fingerprint = _fingerprint(binary_path.stat())
+            completed = subprocess.run([str(binary_path)] + args, stdin=subprocess.DEVNULL,
+                                       capture_output=True, timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            return dict(result, ok=False, message=f"Timeout after {self.timeout:g}s")
+        except OSError as e:
+            return dict(result, ok=False, message=f"Error - {e}")
+
+        # Some tools print their version to stderr
+        output = (completed.stdout or completed.stderr).decode('utf-8', 'replace').strip()
+        result.update(fingerprint=fingerprint, returncode=completed.returncode,
+                      output=output[:OUTPUT_LIMIT], version=parse_version(output))
+        if completed.returncode != 0:
+            return dict(result, ok=False, message=f"Failed (exit code {completed.returncode})")
+        return dict(result, ok=True, message='Working')
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Progress and Event Reporting for dotbins
+
+Downloads, extraction and verification report through a Reporter instead of
+printing, so the same events can be rendered for whoever is watching:
+
+- ``tty``: a live multi-task view (one line per tool being synced, redrawn
+  at most 10 times a second); warnings, errors and results scroll above it
+- ``plain``: line-oriented log output for pipes and CI; progress at most every
+  few seconds per task, lines prefixed with the tool when several run at once
+- ``jsonl``: one JSON object per event (start, phase, progress, message,
+  finish) for machines
+- ``quiet``: warnings and errors only
+
+``auto`` (the default, or ``$DOTBINS_PROGRESS``) picks ``tty`` when stdout is
+a terminal and ``plain`` otherwise.
+
+Events belong to a task (a manifest key such as ``fzf/linux/amd64``). The
+task a thread is working on is tracked per thread, so code deep in the
+download path just calls ``reporter.advance(done, total)`` or
+``reporter.warning(...)`` and the event lands on the right line even when
+several tools sync concurrently.
+
+Usage:
+    from progress import make_reporter
+
+    reporter = make_reporter('auto')
+    reporter.start('fzf/linux/amd64', 'Syncing fzf (linux/amd64)')
+    with reporter.working_on('fzf/linux/amd64'):
+        reporter.phase('download')
+        reporter.advance(1024, 4096)
+    reporter.finish('fzf/linux/amd64', True, 'Installed')
+"""
+
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+MODES = ('auto', 'tty', 'plain', 'jsonl', 'quiet')
+
+# Seconds between redraws of the tty view
+TTY_REFRESH = 0.1
+
+# Seconds between progress lines per task in plain mode
+PLAIN_INTERVAL = 5.0
+
+# Seconds between progress events per task in jsonl mode
+JSONL_INTERVAL = 1.0
+
+# Task rows shown at once in the tty view
+TTY_MAX_ROWS = 12
+
+LEVEL_PREFIXES = {'info': '', 'success': '✓ ', 'warning': 'WARNING: ', 'error': 'ERROR: '}
+
+
+def format_bytes(size: float) -> str:
+    """Format a byte count for humans (e.g. '12.3 MiB')."""
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024 or unit == 'GiB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class Reporter:
+    """
+    Base reporter: tracks tasks and the current task of each thread.
+
+    Subclasses render by overriding the ``_on_*`` hooks; every hook is called
+    with the reporter's lock held.
+    """
+
+    def __init__(self, stream=None):
+        """
+        Initialize the reporter.
+
+        Args:
+            stream: Output stream (default: sys.stdout at the time of writing)
+        """
+        self._stream = stream
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self.tasks: Dict[str, Dict] = {}
+
+    @property
+    def stream(self):
+        return self._stream or sys.stdout
+
+    def _write(self, text: str):
+        stream = self.stream
+        stream.write(text)
+        stream.flush()
+
+    # Tasks
+
+    def start(self, task: str, title: Optional[str] = None):
+        """Register a task (e.g. a manifest key) about to be worked on."""
+        with self._lock:
+            if task in self.tasks:
+                return
+            self.tasks[task] = {
+                'title': title, 'phase': None, 'done': 0, 'total': None,
+                'status': '', 'reported_at': 0.0, 'started_at': time.monotonic()
+            }
+            self._on_start(task, self.tasks[task])
+
+    @contextmanager
+    def working_on(self, task: str):
+        """Attribute this thread's events to ``task`` for the duration of the block."""
+        self.start(task)
+        previous = getattr(self._local, 'task', None)
+        self._local.task = task
+        try:
+            yield
+        finally:
+            self._local.task = previous
+
+    @property
+    def current(self) -> Optional[str]:
+        """The task this thread is working on, if any."""
+        return getattr(self._local, 'task', None)
+
+    def phase(self, phase: str, total: Optional[int] = None):
+        """Enter a phase ('download', 'extract', ...) of the current task."""
+        task = self.current
+        with self._lock:
+            info = self.tasks.get(task)
+            if info is None:
+                return
+            info.update(phase=phase, done=0, total=total, reported_at=0.0)
+            self._on_phase(task, info)
+
+    def advance(self, done: int, total: Optional[int] = None):
+        """
+        Report progress of the current task's phase.
+
+        Cheap enough to call per chunk: output is throttled by the renderer.
+        """
+        info = self.tasks.get(self.current)
+        if info is None:
+            return
+        info['done'] = done
+        if total:
+            info['total'] = total
+        if self._due(info):
+            with self._lock:
+                self._on_progress(self.current, info)
+
+    def _due(self, info: Dict) -> bool:
+        """Whether a progress update should be rendered now."""
+        return False
+
+    def finish(self, task: str, ok: bool = True, message: Optional[str] = None):
+        """Mark a task done (it need not have been started)."""
+        with self._lock:
+            info = self.tasks.pop(task, None)
+            self._on_finish(task, info, ok, message)
+
+    # Messages
+
+    def message(self, level: str, text: str):
+        """Report a message for the current task (or globally)."""
+        with self._lock:
+            self._on_message(self.current, level, text)
+
+    def info(self, text: str):
+        self.message('info', text)
+
+    def success(self, text: str):
+        self.message('success', text)
+
+    def warning(self, text: str):
+        self.message('warning', text)
+
+    def error(self, text: str):
+        self.message('error', text)
+
+    def close(self):
+        """Flush any pending output."""
+
+    # Rendering hooks
+
+    def _on_start(self, task: str, info: Dict):
+        pass
+
+    def _on_phase(self, task: str, info: Dict):
+        pass
+
+    def _on_progress(self, task: str, info: Dict):
+        pass
+
+    def _on_finish(self, task: str, info: Optional[Dict], ok: bool, message: Optional[str]):
+        pass
+
+    def _on_message(self, task: Optional[str], level: str, text: str):
+        pass
+
+
+class PlainReporter(Reporter):
+    """Line-oriented output for logs and pipes."""
+
+    def _prefix(self, task: Optional[str]) -> str:
+        # Interleaved output of concurrent tasks needs to say whose line it is
+        return f"[{task}] " if task and len(self.tasks) > 1 else ''
+
+    def _on_start(self, task, info):
+        if info['title']:
+            self._write(f"\n=== {info['title']} ===\n")
+
+    def _due(self, info):
+        now = time.monotonic()
+        if now - info['reported_at'] < PLAIN_INTERVAL:
+            return False
+        info['reported_at'] = now
+        # The first report comes one interval in: quick transfers print nothing
+        return now - info['started_at'] >= PLAIN_INTERVAL
+
+    def _on_progress(self, task, info):
+        if info['total']:
+            self._write(f"{self._prefix(task)}Progress: {info['done'] / info['total'] * 100:.0f}% "
+                        f"of {format_bytes(info['total'])}\n")
+        else:
+            self._write(f"{self._prefix(task)}Progress: {format_bytes(info['done'])}\n")
+
+    def _on_finish(self, task, info, ok, message):
+        if message:
+            # Results are read out of context (e.g. after a parallel sync): always name the task
+            self._on_message(None, 'success' if ok else 'error', f"{task}: {message}")
+
+    def _on_message(self, task, level, text):
+        body = text.lstrip('\n')
+        leading = text[:len(text) - len(body)]
+        self._write(f"{leading}{self._prefix(task)}{LEVEL_PREFIXES[level]}{body}\n")
+
+
+class QuietReporter(PlainReporter):
+    """Warnings and errors only."""
+
+    def _on_start(self, task, info):
+        pass
+
+    def _due(self, info):
+        return False
+
+    def _on_finish(self, task, info, ok, message):
+        if message and not ok:
+            self._on_message(None, 'error', f"{task}: {message}")
+
+    def _on_message(self, task, level, text):
+        if level in ('warning', 'error'):
+            super()._on_message(task, level, text)
+
+
+class JSONLinesReporter(Reporter):
+    """One JSON object per event, for CI and other programs."""
+
+    def _emit(self, event: str, task: Optional[str], **fields):
+        record = {'ts': round(time.time(), 3), 'event': event}
+        if task:
+            record['task'] = task
+        record.update((k, v) for k, v in fields.items() if v is not None)
+        self._write(json.dumps(record) + '\n')
+
+    def _on_start(self, task, info):
+        self._emit('start', task, title=info['title'])
+
+    def _on_phase(self, task, info):
+        self._emit('phase', task, phase=info['phase'], total=info['total'])
+
+    def _due(self, info):
+        now = time.monotonic()
+        if now - info['reported_at'] < JSONL_INTERVAL and info['done'] != info['total']:
+            return False
+        info['reported_at'] = now
+        return True
+
+    def _on_progress(self, task, info):
+        self._emit('progress', task, phase=info['phase'], done=info['done'], total=info['total'])
+
+    def _on_finish(self, task, info, ok, message):
+        elapsed = round(time.monotonic() - info['started_at'], 3) if info else None
+        self._emit('finish', task, ok=ok, message=message, elapsed=elapsed)
+
+    def _on_message(self, task, level, text):
+        self._emit('message', task, level=level, message=text.strip())
+
+
+class TTYReporter(Reporter):
+    """Live multi-task view for terminals."""
+
+    def __init__(self, stream=None):
+        super().__init__(stream)
+        self._drawn = 0         # Rows of the task view currently on screen
+        self._rendered_at = 0.0
+
+    def _due(self, info):
+        return time.monotonic() - self._rendered_at >= TTY_REFRESH
+
+    def _row(self, task: str, info: Dict, width: int) -> str:
+        if info['total']:
+            fraction = min(info['done'] / info['total'], 1.0)
+            filled = int(fraction * 20)
+            detail = (f"[{'#' * filled}{'-' * (20 - filled)}] {fraction * 100:5.1f}% "
+                      f"{format_bytes(info['done'])}/{format_bytes(info['total'])}")
+        elif info['done']:
+            detail = format_bytes(info['done'])
+        else:
+            detail = info['status']
+        row = f"  {task:<30} {info['phase'] or 'waiting':<9} {detail}"
+        return row[:width - 1]
+
+    def _render(self, lines=()):
+        """Redraw the task view, writing any finished lines above it."""
+        width = shutil.get_terminal_size((80, 24)).columns
+        out = []
+        if self._drawn:
+            # Back to the first row of the view, then clear to the end of the screen
+            out.append(f"\x1b[{self._drawn}F\x1b[J")
+        out.extend(f"{line}\n" for line in lines)
+
+        rows = [self._row(task, info, width) for task, info in self.tasks.items()]
+        if len(rows) > TTY_MAX_ROWS:
+            rows = rows[:TTY_MAX_ROWS - 1] + [f"  ... and {len(rows) - TTY_MAX_ROWS + 1} more"]
+        out.extend(f"{row}\n" for row in rows)
+        self._drawn = len(rows)
+        self._rendered_at = time.monotonic()
+        self._write(''.join(out))
+
+    def _on_start(self, task, info):
+        self._render()
+
+    def _on_phase(self, task, info):
+        self._render()
+
+    def _on_progress(self, task, info):
+        self._render()
+
+    def _on_finish(self, task, info, ok, message):
+        mark = '✓' if ok else '✗'
+        self._render([f"{mark} {task}" + (f": {message}" if message else '')])
+
+    def _on_message(self, task, level, text):
+        text = text.strip()
+        info = self.tasks.get(task)
+        if info is not None and level in ('info', 'success'):
+            # Chatter about a running task only updates its row
+            info['status'] = text
+            if self._due(info):
+                self._render()
+            return
+        prefix = f"{task}: " if task else ''
+        self._render([f"{LEVEL_PREFIXES[level]}{prefix}{text}"])
+
+    def close(self):
+        with self._lock:
+            if self._drawn:
+                self._render()
+
+
+def make_reporter(mode: Optional[str] = None, stream=None) -> Reporter:
+    """
+    Create a reporter.
+
+    Args:
+        mode: One of MODES (default: $DOTBINS_PROGRESS or 'auto')
+        stream: Output stream (default: sys.stdout)
+
+    Returns:
+        Reporter for the mode
+    """
+    mode = mode or os.environ.get('DOTBINS_PROGRESS') or 'auto'
+    if mode == 'auto':
+        out = stream or sys.stdout
+        is_tty = hasattr(out, 'isatty') and out.isatty()
+        mode = 'tty' if is_tty and os.environ.get('TERM') != 'dumb' else 'plain'
+    reporters = {
+        'tty': TTYReporter,
+        'plain': PlainReporter,
+        'jsonl': JSONLinesReporter,
+        'quiet': QuietReporter,
+    }
+    if mode not in reporters:
+        raise ValueError(f"Unknown progress mode: {mode} (choose from {', '.join(MODES)})")
+    return reporters[mode](stream)
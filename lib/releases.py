@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Release History Index for dotbins
+
+manifest.json describes one release per tool and platform: the latest. To
+install or pin an older version, dotbins keeps a per-tool history of every
+release it has seen:
+
+    ~/.cache/dotbins/releases/
+    ├── fzf.json          # {"tags": {"v0.54.0": {"linux/amd64": entry, ...}, ...}}
+    ├── bat.json
+    └── ingested          # SHA256 of the last manifest merged in
+
+Whenever the manifest changes (a ``git pull`` of the dotbins repo, or
+``sync --manifest-url``), its entries are merged into the index, so the
+history grows with each release that passes through the manifest. A
+manifest entry can also list older releases explicitly, for history the
+index hasn't seen yet:
+
+    "fzf/linux/amd64": {
+      "tag": "v0.54.0", "url": "...", "sha256": "...",
+      "releases": {
+        "v0.53.0": {"url": ".../fzf-0.53.0-linux_amd64.tar.gz", "sha256": "..."}
+      }
+    }
+
+Release entries are stored whole (url, sha256, binary_name, ...), so
+``sync_tool`` installs them exactly like manifest entries. A lookup reads
+one small file per tool and is a dict access after that, and works offline
+once the index is in the cache.
+
+Usage:
+    from releases import ReleaseIndex
+
+    releases = ReleaseIndex(cache_dir / 'releases', cache_dir / 'locks')
+    releases.ingest(catalog)
+    entry = releases.get('fzf', '0.53.0', 'linux', 'amd64')
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    from .locking import FileLock
+except ImportError:
+    from locking import FileLock
+
+
+INDEX_VERSION = 1
+
+
+def tag_variants(tag: str) -> List[str]:
+    """Spellings a version may be written in ('1.2' and 'v1.2' are the same release)."""
+    tag = str(tag)
+    bare = tag[1:] if tag[:1] in ('v', 'V') and tag[1:2].isdigit() else tag
+    return [tag] + [variant for variant in (bare, f"v{bare}") if variant != tag]
+
+
+class ReleaseIndex:
+    """Per-tool index of known releases: tag -> 'platform/arch' -> entry."""
+
+    def __init__(self, index_dir: Path, locks_dir: Path):
+        """
+        Initialize the index.
+
+        Args:
+            index_dir: Directory holding one <tool>.json per tool
+            locks_dir: Directory for the index's cross-process lock
+        """
+        self.index_dir = index_dir
+        self.lock_path = locks_dir / 'releases.lock'
+        self.ingested_path = index_dir / 'ingested'
+        self._lock = threading.Lock()
+        self._tools: Dict[str, Dict[str, Dict]] = {}
+
+    def _tool_path(self, tool_name: str) -> Path:
+        return self.index_dir / f"{tool_name}.json"
+
+    def _read(self, tool_name: str) -> Dict[str, Dict]:
+        try:
+            with open(self._tool_path(tool_name), 'r') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get('version') == INDEX_VERSION:
+                return data.get('tags', {})
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def _write(self, tool_name: str, tags: Dict[str, Dict]):
+        path = self._tool_path(tool_name)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': INDEX_VERSION, 'tags': tags}, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+
+    def releases(self, tool_name: str) -> Dict[str, Dict]:
+        """Get a tool's known releases (tag -> 'platform/arch' -> entry)."""
+        with self._lock:
+            if tool_name not in self._tools:
+                self._tools[tool_name] = self._read(tool_name)
+            return self._tools[tool_name]
+
+    def tags(self, tool_name: str) -> List[str]:
+        """Get the tags known for a tool."""
+        return sorted(self.releases(tool_name))
+
+    def get(self, tool_name: str, tag: str, platform: str, arch: str) -> Optional[Dict]:
+        """
+        Get the entry of one release of a tool for a platform.
+
+        Returns:
+            Manifest-style entry (with its 'tag'), or None if unknown
+        """
+        releases = self.releases(tool_name)
+        for variant in tag_variants(tag):
+            entry = releases.get(variant, {}).get(f"{platform}/{arch}")
+            if entry is not None:
+                return dict(entry, tag=variant)
+        return None
+
+    def ingest(self, catalog) -> bool:
+        """
+        Merge a manifest's releases into the index (once per manifest content).
+
+        Args:
+            catalog: ManifestCatalog of the manifest
+
+        Returns:
+            True if the index changed
+        """
+        if not catalog.sha256 or self._last_ingested() == catalog.sha256:
+            return False
+
+        found: Dict[str, Dict[str, Dict]] = {}
+        for key in catalog.keys():
+            tool_name, platform, arch = key.split('/')
+            entry = catalog.get(key)
+            tool_releases = found.setdefault(tool_name, {})
+            for tag, release in (entry.get('releases') or {}).items():
+                if isinstance(release, dict) and release.get('url'):
+                    # Older releases inherit binary_name etc. from the current entry
+                    merged = {k: v for k, v in entry.items() if k not in ('releases', 'delta', 'size')}
+                    merged.update(release)
+                    tool_releases.setdefault(str(tag), {})[f"{platform}/{arch}"] = merged
+            if entry.get('url') and entry.get('tag') is not None:
+                current = {k: v for k, v in entry.items() if k != 'releases'}
+                tool_releases.setdefault(str(entry['tag']), {})[f"{platform}/{arch}"] = current
+
+        changed = False
+        with FileLock(self.lock_path):
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            for tool_name, releases in found.items():
+                tags = self._read(tool_name)
+                before = json.dumps(tags, sort_keys=True)
+                for tag, platforms in releases.items():
+                    tags.setdefault(tag, {}).update(platforms)
+                if json.dumps(tags, sort_keys=True) != before:
+                    self._write(tool_name, tags)
+                    changed = True
+            self._mark_ingested(catalog.sha256)
+
+        with self._lock:
+            self._tools.clear()
+        return changed
+
+    def _last_ingested(self) -> Optional[str]:
+        try:
+            return self.ingested_path.read_text().strip()
+        except OSError:
+            return None
+
+    def _mark_ingested(self, sha256: str):
+        try:
+            self.ingested_path.write_text(sha256 + '\n')
+        except OSError:
+            pass
@@ -23,6 +23,11 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+try:
+    from .integrity import IntegrityIndex, OK, UNTRACKED
+except ImportError:
+    from integrity import IntegrityIndex, OK, UNTRACKED
+
 
 class SecurityScanner:
     """Security scanning for CLI tools."""
@@ -100,13 +105,21 @@ class SecurityScanner:
             print(f"Warning: CVE check error: {e}")
             return []
     
-    def verify_binary(self, binary_path: Path, expected_sha256: Optional[str] = None) -> Tuple[bool, str]:
+    def verify_binary(self, binary_path: Path, expected_sha256: Optional[str] = None,
+                      integrity_index: Optional[IntegrityIndex] = None,
+                      full: bool = False) -> Tuple[bool, str]:
         """
         Verify a binary file.
         
+        Without an expected SHA256, a binary recorded in the integrity index
+        is checked against it: an unchanged stat fingerprint passes without
+        reading the file, ``full`` forces a (blake2b) re-hash.
+        
         Args:
             binary_path: Path to binary
             expected_sha256: Expected SHA256 hash (optional)
+            integrity_index: Index of installed binaries (optional)
+            full: Re-hash instead of trusting unchanged stat data
             
         Returns:
             Tuple of (is_valid, message)
@@ -135,6 +148,14 @@ class SecurityScanner:
             if actual != expected_sha256:
                 return False, f"SHA256 mismatch: expected {expected_sha256}, got {actual}"
         
+        elif integrity_index is not None:
+            status, message = integrity_index.check(binary_path, full=full)
+            if status == UNTRACKED:
+                return True, f"Binary verified ({message.lower()})"
+            if status != OK:
+                return False, message
+            return True, f"Binary verified: {message.lower()}"
+        
         return True, "Binary verified"
     
     def scan_binary_properties(self, binary_path: Path) -> Dict:
@@ -239,6 +260,10 @@ def main():
     parser.add_argument('--version', help='Tool version')
     parser.add_argument('--path', help='Path to binary')
     parser.add_argument('--sha256', help='Expected SHA256 hash')
+    parser.add_argument('--dotbins-dir', default=str(Path('~/.dotbins').expanduser()),
+                        help='dotbins directory whose integrity index to check against')
+    parser.add_argument('--full', action='store_true',
+                        help='Re-hash instead of trusting unchanged stat data')
     
     args = parser.parse_args()
     
@@ -251,7 +276,9 @@ def main():
         
         valid, message = scanner.verify_binary(
             Path(args.path),
-            args.sha256
+            args.sha256,
+            integrity_index=IntegrityIndex(Path(args.dotbins_dir)),
+            full=args.full
         )
         
         if valid:
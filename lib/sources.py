@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Download Source Ranking for dotbins
+
+An asset with a known SHA256 can come from anywhere: a LAN mirror
+(``downloader.py serve``), a local bundle directory (a USB stick, an NFS share
+or another host's cache) or its upstream URL. The digest is verified whatever
+the source, so the downloader is free to pick the fastest one and to fail
+over to the next when a source dies - resuming the partial file where the
+previous source stopped.
+
+Sources are ranked by their expected time for the download::
+
+    latency + size / throughput
+
+using exponentially weighted moving averages of the latency (time to the
+response headers) and throughput measured on every transfer. Sources that
+have never been measured use a prior for their kind (bundle < mirror <
+upstream). A failure benches a source for a cooldown that doubles with each
+consecutive failure, and a success clears it. A miss - a mirror or bundle
+that simply doesn't have the object - is counted but doesn't bench it.
+
+The measurements are kept in ``~/.cache/dotbins/sources.json`` so the
+ranking carries over between runs; updates are merged into the file under
+``locks/sources.lock``.
+
+Usage:
+    from sources import Source, SourceStats
+
+    stats = SourceStats(cache_dir)
+    for source in stats.rank(candidates, size=asset_size):
+        ...
+        stats.record_success(source, latency, throughput)
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    from .locking import FileLock
+except ImportError:
+    from locking import FileLock
+
+
+# Weight of a new measurement in the moving averages
+EWMA_ALPHA = 0.3
+
+# Size assumed when ranking for an asset of unknown size
+DEFAULT_SIZE_ESTIMATE = 10 * 1024 * 1024
+
+# Only transfers at least this large update the throughput estimate
+MIN_THROUGHPUT_SAMPLE = 64 * 1024
+
+# Benched after a failure for FAILURE_COOLDOWN * 2^(failures - 1) seconds, up to MAX_COOLDOWN
+FAILURE_COOLDOWN = 60.0
+MAX_COOLDOWN = 3600.0
+
+# Unmeasured sources: (latency seconds, throughput bytes/second) by kind
+PRIORS = {
+    'bundle': (0.001, 200 * 1024 * 1024),
+    'mirror': (0.005, 50 * 1024 * 1024),
+    'upstream': (0.2, 5 * 1024 * 1024),
+}
+
+
+class Source:
+    """One place an asset can be fetched from."""
+
+    def __init__(self, kind: str, name: str, location: str):
+        """
+        Initialize the source.
+
+        Args:
+            kind: 'mirror', 'bundle' or 'upstream'
+            name: Key its statistics are kept under (mirror base URL,
+                  bundle directory, or 'upstream:<host>')
+            location: URL (mirror/upstream) or file path (bundle) of the asset
+        """
+        self.kind = kind
+        self.name = name
+        self.location = location
+
+    def __repr__(self) -> str:
+        return f"Source({self.kind!r}, {self.name!r}, {self.location!r})"
+
+
+class SourceStats:
+    """Persistent latency/throughput statistics and ranking of sources."""
+
+    def __init__(self, cache_dir: Path):
+        """
+        Initialize the statistics.
+
+        Args:
+            cache_dir: Cache directory holding sources.json
+        """
+        self.path = cache_dir / 'sources.json'
+        self.lock_path = cache_dir / 'locks' / 'sources.lock'
+        self._lock = threading.Lock()
+        self._stats: Optional[Dict[str, Dict]] = None
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, 'r') as f:
+                stats = json.load(f)
+            if isinstance(stats, dict):
+                return stats
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def _update(self, name: str, mutate: Callable[[Dict], None]):
+        """Apply a change to the latest on-disk statistics of one source."""
+        with self._lock, FileLock(self.lock_path):
+            stats = self._load()
+            mutate(stats.setdefault(name, {}))
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp_path, 'w') as f:
+                    json.dump(stats, f, indent=2)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                tmp_path.unlink(missing_ok=True)
+            self._stats = stats
+
+    def get(self, name: str) -> Dict:
+        """Get the recorded statistics of a source (empty if never measured)."""
+        with self._lock:
+            if self._stats is None:
+                self._stats = self._load()
+            return dict(self._stats.get(name, {}))
+
+    def estimate(self, source: Source, size: Optional[int] = None) -> float:
+        """
+        Estimate the seconds a source needs for an asset.
+
+        Returns:
+            Expected transfer time; benched sources get a huge penalty so they
+            are only tried after every healthy one
+        """
+        stats = self.get(source.name)
+        prior_latency, prior_throughput = PRIORS.get(source.kind, PRIORS['upstream'])
+        latency = stats.get('latency', prior_latency)
+        throughput = stats.get('throughput', prior_throughput)
+        cost = latency + (size or DEFAULT_SIZE_ESTIMATE) / max(throughput, 1.0)
+
+        failures = stats.get('failures', 0)
+        if failures:
+            cooldown = min(FAILURE_COOLDOWN * 2 ** (failures - 1), MAX_COOLDOWN)
+            if time.time() - stats.get('failed_at', 0) < cooldown:
+                cost += 1e9
+        return cost
+
+    def rank(self, sources: List[Source], size: Optional[int] = None) -> List[Source]:
+        """Order sources fastest first (ties keep the given order)."""
+        return sorted(sources, key=lambda source: self.estimate(source, size))
+
+    def record_success(self, source: Source, latency: Optional[float] = None,
+                       throughput: Optional[float] = None):
+        """
+        Record a completed transfer.
+
+        Args:
+            source: Source used
+            latency: Seconds until the response headers arrived
+            throughput: Bytes per second of the body (None for small transfers)
+        """
+        def mutate(stats):
+            for field, value in (('latency', latency), ('throughput', throughput)):
+                if value is not None:
+                    old = stats.get(field)
+                    stats[field] = value if old is None else old + EWMA_ALPHA * (value - old)
+            stats['failures'] = 0
+            stats['successes'] = stats.get('successes', 0) + 1
+            stats['used_at'] = time.time()
+
+        self._update(source.name, mutate)
+
+    def record_failure(self, source: Source):
+        """Record a failed transfer, benching the source for a while."""
+        def mutate(stats):
+            stats['failures'] = stats.get('failures', 0) + 1
+            stats['failed_at'] = time.time()
+
+        self._update(source.name, mutate)
+
+    def record_miss(self, source: Source):
+        """Record that a healthy source doesn't have an object (not a failure)."""
+        def mutate(stats):
+            stats['misses'] = stats.get('misses', 0) + 1
+            stats['missed_at'] = time.time()
+
+        self._update(source.name, mutate)
+
+    def all(self) -> Dict[str, Dict]:
+        """Get the statistics of every known source."""
+        with self._lock:
+            self._stats = self._load()
+            return {name: dict(stats) for name, stats in self._stats.items()}
@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+"""
+Installation State Stores for dotbins
+
+Installed-tool state, version pins and an install history live behind one
+small interface with two backends:
+
+- JSONStateStore: ``state.json`` + ``.pins.json`` (the original format) and an
+  append-only ``history.jsonl``. State is kept in memory and only re-read when
+  the file changes on disk.
+- SQLiteStateStore: a single ``state.db`` in WAL mode, indexed by
+  tool/platform/arch, so a sync of thousands of entries updates rows instead
+  of rewriting one big file.
+
+Either store can group writes with ``batch()``: sync_all records every tool
+it installs and the store writes them out once (one rewrite of state.json,
+or one SQLite transaction) at the end.
+
+Concurrent dotbins processes don't lose each other's updates: state.json and
+.pins.json are re-read and merged under an advisory lock (see locking.py)
+before every write, and SQLite writes use ``BEGIN IMMEDIATE`` transactions.
+
+The backend is chosen with ``DOTBINS_STATE_BACKEND`` (``json`` or
+``sqlite``); an existing ``state.db`` selects SQLite. A new SQLite store
+imports state.json and .pins.json on creation, and ``export_json()`` writes
+them back out for compatibility.
+
+Usage:
+    from state import open_state_store
+
+    store = open_state_store(cache_dir, dotbins_dir)
+    with store.batch():
+        store.put('fzf/linux/amd64', {...})
+    pins = store.pins()
+"""
+
+import copy
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+try:
+    from .locking import FileLock
+except ImportError:
+    from locking import FileLock
+
+
+def _sqlite_available() -> bool:
+    """Check for sqlite3 (imported on demand: only the SQLite backend needs it)."""
+    try:
+        import sqlite3  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+BACKENDS = ('json', 'sqlite')
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS installs (
+    key TEXT PRIMARY KEY,
+    tool TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    arch TEXT NOT NULL,
+    info TEXT NOT NULL,
+    installed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS installs_tool ON installs (tool, platform, arch);
+CREATE TABLE IF NOT EXISTS pins (
+    tool TEXT PRIMARY KEY,
+    version TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tool TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    arch TEXT NOT NULL,
+    action TEXT NOT NULL,
+    tag TEXT,
+    generation TEXT,
+    sha256 TEXT,
+    at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_tool ON history (tool, platform, arch, id);
+"""
+
+
+def _split_key(key: str) -> List[str]:
+    """Split 'tool/platform/arch' (padding keys that don't have three parts)."""
+    parts = key.split('/', 2)
+    return parts + [''] * (3 - len(parts))
+
+
+def _timestamp() -> str:
+    return datetime.utcnow().isoformat() + 'Z'
+
+
+def _write_json(path: Path, data):
+    """Atomically write a JSON file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: Path) -> Dict:
+    if not path.exists():
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+class JSONStateStore:
+    """State in state.json, pins in .pins.json, history in history.jsonl."""
+
+    backend = 'json'
+
+    def __init__(self, state_path: Path, pins_path: Path, history_path: Path,
+                 lock_dir: Optional[Path] = None):
+        """
+        Initialize the store.
+
+        Args:
+            state_path: Path of state.json
+            pins_path: Path of .pins.json
+            history_path: Path of the append-only history.jsonl
+            lock_dir: Directory for state.lock (default: beside state.json);
+                      pins are locked by .pins.json.lock beside .pins.json
+        """
+        self.state_path = Path(state_path)
+        self.pins_path = Path(pins_path)
+        self.history_path = Path(history_path)
+        self.state_lock_path = Path(lock_dir or self.state_path.parent) / 'state.lock'
+        self.pins_lock_path = self.pins_path.with_name(f"{self.pins_path.name}.lock")
+
+        self._lock = threading.RLock()
+        self._state: Optional[Dict] = None
+        self._state_stamp = None
+        self._batch_depth = 0
+        # Changes not yet written: key -> info (None = deleted)
+        self._pending: Dict[str, Optional[Dict]] = {}
+        self._replaced = False
+
+    @staticmethod
+    def _stamp(path: Path):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns, st.st_ino
+
+    def _apply_pending(self, state: Dict):
+        for key, info in self._pending.items():
+            if info is None:
+                state.pop(key, None)
+            else:
+                state[key] = info
+
+    def _load(self) -> Dict:
+        """
+        Return the in-memory state (with pending changes applied), re-reading
+        state.json if another process rewrote it. Caller holds the lock.
+        """
+        stamp = self._stamp(self.state_path)
+        if self._state is None or (stamp != self._state_stamp and not self._replaced):
+            self._state = _read_json(self.state_path)
+            self._state_stamp = stamp
+            self._apply_pending(self._state)
+        return self._state
+
+    def _changed(self):
+        """Write pending changes now, or at the end of the current batch. Caller holds the lock."""
+        if not self._batch_depth:
+            self._flush()
+
+    def _flush(self):
+        """Merge pending changes into the latest state.json and write it. Caller holds the lock."""
+        with FileLock(self.state_lock_path):
+            if self._replaced:
+                state = self._state
+            else:
+                state = _read_json(self.state_path)
+                self._apply_pending(state)
+            _write_json(self.state_path, state)
+            self._state, self._state_stamp = state, self._stamp(self.state_path)
+            self._pending.clear()
+            self._replaced = False
+
+    @contextmanager
+    def batch(self) -> Iterator['JSONStateStore']:
+        """Defer writing state.json until the outermost batch exits."""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if not self._batch_depth and (self._pending or self._replaced):
+                    self._flush()
+
+    # Installed tools
+
+    def all(self) -> Dict[str, Dict]:
+        """Get a copy of the whole state (manifest key -> install info)."""
+        with self._lock:
+            return copy.deepcopy(self._load())
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Get the install info recorded for a manifest key."""
+        with self._lock:
+            info = self._load().get(key)
+            return copy.deepcopy(info) if info is not None else None
+
+    def put(self, key: str, info: Dict):
+        """Record the install info for a manifest key."""
+        with self._lock:
+            self._load()[key] = self._pending[key] = copy.deepcopy(info)
+            self._changed()
+
+    def delete(self, key: str) -> bool:
+        """Forget a manifest key. Returns True if it was recorded."""
+        with self._lock:
+            if self._load().pop(key, None) is None:
+                return False
+            self._pending[key] = None
+            self._changed()
+            return True
+
+    def replace(self, state: Dict[str, Dict]):
+        """Replace the whole state."""
+        with self._lock:
+            self._state = copy.deepcopy(state)
+            self._pending.clear()
+            self._replaced = True
+            self._changed()
+
+    # Pins
+
+    def pins(self) -> Dict[str, str]:
+        """Get all version pins (tool -> version)."""
+        return _read_json(self.pins_path)
+
+    def pin(self, tool_name: str) -> Optional[str]:
+        """Get the pinned version of a tool."""
+        return self.pins().get(tool_name)
+
+    def set_pin(self, tool_name: str, version: str):
+        with self._lock, FileLock(self.pins_lock_path):
+            pins = _read_json(self.pins_path)
+            pins[tool_name] = version
+            _write_json(self.pins_path, pins)
+
+    def remove_pin(self, tool_name: str) -> bool:
+        with self._lock, FileLock(self.pins_lock_path):
+            pins = _read_json(self.pins_path)
+            if pins.pop(tool_name, None) is None:
+                return False
+            _write_json(self.pins_path, pins)
+            return True
+
+    def replace_pins(self, pins: Dict[str, str]):
+        with self._lock, FileLock(self.pins_lock_path):
+            _write_json(self.pins_path, pins)
+
+    # History
+
+    def record_event(self, key: str, action: str, tag: Optional[str] = None,
+                     generation: Optional[str] = None, sha256: Optional[str] = None):
+        """Append an event ('install', 'activate', 'uninstall') to the history."""
+        tool_name, platform, arch = _split_key(key)
+        event = {'tool': tool_name, 'platform': platform, 'arch': arch, 'action': action,
+                 'tag': tag, 'generation': generation, 'sha256': sha256, 'at': _timestamp()}
+        # One O_APPEND write per event, so concurrent writers don't interleave lines
+        self.history_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.history_path, 'a') as f:
+            f.write(json.dumps(event) + '\n')
+
+    def history(self, tool_name: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Get history events, newest first, optionally for one tool."""
+        events = []
+        if self.history_path.exists():
+            with open(self.history_path, 'r') as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue
+                    if tool_name is None or event.get('tool') == tool_name:
+                        events.append(event)
+        events.reverse()
+        return events[:limit] if limit is not None else events
+
+    # Compatibility
+
+    def export_json(self, state_path: Optional[Path] = None, pins_path: Optional[Path] = None):
+        """Write state and pins in the JSON format (a no-op for the default paths)."""
+        with self._lock:
+            if state_path and Path(state_path) != self.state_path:
+                _write_json(Path(state_path), self._load())
+            if pins_path and Path(pins_path) != self.pins_path:
+                _write_json(Path(pins_path), _read_json(self.pins_path))
+
+    def import_json(self, state_path: Optional[Path] = None, pins_path: Optional[Path] = None):
+        """Load state and pins from JSON files."""
+        if state_path and Path(state_path).exists():
+            self.replace(_read_json(Path(state_path)))
+        if pins_path and Path(pins_path).exists():
+            self.replace_pins(_read_json(Path(pins_path)))
+
+    def close(self):
+        pass
+
+
+class SQLiteStateStore:
+    """State, pins and history in one SQLite database (WAL mode)."""
+
+    backend = 'sqlite'
+
+    def __init__(self, db_path: Path):
+        """
+        Initialize the store.
+
+        Args:
+            db_path: Path of state.db (created if missing)
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        import sqlite3
+
+        # One connection shared by the sync worker threads; statements are
+        # serialized with the lock and transactions are managed explicitly
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30,
+                                     isolation_level=None, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        # Rows and events written at the end of the current batch
+        self._pending: Dict[str, Optional[Dict]] = {}
+        self._events: List[tuple] = []
+
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(SCHEMA)
+            self.created = self._conn.execute('PRAGMA user_version').fetchone()[0] == 0
+            self._conn.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+
+    @contextmanager
+    def _write(self):
+        """
+        Run statements in one transaction. BEGIN IMMEDIATE takes the write
+        lock up front, so a concurrent writer waits (up to the connection
+        timeout) instead of failing on a stale read snapshot.
+        """
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def _flush(self):
+        """Write the rows and events collected by a batch. Caller holds the lock."""
+        if not self._pending and not self._events:
+            return
+        with self._write() as conn:
+            conn.executemany('DELETE FROM installs WHERE key = ?',
+                             [(key,) for key, info in self._pending.items() if info is None])
+            conn.executemany('INSERT OR REPLACE INTO installs VALUES (?, ?, ?, ?, ?, ?)', [
+                (key, *_split_key(key), json.dumps(info), info.get('installed_at'))
+                for key, info in self._pending.items() if info is not None
+            ])
+            conn.executemany(
+                'INSERT INTO history (tool, platform, arch, action, tag, generation, sha256, at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', self._events)
+        self._pending.clear()
+        self._events.clear()
+
+    @contextmanager
+    def batch(self) -> Iterator['SQLiteStateStore']:
+        """
+        Collect writes and commit them in a single transaction when the
+        outermost batch exits - also on error, since the files those rows
+        describe are already installed.
+        """
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self._flush()
+
+    def _query(self, sql: str, params=()) -> List:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # Installed tools
+
+    def all(self) -> Dict[str, Dict]:
+        """Get the whole state (manifest key -> install info)."""
+        with self._lock:
+            state = {key: json.loads(info) for key, info in
+                     self._query('SELECT key, info FROM installs ORDER BY key')}
+            for key, info in self._pending.items():
+                if info is None:
+                    state.pop(key, None)
+                else:
+                    state[key] = copy.deepcopy(info)
+            return state
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Get the install info recorded for a manifest key."""
+        with self._lock:
+            if key in self._pending:
+                return copy.deepcopy(self._pending[key])
+            rows = self._query('SELECT info FROM installs WHERE key = ?', (key,))
+            return json.loads(rows[0][0]) if rows else None
+
+    def put(self, key: str, info: Dict):
+        """Record the install info for a manifest key."""
+        with self._lock:
+            self._pending[key] = copy.deepcopy(info)
+            if not self._batch_depth:
+                self._flush()
+
+    def delete(self, key: str) -> bool:
+        """Forget a manifest key. Returns True if it was recorded."""
+        with self._lock:
+            existed = self.get(key) is not None
+            self._pending[key] = None
+            if not self._batch_depth:
+                self._flush()
+            return existed
+
+    def replace(self, state: Dict[str, Dict]):
+        """Replace the whole state."""
+        with self._lock, self._write() as conn:
+            self._pending.clear()
+            conn.execute('DELETE FROM installs')
+            conn.executemany('INSERT INTO installs VALUES (?, ?, ?, ?, ?, ?)', [
+                (key, *_split_key(key), json.dumps(info), info.get('installed_at'))
+                for key, info in state.items()
+            ])
+
+    # Pins
+
+    def pins(self) -> Dict[str, str]:
+        """Get all version pins (tool -> version)."""
+        return dict(self._query('SELECT tool, version FROM pins ORDER BY tool'))
+
+    def pin(self, tool_name: str) -> Optional[str]:
+        """Get the pinned version of a tool."""
+        rows = self._query('SELECT version FROM pins WHERE tool = ?', (tool_name,))
+        return rows[0][0] if rows else None
+
+    def set_pin(self, tool_name: str, version: str):
+        with self._write() as conn:
+            conn.execute('INSERT OR REPLACE INTO pins VALUES (?, ?)', (tool_name, version))
+
+    def remove_pin(self, tool_name: str) -> bool:
+        with self._write() as conn:
+            return conn.execute('DELETE FROM pins WHERE tool = ?', (tool_name,)).rowcount > 0
+
+    def replace_pins(self, pins: Dict[str, str]):
+        with self._write() as conn:
+            conn.execute('DELETE FROM pins')
+            conn.executemany('INSERT INTO pins VALUES (?, ?)', list(pins.items()))
+
+    # History
+
+    def record_event(self, key: str, action: str, tag: Optional[str] = None,
+                     generation: Optional[str] = None, sha256: Optional[str] = None):
+        """Append an event ('install', 'activate', 'uninstall') to the history."""
+        with self._lock:
+            self._events.append((*_split_key(key), action, tag, generation, sha256, _timestamp()))
+            if not self._batch_depth:
+                self._flush()
+
+    def history(self, tool_name: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Get history events, newest first, optionally for one tool."""
+        sql = 'SELECT tool, platform, arch, action, tag, generation, sha256, at FROM history'
+        params = []
+        if tool_name is not None:
+            sql += ' WHERE tool = ?'
+            params.append(tool_name)
+        sql += ' ORDER BY id DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        columns = ('tool', 'platform', 'arch', 'action', 'tag', 'generation', 'sha256', 'at')
+        return [dict(zip(columns, row)) for row in self._query(sql, params)]
+
+    def import_history(self, events: List[Dict]):
+        """Append events (oldest first), e.g. from a JSON store's history.jsonl."""
+        with self._write() as conn:
+            conn.executemany(
+                'INSERT INTO history (tool, platform, arch, action, tag, generation, sha256, at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(e.get('tool', ''), e.get('platform', ''), e.get('arch', ''), e.get('action', ''),
+                  e.get('tag'), e.get('generation'), e.get('sha256'), e.get('at', '')) for e in events])
+
+    # Compatibility
+
+    def export_json(self, state_path: Optional[Path] = None, pins_path: Optional[Path] = None):
+        """Write state and pins out as state.json / .pins.json."""
+        if state_path:
+            _write_json(Path(state_path), self.all())
+        if pins_path:
+            _write_json(Path(pins_path), self.pins())
+
+    def import_json(self, state_path: Optional[Path] = None, pins_path: Optional[Path] = None):
+        """Load state and pins from state.json / .pins.json."""
+        with self.batch():
+            if state_path and Path(state_path).exists():
+                self.replace(_read_json(Path(state_path)))
+            if pins_path and Path(pins_path).exists():
+                self.replace_pins(_read_json(Path(pins_path)))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_state_store(cache_dir: Path, dotbins_dir: Path, backend: Optional[str] = None):
+    """
+    Open the state store for a cache/dotbins directory pair.
+
+    Args:
+        cache_dir: Cache directory (holds state.json / state.db)
+        dotbins_dir: dotbins directory (holds .pins.json)
+        backend: 'json' or 'sqlite' (default: $DOTBINS_STATE_BACKEND, then
+                 'sqlite' if state.db already exists, else 'json')
+
+    Returns:
+        JSONStateStore or SQLiteStateStore
+    """
+    cache_dir, dotbins_dir = Path(cache_dir), Path(dotbins_dir)
+    state_path = cache_dir / 'state.json'
+    pins_path = dotbins_dir / '.pins.json'
+    db_path = cache_dir / 'state.db'
+
+    backend = backend or os.environ.get('DOTBINS_STATE_BACKEND')
+    if not backend:
+        backend = 'sqlite' if db_path.exists() else 'json'
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown state backend: {backend} (expected one of {', '.join(BACKENDS)})")
+
+    json_store = JSONStateStore(state_path, pins_path, cache_dir / 'history.jsonl',
+                                lock_dir=cache_dir / 'locks')
+
+    if backend == 'sqlite':
+        if _sqlite_available():
+            # Serialize creation so two processes don't both import the JSON state
+            with FileLock(cache_dir / 'locks' / 'state.lock'):
+                store = SQLiteStateStore(db_path)
+                if store.created:
+                    store.import_json(state_path, pins_path)
+                    store.import_history(list(reversed(json_store.history())))
+            return store
+        print("WARNING: sqlite3 not available, using JSON state")
+
+    return json_store
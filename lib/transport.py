@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Pooled HTTP Transport for dotbins
+
+Release downloads hit the same couple of hosts over and over (github.com and
+the objects.githubusercontent.com redirect target). Opening a fresh TCP+TLS
+connection for every asset dominates the wall-clock time when syncing dozens
+of small binaries, so this module keeps connections alive and reuses them.
+
+Key Features:
+- Persistent http.client connections, pooled per (scheme, host, port)
+- Safe to share between threads (a connection is used by one thread at a time)
+- Redirect targets remembered for the lifetime of the transport
+- Credentials (Authorization, Cookie) never follow a redirect to another origin
+- Transparent retry when a pooled keep-alive connection went stale
+- Honors http_proxy/https_proxy/no_proxy like urllib does
+
+Usage:
+    from transport import HTTPTransport
+
+    transport = HTTPTransport()
+    with transport.request('https://github.com/...') as response:
+        data = response.read()
+"""
+
+import http.client
+import ssl
+import threading
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+
+USER_AGENT = 'dotbins-downloader'
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+# Request headers only sent to the origin (scheme, host, port) they were meant for
+CREDENTIAL_HEADERS = ('authorization', 'cookie')
+
+# Errors that mean a reused keep-alive connection was closed by the server
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+)
+
+PoolKey = Tuple[str, str, int]
+
+
+def _origin(url: str) -> Tuple[str, Optional[str], int]:
+    """The (scheme, host, port) of a URL, with the scheme's default port filled in."""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    return scheme, parts.hostname, parts.port or (443 if scheme == 'https' else 80)
+
+
+class TransportError(Exception):
+    """Raised when a request cannot be completed (e.g. too many redirects)."""
+
+
+class PooledResponse:
+    """
+    HTTP response that hands its connection back to the pool when closed.
+
+    The connection is only reused if the body was read to completion and the
+    server did not ask to close it; otherwise it is discarded.
+    """
+
+    def __init__(self, transport: 'HTTPTransport', pool_key: PoolKey,
+                 conn: http.client.HTTPConnection, response: http.client.HTTPResponse, url: str):
+        self._transport = transport
+        self._pool_key = pool_key
+        self._conn = conn
+        self._response = response
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        return self._response.read(amt)
+
+    def readinto(self, buffer) -> int:
+        return self._response.readinto(buffer)
+
+    def drain(self):
+        """Consume and discard the rest of the body so the connection can be reused."""
+        while self._response.read(65536):
+            pass
+
+    def close(self):
+        if self._conn is None:
+            return
+
+        conn, self._conn = self._conn, None
+        reusable = self._response.isclosed() and not self._response.will_close
+        self._response.close()
+        if reusable:
+            self._transport._release(self._pool_key, conn)
+        else:
+            conn.close()
+
+    def __enter__(self) -> 'PooledResponse':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class HTTPTransport:
+    """Keep-alive HTTP(S) connection pool shared by all downloads."""
+
+    def __init__(self, timeout: float = 30, max_idle_per_host: int = 8, max_redirects: int = 10):
+        """
+        Initialize the transport.
+
+        Args:
+            timeout: Socket timeout in seconds
+            max_idle_per_host: Maximum idle connections kept per host
+            max_redirects: Maximum redirects followed per request
+        """
+        self.timeout = timeout
+        self.max_idle_per_host = max_idle_per_host
+        self.max_redirects = max_redirects
+
+        self._idle: Dict[PoolKey, List[http.client.HTTPConnection]] = {}
+        self._redirects: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+        self._proxies = urllib.request.getproxies()
+
+    def request(self, url: str, headers: Optional[Dict[str, str]] = None,
+                method: str = 'GET') -> PooledResponse:
+        """
+        Send a request, following redirects.
+
+        Unlike urllib, error statuses are returned rather than raised so callers
+        can handle 206/304/416 and friends themselves.
+
+        Args:
+            url: URL to request
+            headers: Extra request headers
+            method: HTTP method
+
+        Returns:
+            PooledResponse (use as a context manager)
+        """
+        headers = dict(headers or {})
+
+        cached = self._redirects.get(url)
+        if cached:
+            response = self._follow(cached, headers, method, origin=_origin(url))
+            if response.status < 400:
+                return response
+            # Signed redirect targets expire; start over from the original URL
+            response.close()
+            with self._lock:
+                self._redirects.pop(url, None)
+
+        response = self._follow(url, headers, method)
+        if response.url != url and response.status < 400:
+            with self._lock:
+                self._redirects[url] = response.url
+        return response
+
+    def forget_redirect(self, url: str):
+        """Drop a remembered redirect target (e.g. after it served bad data)."""
+        with self._lock:
+            self._redirects.pop(url, None)
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def _follow(self, url: str, headers: Dict[str, str], method: str,
+                origin: Optional[Tuple[str, Optional[str], int]] = None) -> PooledResponse:
+        """
+        Send a request and follow redirects until a final response.
+
+        Args:
+            origin: Origin the headers were meant for (default: that of ``url``);
+                    credential headers are dropped on any other host
+        """
+        origin = origin or _origin(url)
+        for _ in range(self.max_redirects + 1):
+            if _origin(url) != origin:
+                headers = {name: value for name, value in headers.items()
+                           if name.lower() not in CREDENTIAL_HEADERS}
+            response = self._send(url, headers, method)
+            location = response.headers.get('Location')
+            if response.status not in REDIRECT_CODES or not location:
+                return response
+
+            response.drain()
+            response.close()
+            url = urljoin(url, location)
+            if response.status == 303:
+                method = 'GET'
+
+        raise TransportError(f"Too many redirects: {url}")
+
+    def _send(self, url: str, headers: Dict[str, str], method: str) -> PooledResponse:
+        """Send a single request on a pooled connection."""
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise TransportError(f"Unsupported URL scheme: {url}")
+
+        port = parts.port or (443 if scheme == 'https' else 80)
+        pool_key = (scheme, parts.hostname, port)
+
+        proxied = scheme == 'http' and self._proxy_for(scheme, parts.hostname)
+        target = url if proxied else (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+
+        request_headers = {
+            'User-Agent': USER_AGENT,
+            'Accept-Encoding': 'identity',
+        }
+        request_headers.update(headers)
+
+        while True:
+            conn, reused = self._acquire(pool_key)
+            try:
+                conn.request(method, target, headers=request_headers)
+                response = conn.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                conn.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+
+            return PooledResponse(self, pool_key, conn, response, url)
+
+    def _acquire(self, pool_key: PoolKey) -> Tuple[http.client.HTTPConnection, bool]:
+        """Take an idle connection from the pool or open a new one."""
+        with self._lock:
+            idle = self._idle.get(pool_key)
+            if idle:
+                return idle.pop(), True
+        return self._connect(pool_key), False
+
+    def _release(self, pool_key: PoolKey, conn: http.client.HTTPConnection):
+        """Return a connection to the pool."""
+        with self._lock:
+            idle = self._idle.setdefault(pool_key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _connect(self, pool_key: PoolKey) -> http.client.HTTPConnection:
+        """Open a new connection, going through a proxy if one is configured."""
+        scheme, host, port = pool_key
+        proxy = self._proxy_for(scheme, host)
+
+        if proxy:
+            proxy_parts = urlsplit(proxy if '://' in proxy else f"http://{proxy}")
+            proxy_host, proxy_port = proxy_parts.hostname, proxy_parts.port or 80
+            if scheme == 'https':
+                conn = http.client.HTTPSConnection(proxy_host, proxy_port, timeout=self.timeout,
+                                                   context=self._ssl_context)
+                conn.set_tunnel(host, port)
+                return conn
+            return http.client.HTTPConnection(proxy_host, proxy_port, timeout=self.timeout)
+
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout,
+                                               context=self._ssl_context)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _proxy_for(self, scheme: str, host: str) -> Optional[str]:
+        """Return the proxy URL to use for a host, if any."""
+        proxy = self._proxies.get(scheme)
+        if not proxy or urllib.request.proxy_bypass(host):
+            return None
+        return proxy
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+GitHub Release Update Checks for dotbins
+
+``check_updates`` asks GitHub for the latest release of every repo in
+dotbins.yaml and compares it with the tags in manifest.json. Unauthenticated
+clients get 60 API requests an hour, so the checker is careful with them:
+
+- Answers are kept in ``~/.cache/dotbins/github-releases.json``. Within
+  DEFAULT_TTL a repo isn't asked again at all; after that the request is
+  conditional (``If-None-Match`` with the stored ETag), and GitHub doesn't
+  count a ``304 Not Modified`` against the rate limit.
+- Requests go through one token bucket shared by the worker threads. It
+  paces bursts and stops spending once ``X-RateLimit-Remaining`` (as last
+  reported, persisted between runs) is down to RATE_LIMIT_RESERVE until
+  ``X-RateLimit-Reset``; repos that can't be asked report their cached answer
+  as stale.
+
+``GITHUB_TOKEN`` (or ``GH_TOKEN``) raises the limit to 5000 an hour, and
+``DOTBINS_GITHUB_API`` points the checker at another API root, such as a
+GitHub Enterprise server or a local fake for testing.
+
+Usage:
+    from updates import UpdateChecker
+
+    checker = UpdateChecker(cache_dir, transport)
+    latest = checker.latest_releases(['junegunn/fzf', 'sharkdp/bat'])
+    latest['junegunn/fzf']['tag']     # 'v0.66.1'
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    from .locking import FileLock
+except ImportError:
+    from locking import FileLock
+
+
+DEFAULT_API = 'https://api.github.com'
+
+# Seconds a cached answer is used without asking GitHub again
+DEFAULT_TTL = 15 * 60
+
+# Concurrent release lookups
+DEFAULT_JOBS = 8
+
+# Token bucket: sustained requests per second, and burst size
+REQUEST_RATE = 20.0
+REQUEST_BURST = 20
+
+# Requests of the hourly quota left unspent (for syncs and other tools)
+RATE_LIMIT_RESERVE = 5
+
+CACHE_VERSION = 1
+
+
+class RequestBudget:
+    """Token bucket shared by the pollers, capped by GitHub's remaining quota."""
+
+    def __init__(self, rate: float = REQUEST_RATE, burst: int = REQUEST_BURST,
+                 remaining: Optional[int] = None, reset_at: Optional[float] = None,
+                 reserve: int = RATE_LIMIT_RESERVE):
+        """
+        Initialize the budget.
+
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity
+            remaining: Requests GitHub last said were left (None: unknown)
+            reset_at: Epoch time that quota resets
+            reserve: Requests of the quota never spent
+        """
+        self.rate = rate
+        self.burst = burst
+        self.remaining = remaining
+        self.reset_at = reset_at
+        self.reserve = reserve
+        self._tokens = float(burst)
+        self._filled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def exhausted(self) -> bool:
+        """Whether the remaining quota is down to the reserve."""
+        if self.remaining is None or self.remaining > self.reserve:
+            return False
+        return self.reset_at is None or time.time() < self.reset_at
+
+    def acquire(self) -> bool:
+        """
+        Take a token, waiting for the bucket to refill if needed.
+
+        Returns:
+            False if the rate-limit quota doesn't allow another request
+        """
+        while True:
+            with self._lock:
+                if self.exhausted():
+                    return False
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._filled_at) * self.rate)
+                self._filled_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    if self.remaining is not None:
+                        # Count it now, so concurrent pollers can't overshoot the quota
+                        self.remaining -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def observe(self, headers):
+        """Update the quota from a response's X-RateLimit-* headers."""
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+        with self._lock:
+            try:
+                if remaining is not None:
+                    self.remaining = int(remaining)
+                if reset is not None:
+                    self.reset_at = float(reset)
+            except ValueError:
+                pass
+
+
+class UpdateChecker:
+    """Concurrent, cached lookups of the latest GitHub release of repos."""
+
+    def __init__(self, cache_dir: Path, transport, api_url: Optional[str] = None,
+                 token: Optional[str] = None, ttl: float = DEFAULT_TTL, jobs: int = DEFAULT_JOBS):
+        """
+        Initialize the checker.
+
+        Args:
+            cache_dir: Cache directory holding github-releases.json
+            transport: HTTPTransport to send requests with
+            api_url: API root (default: $DOTBINS_GITHUB_API or api.github.com)
+            token: API token (default: $GITHUB_TOKEN or $GH_TOKEN)
+            ttl: Seconds a cached answer is used without a request
+            jobs: Concurrent lookups
+        """
+        self.cache_path = cache_dir / 'github-releases.json'
+        self.lock_path = cache_dir / 'locks' / 'github-releases.lock'
+        self.transport = transport
+        self.api_url = (api_url or os.environ.get('DOTBINS_GITHUB_API') or DEFAULT_API).rstrip('/')
+        self.token = token or os.environ.get('GITHUB_TOKEN') or os.environ.get('GH_TOKEN')
+        self.ttl = ttl
+        self.jobs = max(1, jobs)
+        self.requests = 0  # Requests actually sent by the last latest_releases()
+        self._count_lock = threading.Lock()
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.cache_path, 'r') as f:
+                cache = json.load(f)
+            if isinstance(cache, dict) and cache.get('version') == CACHE_VERSION:
+                return cache
+        except (OSError, ValueError):
+            pass
+        return {'version': CACHE_VERSION, 'rate': {}, 'repos': {}}
+
+    def _save(self, answers: Dict[str, Dict], budget: RequestBudget):
+        """Merge fresh answers and the observed quota into the on-disk cache."""
+        with FileLock(self.lock_path):
+            cache = self._load()
+            cache['repos'].update(answers)
+            cache['rate'] = {'remaining': budget.remaining, 'reset_at': budget.reset_at}
+            tmp_path = self.cache_path.with_name(f"{self.cache_path.name}.{os.getpid()}.tmp")
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(cache, f, indent=2, sort_keys=True)
+                os.replace(tmp_path, self.cache_path)
+            except OSError:
+                tmp_path.unlink(missing_ok=True)
+
+    def latest_releases(self, repos: List[str], refresh: bool = False) -> Dict[str, Dict]:
+        """
+        Look up the latest release of each repo.
+
+        Args:
+            repos: 'owner/name' repositories
+            refresh: Ask GitHub (conditionally) even for recently checked repos
+
+        Returns:
+            repo -> {'tag', 'published_at', 'html_url', 'checked_at', 'source',
+            'error'}; source is 'cache' (within the TTL), 'not-modified' (304),
+            'api' (fresh answer) or 'stale' (cached answer, request not possible)
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        cache = self._load()
+        rate = cache.get('rate') or {}
+        budget = RequestBudget(remaining=rate.get('remaining'), reset_at=rate.get('reset_at'))
+        self.requests = 0
+
+        def lookup(repo):
+            return repo, self._latest(repo, cache['repos'].get(repo), budget, refresh)
+
+        with ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix='dotbins-updates') as pool:
+            results = dict(pool.map(lookup, repos))
+
+        answers = {
+            repo: {k: v for k, v in result.items() if k != 'source'}
+            for repo, result in results.items() if result.get('source') in ('api', 'not-modified')
+        }
+        if answers or self.requests:
+            self._save(answers, budget)
+        return results
+
+    def _latest(self, repo: str, cached: Optional[Dict], budget: RequestBudget, refresh: bool) -> Dict:
+        """Look up one repo: from the cache, with a conditional request, or a fresh one."""
+        import http.client
+        try:
+            from .transport import TransportError
+        except ImportError:
+            from transport import TransportError
+
+        now = time.time()
+        if cached and not refresh and now - cached.get('checked_at', 0) < self.ttl:
+            return dict(cached, source='cache')
+
+        def stale(error):
+            return dict(cached or {}, source='stale', error=error)
+
+        if not budget.acquire():
+            return stale('GitHub rate limit reached')
+
+        headers = {
+            'Accept': 'application/vnd.github+json',
+            'X-GitHub-Api-Version': '2022-11-28',
+        }
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+
+        with self._count_lock:
+            self.requests += 1
+        try:
+            with self.transport.request(f"{self.api_url}/repos/{repo}/releases/latest", headers) as response:
+                budget.observe(response.headers)
+                body = response.read()
+                if response.status == 304 and cached:
+                    return dict(cached, checked_at=now, source='not-modified')
+                if response.status == 200:
+                    release = json.loads(body)
+                    return {
+                        'tag': release['tag_name'],
+                        'published_at': release.get('published_at'),
+                        'html_url': release.get('html_url'),
+                        'etag': response.headers.get('ETag'),
+                        'checked_at': now,
+                        'source': 'api',
+                    }
+                if response.status == 404:
+                    # No published release (or no such repo): remember it like an answer
+                    return {'tag': None, 'error': 'No releases', 'etag': response.headers.get('ETag'),
+                            'checked_at': now, 'source': 'api'}
+                if response.status in (403, 429):
+                    return stale('GitHub rate limit reached')
+                return stale(f"HTTP {response.status} {response.reason}")
+        except (OSError, http.client.HTTPException, TransportError, ValueError, KeyError) as e:
+            return stale(str(e) or type(e).__name__)
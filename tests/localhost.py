@@ -0,0 +1,76 @@
+"""
+Localhost fixtures shared by the tests: HTTP servers on 127.0.0.1 and
+release assets built in a temporary directory. Nothing here touches the
+network or the user's ~/.dotbins and ~/.cache/dotbins.
+"""
+
+import hashlib
+import io
+import socket
+import sys
+import tarfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+LIB_DIR = Path(__file__).resolve().parent.parent / 'lib'
+if str(LIB_DIR) not in sys.path:
+    sys.path.insert(0, str(LIB_DIR))
+
+
+def sha256_file(path: Path) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def make_tar(path: Path, files: dict):
+    """Write a .tar.gz holding executable files ({name: bytes})."""
+    with tarfile.open(path, 'w:gz') as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o755
+            tar.addfile(info, io.BytesIO(data))
+
+
+def unused_port() -> int:
+    """A localhost port nothing listens on (for an unreachable server)."""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def serve(server: ThreadingHTTPServer) -> ThreadingHTTPServer:
+    """Run a server on a daemon thread."""
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stop(server: ThreadingHTTPServer):
+    """Stop a server started with serve() and close its socket."""
+    server.shutdown()
+    server.server_close()
+
+
+class StaticServer(ThreadingHTTPServer):
+    """Serves a directory, like a release host, and records each GET path."""
+
+    def __init__(self, directory: Path):
+        self.requests = []
+
+        class Handler(SimpleHTTPRequestHandler):
+            def __init__(handler, *args, **kwargs):
+                super().__init__(*args, directory=str(directory), **kwargs)
+
+            def do_GET(handler):
+                self.requests.append(handler.path)
+                super().do_GET()
+
+            def log_message(handler, *args):
+                pass
+
+        super().__init__(('127.0.0.1', 0), Handler)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
@@ -0,0 +1,135 @@
+"""
+LAN mirror (lib/mirror.py), tested entirely on localhost: an upstream
+release host, a mirror in front of it, and clients syncing through it.
+"""
+
+import http.client
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from localhost import StaticServer, make_tar, serve, sha256_file, stop, unused_port
+
+from downloader import BinaryDownloader
+from mirror import MirrorServer
+
+TOOLS = ('alpha', 'beta', 'gamma')
+
+
+class MirrorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix='dotbins-test-'))
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+        www = self.tmp / 'www'
+        www.mkdir()
+        self.upstream = serve(StaticServer(www))
+        self.addCleanup(stop, self.upstream)
+
+        self.platform, self.arch = BinaryDownloader(
+            str(self.tmp / 'probe'), str(self.tmp / 'probe-cache'), mirrors=[], bundles=[]
+        ).detect_platform()
+        manifest = {'version': 2}
+        for tool in TOOLS:
+            asset = f"{tool}-{self.platform}-{self.arch}.tar.gz"
+            make_tar(www / asset, {tool: f"#!/bin/sh\necho {tool} 1.0\n".encode() + bytes(4096)})
+            manifest[f"{tool}/{self.platform}/{self.arch}"] = {
+                'tag': 'v1.0', 'sha256': sha256_file(www / asset), 'url': f"{self.upstream.url}/{asset}"
+            }
+        self.manifest = manifest
+
+        mirror_dir = self.dotbins_dir('mirror')
+        self.mirror = serve(MirrorServer(self.downloader('mirror', mirror_dir, mirrors=[]),
+                                         host='127.0.0.1', port=0))
+        self.addCleanup(stop, self.mirror)
+
+    def dotbins_dir(self, name: str) -> Path:
+        path = self.tmp / name / 'dotbins'
+        path.mkdir(parents=True)
+        (path / 'manifest.json').write_text(json.dumps(self.manifest))
+        return path
+
+    def downloader(self, name: str, dotbins_dir: Path = None, mirrors=None) -> BinaryDownloader:
+        downloader = BinaryDownloader(str(dotbins_dir or self.dotbins_dir(name)), str(self.tmp / name / 'cache'),
+                                      mirrors=[self.mirror.url] if mirrors is None else mirrors,
+                                      bundles=[], progress='quiet')
+        self.addCleanup(lambda: downloader._transport and downloader._transport.close())
+        return downloader
+
+    def object_request(self, method: str = 'GET', headers: dict = None):
+        """Request the alpha object from the mirror: (status, headers, body)."""
+        sha256 = self.manifest[f"alpha/{self.platform}/{self.arch}"]['sha256']
+        conn = http.client.HTTPConnection('127.0.0.1', self.mirror.server_address[1])
+        self.addCleanup(conn.close)
+        conn.request(method, f"/objects/{sha256}", headers=headers or {})
+        response = conn.getresponse()
+        return response.status, response, response.read()
+
+    def test_one_upstream_get_per_asset(self):
+        results = self.downloader('client1').sync_all(jobs=4)
+        self.assertTrue(all(results.values()), results)
+        self.assertEqual(len(results), len(TOOLS))
+        self.assertEqual(len(self.upstream.requests), len(TOOLS))
+
+        # A second client is served entirely from the mirror's cache
+        self.upstream.requests.clear()
+        results = self.downloader('client2').sync_all(jobs=4)
+        self.assertTrue(all(results.values()), results)
+        self.assertEqual(self.upstream.requests, [])
+
+    def test_ranges_and_conditional_requests(self):
+        status, _, data = self.object_request()
+        self.assertEqual(status, 200)
+        sha256 = self.manifest[f"alpha/{self.platform}/{self.arch}"]['sha256']
+
+        status, response, body = self.object_request(headers={'Range': 'bytes=10-19'})
+        self.assertEqual(status, 206)
+        self.assertEqual(response.getheader('Content-Range'), f"bytes 10-19/{len(data)}")
+        self.assertEqual(body, data[10:20])
+
+        status, _, body = self.object_request(headers={'Range': 'bytes=-5'})
+        self.assertEqual((status, body), (206, data[-5:]))
+
+        status, response, _ = self.object_request(headers={'Range': f"bytes={len(data)}-"})
+        self.assertEqual(status, 416)
+        self.assertEqual(response.getheader('Content-Range'), f"bytes */{len(data)}")
+
+        # A stale If-Range gets the whole object
+        status, _, body = self.object_request(headers={'Range': 'bytes=10-', 'If-Range': '"other"'})
+        self.assertEqual((status, body), (200, data))
+
+        status, _, body = self.object_request(headers={'If-None-Match': f'"{sha256}"'})
+        self.assertEqual((status, body), (304, b''))
+
+        status, response, body = self.object_request('HEAD')
+        self.assertEqual((status, response.getheader('Content-Length'), body), (200, str(len(data)), b''))
+
+    def test_served_objects_are_touched_in_one_write(self):
+        self.object_request()  # Fetched upstream: the index records the new object
+        cache = self.mirror.downloader.cache
+        sha256 = self.manifest[f"alpha/{self.platform}/{self.arch}"]['sha256']
+        last_used = cache.metadata(cache.object_path(sha256))['last_used']
+        st = cache.index_path.stat()
+
+        for _ in range(5):
+            self.assertEqual(self.object_request()[0], 200)
+            self.assertEqual(self.object_request('HEAD')[0], 200)
+            self.assertEqual(self.object_request(headers={'If-None-Match': f'"{sha256}"'})[0], 304)
+        after = cache.index_path.stat()
+        self.assertEqual((after.st_ino, after.st_mtime_ns), (st.st_ino, st.st_mtime_ns))
+
+        self.mirror.flush_used()
+        self.assertGreater(cache.metadata(cache.object_path(sha256))['last_used'], last_used)
+
+    def test_unreachable_mirror_falls_back_to_upstream(self):
+        client = self.downloader('client', mirrors=[f"http://127.0.0.1:{unused_port()}"])
+        self.assertTrue(client.sync_tool('alpha', self.platform, self.arch))
+        self.assertEqual(len(self.upstream.requests), 1)
+        self.assertTrue((self.tmp / 'client' / 'dotbins' / self.platform / self.arch / 'bin' / 'alpha').exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
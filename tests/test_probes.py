@@ -0,0 +1,116 @@
+"""
+Version probes (lib/probes.py) against fake binaries: shell scripts that
+print a version, optionally after sleeping.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import localhost  # noqa: F401 (puts lib/ on sys.path)
+
+from probes import DEFAULT_ARGS, Prober
+
+
+class ProberTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix='dotbins-test-'))
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.bin_dir = self.tmp / 'bin'
+        self.bin_dir.mkdir()
+        self.cache_dir = self.tmp / 'cache'
+        (self.cache_dir / 'locks').mkdir(parents=True)
+
+    def fake_binary(self, name: str, version: str, sleep: float = 0) -> Path:
+        """Write a script printing '<name> <version>' (after sleeping) for any arguments."""
+        path = self.bin_dir / name
+        path.write_text(f"#!/bin/sh\n{f'sleep {sleep}' if sleep else ''}\necho {name} {version}\n")
+        path.chmod(0o755)
+        return path
+
+    def cached_paths(self) -> set:
+        return set(json.loads((self.cache_dir / 'probes.json').read_text())['binaries'])
+
+    def test_probes_run_in_parallel(self):
+        binaries = [(f"tool{i}", self.fake_binary(f"tool{i}", f"1.{i}.0", sleep=0.5), DEFAULT_ARGS)
+                    for i in range(6)]
+        prober = Prober(self.cache_dir, jobs=6)
+        start = time.monotonic()
+        results = prober.probe_all(binaries)
+        elapsed = time.monotonic() - start
+
+        # One at a time this would take 3 s
+        self.assertLess(elapsed, 1.5)
+        self.assertEqual(prober.executed, 6)
+        self.assertTrue(all(r['ok'] and r['source'] == 'run' for r in results.values()))
+        self.assertEqual({name: r['version'] for name, r in results.items()},
+                         {f"tool{i}": f"1.{i}.0" for i in range(6)})
+
+    def test_cache_hit_runs_nothing(self):
+        binaries = [(name, self.fake_binary(name, '2.0.1'), DEFAULT_ARGS) for name in ('fzf', 'bat')]
+        Prober(self.cache_dir).probe_all(binaries)
+
+        # A new process (fresh prober) reuses the cache file
+        prober = Prober(self.cache_dir)
+        results = prober.probe_all(binaries)
+        self.assertEqual(prober.executed, 0)
+        self.assertEqual({r['source'] for r in results.values()}, {'cache'})
+        self.assertEqual({r['version'] for r in results.values()}, {'2.0.1'})
+
+        results = prober.probe_all(binaries, refresh=True)
+        self.assertEqual(prober.executed, 2)
+
+    def test_rewritten_binary_is_probed_again(self):
+        path = self.fake_binary('fzf', '0.65.0')
+        Prober(self.cache_dir).probe_all([('fzf', path, DEFAULT_ARGS)])
+
+        self.fake_binary('fzf', '0.66.10')  # Same path, new size and mtime
+        prober = Prober(self.cache_dir)
+        results = prober.probe_all([('fzf', path, DEFAULT_ARGS)])
+        self.assertEqual(prober.executed, 1)
+        self.assertEqual((results['fzf']['source'], results['fzf']['version']), ('run', '0.66.10'))
+
+    def test_cache_is_keyed_on_fingerprint_and_args(self):
+        path = self.fake_binary('kubectl', '1.31.0')
+        prober = Prober(self.cache_dir)
+        prober.probe_all([('kubectl', path, DEFAULT_ARGS)])
+
+        entry = json.loads((self.cache_dir / 'probes.json').read_text())['binaries'][os.path.abspath(path)]
+        st = path.stat()
+        self.assertEqual(entry['fingerprint'], [st.st_size, st.st_mtime_ns, st.st_ino])
+        self.assertEqual(entry['args'], DEFAULT_ARGS)
+
+        # Other probe arguments don't reuse the result
+        self.assertIsNone(prober.cached(path, ['version', '--client']))
+        prober.probe_all([('kubectl', path, ['version', '--client'])])
+        self.assertEqual(prober.executed, 1)
+
+        # Touching the binary invalidates the entry
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+        self.assertIsNone(Prober(self.cache_dir).cached(path))
+
+    def test_timeouts_and_launch_errors_are_not_cached(self):
+        slow = self.fake_binary('slow', '1.0', sleep=5)
+        broken = self.bin_dir / 'broken'
+        broken.write_text('not a program')  # Not executable
+        fine = self.fake_binary('fine', '3.0')
+        binaries = [('slow', slow, DEFAULT_ARGS), ('broken', broken, DEFAULT_ARGS), ('fine', fine, DEFAULT_ARGS)]
+
+        results = Prober(self.cache_dir, timeout=0.3).probe_all(binaries)
+        self.assertEqual(results['slow']['message'], 'Timeout after 0.3s')
+        self.assertTrue(results['broken']['message'].startswith('Error - '))
+        self.assertTrue(results['fine']['ok'])
+        self.assertEqual(self.cached_paths(), {os.path.abspath(fine)})
+
+        prober = Prober(self.cache_dir, timeout=0.3)
+        prober.probe_all(binaries)
+        self.assertEqual(prober.executed, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
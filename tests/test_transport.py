@@ -0,0 +1,89 @@
+"""
+HTTP transport (lib/transport.py) redirects, tested on localhost.
+"""
+
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from localhost import serve, stop
+
+from transport import HTTPTransport
+
+CREDENTIALS = {'Authorization': 'Bearer secret', 'Cookie': 'session=1', 'Accept': 'application/json'}
+
+
+class RedirectServer(ThreadingHTTPServer):
+    """Redirects ``/go`` to ``target``, answers anything else; records (path, headers)."""
+
+    def __init__(self):
+        self.target = None
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(handler):
+                server.requests.append((handler.path, dict(handler.headers)))
+                if handler.path == '/go':
+                    handler.send_response(302)
+                    handler.send_header('Location', f"{server.target}/final")
+                    handler.send_header('Content-Length', '0')
+                    handler.end_headers()
+                    return
+                handler.send_response(200)
+                handler.send_header('Content-Length', '2')
+                handler.end_headers()
+                handler.wfile.write(b'ok')
+
+            def log_message(handler, *args):
+                pass
+
+        super().__init__(('127.0.0.1', 0), Handler)
+
+    def url(self, host: str = '127.0.0.1') -> str:
+        return f"http://{host}:{self.server_address[1]}"
+
+
+class RedirectTest(unittest.TestCase):
+
+    def setUp(self):
+        self.origin = serve(RedirectServer())
+        self.addCleanup(stop, self.origin)
+        self.other = serve(RedirectServer())
+        self.addCleanup(stop, self.other)
+        self.transport = HTTPTransport(timeout=5)
+        self.addCleanup(self.transport.close)
+
+    def get(self, url: str) -> bytes:
+        with self.transport.request(url, dict(CREDENTIALS)) as response:
+            return response.read()
+
+    def test_credentials_stay_on_the_same_origin(self):
+        self.origin.target = self.origin.url()
+        self.assertEqual(self.get(f"{self.origin.url()}/go"), b'ok')
+        path, headers = self.origin.requests[-1]
+        self.assertEqual(path, '/final')
+        self.assertEqual(headers.get('Authorization'), 'Bearer secret')
+        self.assertEqual(headers.get('Cookie'), 'session=1')
+
+    def test_credentials_dropped_on_cross_origin_redirect(self):
+        # Another port, and another host name for the same address
+        for target in (self.other.url(), self.origin.url('localhost')):
+            self.origin.target = target
+            self.origin.requests.clear()
+            self.other.requests.clear()
+            # The second request goes straight to the remembered redirect target
+            for _ in range(2):
+                self.assertEqual(self.get(f"{self.origin.url()}/go"), b'ok')
+            final = [(path, headers) for path, headers in self.origin.requests + self.other.requests
+                     if path == '/final']
+            self.assertEqual(len(final), 2)
+            for _, headers in final:
+                self.assertNotIn('Authorization', headers)
+                self.assertNotIn('Cookie', headers)
+                self.assertEqual(headers.get('Accept'), 'application/json')
+
+
+if __name__ == '__main__':
+    unittest.main()
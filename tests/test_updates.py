@@ -0,0 +1,148 @@
+"""
+GitHub update checks (lib/updates.py) against a local fake releases API,
+selected with DOTBINS_GITHUB_API.
+"""
+
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+from localhost import serve, stop
+
+from transport import HTTPTransport
+from updates import RATE_LIMIT_RESERVE, UpdateChecker
+
+REPOS = [f"org/tool{i}" for i in range(6)]
+
+
+class FakeReleasesAPI(ThreadingHTTPServer):
+    """``GET /repos/<owner>/<name>/releases/latest`` with ETags and a rate-limit quota."""
+
+    def __init__(self, remaining: int = 60):
+        self.remaining = remaining
+        self.requests = []  # (path, If-None-Match)
+        self.lock = threading.Lock()
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(handler):
+                match = re.match(r'^/repos/([^/]+/[^/]+)/releases/latest$', handler.path)
+                if_none_match = handler.headers.get('If-None-Match')
+                with api.lock:
+                    api.requests.append((handler.path, if_none_match))
+                    if not match:
+                        return api.respond(handler, 404, {'message': 'Not Found'})
+                    if api.remaining <= 0:
+                        return api.respond(handler, 403, {'message': 'API rate limit exceeded'})
+                    etag = f'"{match.group(1)}-v1.0.0"'
+                    if if_none_match == etag:
+                        # GitHub doesn't charge a 304 against the quota
+                        return api.respond(handler, 304, None, etag)
+                    api.remaining -= 1
+                    return api.respond(handler, 200, {'tag_name': 'v1.0.0'}, etag)
+
+            def log_message(handler, *args):
+                pass
+
+        super().__init__(('127.0.0.1', 0), Handler)
+
+    def respond(self, handler, status, body, etag=None):
+        data = json.dumps(body).encode() if body is not None else b''
+        handler.send_response(status)
+        handler.send_header('X-RateLimit-Remaining', str(max(self.remaining, 0)))
+        handler.send_header('X-RateLimit-Reset', str(int(time.time()) + 3600))
+        if etag:
+            handler.send_header('ETag', etag)
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class UpdateCheckerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = Path(tempfile.mkdtemp(prefix='dotbins-test-'))
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        self.transport = HTTPTransport(timeout=5)
+        self.addCleanup(self.transport.close)
+        self.start_api()
+
+    def start_api(self):
+        self.api = serve(FakeReleasesAPI())
+        self.addCleanup(stop, self.api)
+        env = mock.patch.dict(os.environ, {'DOTBINS_GITHUB_API': self.api.url})
+        env.start()
+        self.addCleanup(env.stop)
+        for name in ('GITHUB_TOKEN', 'GH_TOKEN'):
+            os.environ.pop(name, None)
+
+    def checker(self, **kwargs) -> UpdateChecker:
+        return UpdateChecker(self.cache_dir, self.transport, **kwargs)
+
+    def test_answers_are_reused_within_the_ttl(self):
+        checker = self.checker()
+        latest = checker.latest_releases(REPOS)
+        self.assertEqual(checker.requests, len(REPOS))
+        self.assertEqual({r['source'] for r in latest.values()}, {'api'})
+        self.assertEqual({r['tag'] for r in latest.values()}, {'v1.0.0'})
+
+        # A new process (fresh checker) within the TTL asks nothing
+        self.api.requests.clear()
+        checker = self.checker()
+        latest = checker.latest_releases(REPOS)
+        self.assertEqual(checker.requests, 0)
+        self.assertEqual(self.api.requests, [])
+        self.assertEqual({r['source'] for r in latest.values()}, {'cache'})
+        self.assertEqual({r['tag'] for r in latest.values()}, {'v1.0.0'})
+
+    def test_expired_answers_are_revalidated_with_etags(self):
+        self.checker().latest_releases(REPOS)
+        quota = self.api.remaining
+
+        self.api.requests.clear()
+        checker = self.checker(ttl=0)
+        latest = checker.latest_releases(REPOS)
+        self.assertEqual(checker.requests, len(REPOS))
+        self.assertTrue(all(if_none_match for _, if_none_match in self.api.requests))
+        self.assertEqual({r['source'] for r in latest.values()}, {'not-modified'})
+        self.assertEqual({r['tag'] for r in latest.values()}, {'v1.0.0'})
+        self.assertEqual(self.api.remaining, quota)
+
+    def test_exhausted_rate_limit_reports_stale(self):
+        # One request at a time, so the quota is observed before each request
+        self.api.remaining = RATE_LIMIT_RESERVE + 3
+        checker = self.checker(jobs=1)
+        latest = checker.latest_releases(REPOS)
+
+        self.assertEqual(checker.requests, 3)
+        stale = [r for r in latest.values() if r['source'] == 'stale']
+        self.assertEqual(len(stale), len(REPOS) - 3)
+        self.assertEqual({r['error'] for r in stale}, {'GitHub rate limit reached'})
+
+        # The quota is persisted: the next run (even with --refresh) doesn't spend the reserve
+        self.api.requests.clear()
+        checker = self.checker()
+        latest = checker.latest_releases(REPOS, refresh=True)
+        self.assertEqual(checker.requests, 0)
+        self.assertEqual(self.api.requests, [])
+        self.assertEqual({r['source'] for r in latest.values()}, {'stale'})
+        answered = [r for r in latest.values() if r.get('tag')]
+        self.assertEqual(len(answered), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()